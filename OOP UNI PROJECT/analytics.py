@@ -0,0 +1,158 @@
+from datetime import date
+
+from attendance_store import day_text
+
+try:
+    import numpy as np
+except ImportError:  # optional; the same figures are then counted in plain Python
+    np = None
+
+AT_RISK_BELOW = 75.0
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+# every function reads the store's columns once and groups them in a single pass (np.bincount when numpy
+# is there), so a nightly run over all students and courses costs one scan instead of a query per pair
+
+
+def rate(present, total):
+    return round(100 * present / total, 2) if total else 0.0
+
+
+def columns(store):
+    # copy of (student codes, course codes, day ordinals, statuses), taken under the store lock
+    with store.lock:
+        if np is not None:
+            return (np.frombuffer(store.student_col, dtype=np.uint32).astype(np.int64),
+                    np.frombuffer(store.course_col, dtype=np.uint32).astype(np.int64),
+                    np.frombuffer(store.day_col, dtype=np.uint32).astype(np.int64),
+                    np.frombuffer(store.status_col, dtype=np.uint8).astype(np.int64))
+        return (store.student_col.tolist(), store.course_col.tolist(), store.day_col.tolist(),
+                list(store.status_col))
+
+
+def group_counts(keys, status, size):
+    # (present, total) per key in range(size)
+    if np is not None:
+        return (np.bincount(keys, weights=status, minlength=size).astype(np.int64).tolist(),
+                np.bincount(keys, minlength=size).tolist())
+    present = [0] * size
+    total = [0] * size
+    for key, value in zip(keys, status):
+        present[key] += value
+        total[key] += 1
+    return present, total
+
+
+def course_rates(store, cols=None):
+    # {course_id: {"present", "total", "rate"}}; cols is a copy from columns() to reuse
+    students, courses, days, status = cols or columns(store)
+    present, total = group_counts(courses, status, len(store.courses))
+    return {course.course_id: {"present": p, "total": t, "rate": rate(p, t)}
+            for course, p, t in zip(store.courses, present, total)}
+
+
+def student_course_rates(store):
+    # (student, course, present, total) for every pair, straight from the store's running counters
+    with store.lock:
+        return [(store.students[key >> 32], store.courses[key & 0xFFFFFFFF], store.pair_present[slot],
+                 store.pair_total[slot]) for key, slot in store.pairs.items() if store.pair_total[slot]]
+
+
+def at_risk(store, threshold=AT_RISK_BELOW):
+    # students below threshold percent in at least one course, lowest rate first
+    with store.lock:
+        keys = list(store.pairs)
+        if np is not None:
+            present = np.frombuffer(store.pair_present, dtype=np.uint32).astype(np.float64)
+            total = np.frombuffer(store.pair_total, dtype=np.uint32).astype(np.float64)
+            flagged = np.flatnonzero(present * 100 < total * threshold).tolist()
+        else:
+            flagged = [slot for slot, (p, t) in enumerate(zip(store.pair_present, store.pair_total))
+                       if p * 100 < t * threshold]
+        rows = []
+        for slot in flagged:
+            key = keys[slot]  # slots are handed out in insertion order, the same order as the dict
+            student, course = store.students[key >> 32], store.courses[key & 0xFFFFFFFF]
+            rows.append({"Student ID": student.get_id(), "Student": student.name, "Course ID": course.course_id,
+                         "Present": store.pair_present[slot], "Total": store.pair_total[slot],
+                         "Rate": rate(store.pair_present[slot], store.pair_total[slot])})
+    rows.sort(key=lambda row: (row["Rate"], row["Student ID"], row["Course ID"]))
+    return rows
+
+
+def week_start(day):
+    # ordinal 1 (0001-01-01) is a Monday, so weeks start on ordinals 1, 8, 15, ...
+    return day - (day - 1) % 7
+
+
+def weekly_trends(store, student_id=None, cols=None):
+    # {student_id: [{"week": Monday of the week, "present", "total", "rate"}, ...]} in week order
+    if student_id is None:
+        students, courses, days, status = cols or columns(store)
+    else:
+        # the row index and the columns it points into are read under one lock hold
+        with store.lock:
+            code = store.student_codes.get(student_id)
+            if code is None:
+                return {}
+            students, courses, days, status = cols or columns(store)
+            if cols:
+                rows = [n for n, student in enumerate(students) if student == code]
+            else:
+                rows = store.by_student[code].tolist()
+        if np is not None:
+            students, days, status = students[rows], days[rows], status[rows]
+        else:
+            students, days, status = [code] * len(rows), [days[n] for n in rows], [status[n] for n in rows]
+    if np is not None:
+        weeks = days - (days - 1) % 7
+        keys, groups = np.unique(students << 32 | weeks, return_inverse=True)
+        present, total = group_counts(groups.ravel(), status, len(keys))
+        keys = keys.tolist()
+    else:
+        found = {}
+        for code, day, value in zip(students, days, status):
+            counts = found.setdefault(code << 32 | week_start(day), [0, 0])
+            counts[0] += value
+            counts[1] += 1
+        keys = sorted(found)
+        present = [found[key][0] for key in keys]
+        total = [found[key][1] for key in keys]
+    trends = {}
+    for key, p, t in zip(keys, present, total):
+        trends.setdefault(store.students[key >> 32].get_id(), []).append(
+            {"week": day_text(key & 0xFFFFFFFF), "present": p, "total": t, "rate": rate(p, t)})
+    return trends
+
+
+def weekday_heatmap(store, course_id=None, cols=None):
+    # {course_id: {"Mon": rate, ...}}, only the weekdays that have records
+    students, courses, days, status = cols or columns(store)
+    size = len(store.courses) * 7
+    if np is not None:
+        keys = courses * 7 + (days - 1) % 7
+    else:
+        keys = [course * 7 + (day - 1) % 7 for course, day in zip(courses, days)]
+    present, total = group_counts(keys, status, size)
+    heatmap = {}
+    for code, course in enumerate(store.courses):
+        if course_id is not None and course.course_id != course_id:
+            continue
+        heatmap[course.course_id] = {name: rate(present[code * 7 + i], total[code * 7 + i])
+                                     for i, name in enumerate(WEEKDAYS) if total[code * 7 + i]}
+    return heatmap
+
+
+def absence_streaks(store, min_days=3, course_id=None):
+    return [{"Student ID": student.get_id(), "Student": student.name, "From": day_text(first),
+             "To": day_text(last), "Days": days}
+            for student, first, last, days in store.absence_streaks(min_days, course_id)]
+
+
+def nightly_report(store, threshold=AT_RISK_BELOW, min_days=3):
+    # the columns are copied once, so every section counts the same rows
+    cols = columns(store)
+    return {"generated": date.today().isoformat(), "rows": len(cols[0]), "courses": course_rates(store, cols),
+            "at_risk": at_risk(store, threshold), "absence_streaks": absence_streaks(store, min_days),
+            "weekday_heatmap": weekday_heatmap(store, cols=cols), "weekly_trends": weekly_trends(store, cols=cols)}
@@ -0,0 +1,339 @@
+import bisect
+import threading
+from array import array
+from datetime import date, datetime
+
+try:
+    import numpy as np
+except ImportError:  # optional; without it the scans below search the raw column bytes
+    np = None
+
+STATUS_NAMES = ("Absent", "Present")
+
+_day_ordinals = {}
+
+
+def day_ordinal(text):
+    # "YYYY-MM-DD" -> date ordinal; each distinct date string is parsed only once
+    day = _day_ordinals.get(text)
+    if day is None:
+        try:
+            day = datetime.strptime(text, "%Y-%m-%d").toordinal()
+        except (TypeError, ValueError):
+            raise ValueError("Invalid date format. Use YYYY-MM-DD")
+        _day_ordinals[text] = day
+    return day
+
+
+def day_text(day):
+    return date.fromordinal(day).isoformat()
+
+
+def find_all(column, value):
+    # positions of value in an array column; bytes.find does the scanning in C,
+    # hits that are not aligned to an item boundary are skipped
+    data = column.tobytes()
+    pattern = array(column.typecode, [value]).tobytes()
+    size = column.itemsize
+    rows = []
+    pos = data.find(pattern)
+    while pos != -1:
+        if pos % size == 0:
+            rows.append(pos // size)
+            pos = data.find(pattern, pos + size)
+        else:
+            pos = data.find(pattern, pos + 1)
+    return rows
+
+
+def absent_runs(order, student_col, course_col, day_col, status_col, min_days, course_code=None):
+    # (student code, first day, last day, days) for each run of at least min_days recorded days without a
+    # present row; order lists the row numbers sorted by student and then by day
+    if np is not None:
+        order = np.frombuffer(order, dtype=np.uint32)
+        if course_code is not None:
+            order = order[np.frombuffer(course_col, dtype=np.uint32)[order] == course_code]
+        if not len(order):
+            return []
+        students = np.frombuffer(student_col, dtype=np.uint32)[order].astype(np.int64)
+        days = np.frombuffer(day_col, dtype=np.uint32)[order].astype(np.int64)
+        status = np.frombuffer(status_col, dtype=np.uint8)[order]
+        # one entry per (student, day): present if any of that day's rows is
+        first = np.flatnonzero(np.r_[True, (students[1:] != students[:-1]) | (days[1:] != days[:-1])])
+        students, days = students[first], days[first]
+        absent = np.maximum.reduceat(status, first) == 0
+        new_student = np.r_[True, students[1:] != students[:-1]]
+        starts = np.flatnonzero(absent & (new_student | np.r_[True, ~absent[:-1]]))
+        ends = np.flatnonzero(absent & np.r_[new_student[1:] | ~absent[1:], True])
+        keep = ends - starts + 1 >= min_days
+        starts, ends = starts[keep], ends[keep]
+        return list(zip(students[starts].tolist(), days[starts].tolist(), days[ends].tolist(),
+                        (ends - starts + 1).tolist()))
+    entries = []  # [student, day, absent] per (student, day)
+    for n in order:
+        if course_code is not None and course_col[n] != course_code:
+            continue
+        student, day, absent = student_col[n], day_col[n], status_col[n] == 0
+        if entries and entries[-1][0] == student and entries[-1][1] == day:
+            entries[-1][2] = entries[-1][2] and absent
+        else:
+            entries.append([student, day, absent])
+    runs = []
+    run = 0
+    for i, (student, day, absent) in enumerate(entries + [[None, None, False]]):
+        if run and (not absent or student != entries[i - 1][0]):
+            if run >= min_days:
+                runs.append((entries[i - 1][0], first, entries[i - 1][1], run))
+            run = 0
+        if absent:
+            if run == 0:
+                first = day
+            run += 1
+    return runs
+
+
+class AttendanceStore:
+    # one row per attendance record, kept in typed columns: students and courses as small integer codes,
+    # dates as day ordinals and the status as one byte (1 = present), about 13 bytes a row
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.student_col = array("I")
+        self.course_col = array("I")
+        self.day_col = array("I")
+        self.status_col = bytearray()
+        self.student_codes = {}  # student id -> code
+        self.students = []  # code -> Student
+        self.course_codes = {}
+        self.courses = []
+        self.by_student = []  # student code -> array of its row numbers, sorted by day
+        self.by_course = []
+        # running (present, total) counts, kept up to date by append and set_present
+        self.student_present = array("I")  # by student code
+        self.student_total = array("I")
+        self.pairs = {}  # (student code << 32) | course code -> slot in the two arrays below
+        self.pair_present = array("I")
+        self.pair_total = array("I")
+
+    def __len__(self):
+        return len(self.day_col)
+
+    @staticmethod
+    def _code(codes, objects, index, key, obj):
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(objects)
+            objects.append(obj)
+            index.append(array("I"))
+        else:
+            objects[code] = obj
+        return code
+
+    def append(self, student_id, student, course_id, course, day, present):
+        with self.lock:
+            n = len(self.day_col)
+            student_code = self._code(self.student_codes, self.students, self.by_student, student_id, student)
+            course_code = self._code(self.course_codes, self.courses, self.by_course, course_id, course)
+            self.student_col.append(student_code)
+            self.course_col.append(course_code)
+            self.day_col.append(day)
+            self.status_col.append(1 if present else 0)
+            self._insert_by_day(self.by_student[student_code], n, day)
+            self._insert_by_day(self.by_course[course_code], n, day)
+            if student_code == len(self.student_total):
+                self.student_present.append(0)
+                self.student_total.append(0)
+            pair = self.pairs.setdefault((student_code << 32) | course_code, len(self.pair_total))
+            if pair == len(self.pair_total):
+                self.pair_present.append(0)
+                self.pair_total.append(0)
+            self.student_total[student_code] += 1
+            self.pair_total[pair] += 1
+            if present:
+                self.student_present[student_code] += 1
+                self.pair_present[pair] += 1
+            return n
+
+    def append_many(self, rows):
+        # (student_id, student, course_id, course, day, present) rows added under one lock acquisition
+        with self.lock:
+            first = len(self)
+            for row in rows:
+                self.append(*row)
+            return range(first, len(self))
+
+    def _insert_by_day(self, index, n, day):
+        # rows usually arrive in date order, so this is nearly always an append
+        if not index or self.day_col[index[-1]] <= day:
+            index.append(n)
+        else:
+            index.insert(bisect.bisect_right(index, day, key=self.day_col.__getitem__), n)
+
+    def row(self, n):
+        # (student, course, day ordinal, present)
+        return (self.students[self.student_col[n]], self.courses[self.course_col[n]], self.day_col[n],
+                self.status_col[n] == 1)
+
+    def set_present(self, n, present):
+        # True when the row's status changed
+        with self.lock:
+            new = 1 if present else 0
+            change = new - self.status_col[n]
+            if not change:
+                return False
+            self.status_col[n] = new
+            student_code = self.student_col[n]
+            pair = self.pairs[(student_code << 32) | self.course_col[n]]
+            self.student_present[student_code] += change
+            self.pair_present[pair] += change
+            return True
+
+    def counts(self, student_id, course_id=None):
+        # (present, total) from the running counters, O(1)
+        with self.lock:
+            student_code = self.student_codes.get(student_id)
+            if student_code is None:
+                return 0, 0
+            if course_id is None:
+                return self.student_present[student_code], self.student_total[student_code]
+            course_code = self.course_codes.get(course_id)
+            pair = None if course_code is None else self.pairs.get((student_code << 32) | course_code)
+            if pair is None:
+                return 0, 0
+            return self.pair_present[pair], self.pair_total[pair]
+
+    def remove_student(self, student_id):
+        # drops every row of one student, renumbering the rows after them; returns how many were removed
+        with self.lock:
+            code = self.student_codes.pop(student_id, None)
+            if code is None:
+                return 0
+            removed = len(self.by_student[code])
+            if not removed:
+                return 0
+            old_students = self.student_col
+            keep = [n for n in range(len(self)) if old_students[n] != code]
+            new_number = array("I", bytes(4 * len(old_students)))
+            for new, n in enumerate(keep):
+                new_number[n] = new
+            self.student_col = array("I", (old_students[n] for n in keep))
+            self.course_col = array("I", (self.course_col[n] for n in keep))
+            self.day_col = array("I", (self.day_col[n] for n in keep))
+            self.status_col = bytearray(self.status_col[n] for n in keep)
+            self.by_student[code] = array("I")
+            for index in self.by_student:
+                index[:] = array("I", (new_number[n] for n in index))
+            self.by_course = [array("I", (new_number[n] for n in index if old_students[n] != code))
+                              for index in self.by_course]
+            # the pair slots stay where they are (at_risk relies on their order), only their counts go
+            self.student_present[code] = self.student_total[code] = 0
+            for key, slot in self.pairs.items():
+                if key >> 32 == code:
+                    self.pair_present[slot] = self.pair_total[slot] = 0
+            return removed
+
+    def clear(self):
+        with self.lock:
+            for column in (self.student_col, self.course_col, self.day_col, self.status_col, self.student_present,
+                           self.student_total, self.pair_present, self.pair_total):
+                del column[:]
+            for table in (self.student_codes, self.students, self.course_codes, self.courses,
+                          self.by_student, self.by_course, self.pairs):
+                table.clear()
+
+    def rows_on(self, student_id, day, course_id=None):
+        # rows of one student on one day (optionally one course), by binary search on the student's
+        # day-sorted index
+        with self.lock:
+            student_code = self.student_codes.get(student_id)
+            if student_code is None:
+                return []
+            index = self.by_student[student_code]
+            day_of = self.day_col.__getitem__
+            rows = index[bisect.bisect_left(index, day, key=day_of):bisect.bisect_right(index, day, key=day_of)]
+            rows = rows.tolist()
+            if course_id is not None:
+                course_code = self.course_codes.get(course_id)
+                rows = [n for n in rows if self.course_col[n] == course_code]
+            return rows
+
+    def rows_where(self, student_id=None, course_id=None, day=None):
+        # row numbers matching every given filter; a student or course filter starts from the smaller of
+        # their indexes (rows come back in day order), so the cost follows the number of matches
+        with self.lock:
+            if student_id is not None and day is not None:
+                return self.rows_on(student_id, day, course_id)
+            checks = []
+            indexes = []
+            if student_id is not None:
+                if student_id not in self.student_codes:
+                    return []
+                code = self.student_codes[student_id]
+                checks.append((self.student_col, code))
+                indexes.append((self.by_student[code], len(checks) - 1))
+            if course_id is not None:
+                if course_id not in self.course_codes:
+                    return []
+                code = self.course_codes[course_id]
+                checks.append((self.course_col, code))
+                indexes.append((self.by_course[code], len(checks) - 1))
+            if day is not None:
+                checks.append((self.day_col, day))
+            if not checks:
+                return list(range(len(self)))
+            if indexes:
+                index, used = min(indexes, key=lambda entry: len(entry[0]))
+                rows = index.tolist()
+                for column, value in checks[:used] + checks[used + 1:]:
+                    rows = [n for n in rows if column[n] == value]
+                return rows
+            if np is not None:
+                mask = np.ones(len(self), dtype=bool)
+                for column, value in checks:
+                    mask &= np.frombuffer(column, dtype=np.uint32) == value
+                return np.flatnonzero(mask).tolist()
+            rows = find_all(*checks[0])
+            for column, value in checks[1:]:
+                rows = [n for n in rows if column[n] == value]
+            return rows
+
+    def rows_between(self, start, end, student_id=None, course_id=None):
+        # rows of a student and/or course with start <= day <= end, by binary search on the day-sorted index
+        with self.lock:
+            indexes = []
+            if student_id is not None:
+                if student_id not in self.student_codes:
+                    return []
+                indexes.append(self.by_student[self.student_codes[student_id]])
+            if course_id is not None:
+                if course_id not in self.course_codes:
+                    return []
+                indexes.append(self.by_course[self.course_codes[course_id]])
+            if not indexes:
+                raise ValueError("A student or a course is needed for a date range")
+            index = min(indexes, key=len)
+            day_of = self.day_col.__getitem__
+            rows = index[bisect.bisect_left(index, start, key=day_of):bisect.bisect_right(index, end, key=day_of)]
+            if len(indexes) == 2:
+                student_code, course_code = self.student_codes[student_id], self.course_codes[course_id]
+                return [n for n in rows if self.student_col[n] == student_code and self.course_col[n] == course_code]
+            return rows.tolist()
+
+    def absence_streaks(self, min_days, course_id=None):
+        # runs of at least min_days consecutive recorded days (in one course, or overall) on which a student
+        # was never present, as (student, first day, last day, days); the rows are copied in (student, day)
+        # order under the lock and scanned outside it
+        with self.lock:
+            course_code = None
+            if course_id is not None:
+                course_code = self.course_codes.get(course_id)
+                if course_code is None:
+                    return []
+            order = array("I")
+            for index in self.by_student:
+                order.extend(index)
+            students = list(self.students)
+            student_col, course_col = array("I", self.student_col), array("I", self.course_col)
+            day_col, status_col = array("I", self.day_col), bytes(self.status_col)
+        return [(students[code], first, last, days)
+                for code, first, last, days in absent_runs(order, student_col, course_col, day_col, status_col,
+                                                           min_days, course_code)]
@@ -0,0 +1,168 @@
+import csv
+import itertools
+import json
+import os
+import time
+
+import university_management_last_version1 as ums
+
+CHUNK_SIZE = 5000
+MAX_REJECTS = 1000  # rejected rows listed in the report, later ones are only counted
+
+FIELDS = {
+    "students": ("id", "name", "major", "email"),
+    "professors": ("id", "name", "department", "contact_info", "email"),
+    "courses": ("id", "name", "department", "credits", "professor_id"),
+}
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "jsonl"}
+
+
+def read_csv(f):
+    # yields (line number, row dict or None, error); the first line is the header
+    reader = csv.DictReader(f)
+    for row in reader:
+        if None in row:
+            yield reader.line_num, None, "Too many columns"
+        else:
+            yield reader.line_num, row, None
+
+
+def read_jsonl(f):
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield line_no, row, None
+        else:
+            yield line_no, None, "Expected a JSON object"
+
+
+def check_row(kind, row):
+    values = {}
+    for name in FIELDS[kind]:
+        value = row.get(name)
+        value = "" if value is None else str(value).strip()
+        if not value:
+            raise ValueError(f"Missing {name}")
+        values[name] = value
+    if "email" in values and '@' not in values["email"]:
+        raise ValueError(f"Invalid email '{values['email']}'")
+    if kind == "courses":
+        # checked as a number but kept as text, the way ADD_COURSE and the CLI store it
+        if not values["credits"].isdigit() or int(values["credits"]) <= 0:
+            raise ValueError(f"Invalid credits '{values['credits']}'")
+    return values
+
+
+class Importer:
+    def __init__(self, kind):
+        if kind not in FIELDS:
+            raise ValueError(f"Cannot import '{kind}', expected one of {', '.join(FIELDS)}.")
+        self.kind = kind
+        self.registry = {"students": ums.students, "professors": ums.professors, "courses": ums.courses}[kind]
+        self.rows = 0
+        self.imported = 0
+        self.rejected = 0
+        self.rejects = []
+
+    def reject(self, line_no, error, row=None):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REJECTS:
+            entry = {"line": line_no, "error": error}
+            if row and row.get("id") is not None:
+                entry["id"] = str(row["id"])
+            self.rejects.append(entry)
+
+    def add_chunk(self, chunk):
+        # one pass of checks, then one add_many for the chunk
+        checked = []
+        for line_no, row, error in chunk:
+            self.rows += 1
+            if error is None:
+                try:
+                    checked.append((line_no, check_row(self.kind, row)))
+                    continue
+                except ValueError as e:
+                    error = str(e)
+            self.reject(line_no, error, row)
+        with ums.data_lock:
+            taken = set()
+            emails = set()
+            items = []
+            departments = {}
+            for line_no, values in checked:
+                item_id = values["id"]
+                if item_id in taken or item_id in self.registry:
+                    self.reject(line_no, f"Duplicate ID {item_id}", values)
+                    continue
+                if self.kind == "students":
+                    email = values["email"].lower()
+                    if email in emails or ums.find_student_by_email(email):
+                        self.reject(line_no, f"Email {values['email']} already in use", values)
+                        continue
+                    emails.add(email)
+                    item = ums.Student(item_id, values["name"], values["major"], values["email"])
+                elif self.kind == "professors":
+                    item = ums.Professor(item_id, values["name"], values["department"], values["contact_info"],
+                                         values["email"])
+                else:
+                    professor = ums.professors.get(values["professor_id"])
+                    if professor is None:
+                        self.reject(line_no, f"Professor with ID {values['professor_id']} not found", values)
+                        continue
+                    item = ums.Course(item_id, values["name"], values["department"], values["credits"], professor)
+                taken.add(item_id)
+                items.append(item)
+                if self.kind != "students":
+                    departments.setdefault(values["department"], []).append(item)
+            self.registry.add_many(items)
+            for name, members in departments.items():
+                department = ums.find_department_by_name(name)
+                if department:
+                    for item in members:
+                        if self.kind == "courses":
+                            department.list_courses(item)
+                        else:
+                            department.list_professors(item)
+            self.imported += len(items)
+
+    def run(self, rows, chunk_size=CHUNK_SIZE):
+        started = time.perf_counter()
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            self.add_chunk(chunk)
+        seconds = time.perf_counter() - started
+        return {"kind": self.kind, "rows": self.rows, "imported": self.imported, "rejected": self.rejected,
+                "seconds": round(seconds, 3), "rows_per_second": round(self.rows / seconds) if seconds else self.rows,
+                "rejects": self.rejects}
+
+
+def resolve_path(directory, path):
+    # path taken relative to directory; anything that ends up outside it (.., absolute paths, symlinks) is refused
+    root = os.path.realpath(directory)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        raise ValueError(f"Cannot read {path}: only files in the import directory can be imported")
+    return full
+
+
+def import_file(path, kind, fmt=None, chunk_size=CHUNK_SIZE):
+    # streams the file, so memory stays flat however many rows it has
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown format for {path}, expected .csv or .jsonl")
+    try:
+        f = open(path, newline="", encoding="utf-8-sig")
+    except OSError as e:
+        raise ValueError(f"Cannot read {path}: {e.strerror}")
+    with f:
+        rows = read_csv(f) if fmt == "csv" else read_jsonl(f)
+        return Importer(kind).run(rows, chunk_size)
@@ -1,9 +1,34 @@
 import socket
 import json
+import sys
+
+from protocol import send_message, recv_message, send_pipeline, STREAM_DATA
 
 SERVER_HOST = '127.0.0.1'
 SERVER_PORT = 3000
 
+def print_response(resp):
+    try:
+        parsed = json.loads(resp)
+        print("Server:", json.dumps(parsed, indent=2))
+    except:
+        print("Server:", resp)
+
+
+def run_script(path):
+    # every line of the file up to the first QUIT is pipelined and the replies are read back in order
+    with open(path) as f:
+        commands = [line.strip() for line in f if line.strip()]
+    quits = [n for n, cmd in enumerate(commands) if cmd.upper() == "QUIT"]
+    if quits:
+        commands = commands[:quits[0] + 1]
+
+    with socket.create_connection((SERVER_HOST, SERVER_PORT)) as s:
+        for cmd, resp in zip(commands, send_pipeline(s, commands)):
+            print(f"> {cmd}")
+            print_response(resp)
+
+
 def run_client():
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         try:
@@ -17,6 +42,13 @@ def run_client():
             print("      e.g., ADD_STUDENT 320240092,Asma Shokr,CS,asma@mail.com")
             print("  GET_STUDENT_INFO <student_id>")
             print("      e.g., GET_STUDENT_INFO 320240092")
+            print("  ADD_STUDENTS <id>,<name>,<major>,<email>;<id>,<name>,<major>,<email>;...")
+            print("  GET_STUDENTS_INFO <id>,<id>,...")
+            print("  IMPORT_FILE <students|professors|courses>,<path in the server's import directory>[,csv|jsonl]")
+            print("  EXPORT [students,rosters,attendance,loans]  (JSON Lines, streamed)")
+            print("  FIND_FREE_ROOMS <time slot, e.g. Tue 14-16>[,<min capacity>[,<max capacity>]]")
+            print("  ATTENDANCE_ANALYTICS <courses|at_risk|weekly|heatmap|streaks|nightly>[,<argument>]")
+            print("  LIST_COMMANDS  (every other command and its arguments)")
             print("  QUIT")
             print("-" * 30)
 
@@ -25,20 +57,22 @@ def run_client():
                 if not cmd:
                     continue
 
-                s.sendall(cmd.encode())
+                send_message(s, cmd)
 
                 if cmd.upper() == "QUIT":
                     print("Disconnecting...")
-                    print("Server:", s.recv(4096).decode())
+                    print("Server:", recv_message(s))
                     break
 
-                resp = s.recv(4096).decode()
+                resp = recv_message(s)
+                while resp is not None and resp.startswith(STREAM_DATA):
+                    print(resp[len(STREAM_DATA):])  # streamed rows, the END line follows
+                    resp = recv_message(s)
+                if resp is None:
+                    print("Server closed the connection.")
+                    break
 
-                try:
-                    parsed = json.loads(resp)
-                    print("Server:", json.dumps(parsed, indent=2))
-                except:
-                    print("Server:", resp)
+                print_response(resp)
 
         except ConnectionRefusedError:
             print(f"Cannot connect to {SERVER_HOST}:{SERVER_PORT}")
@@ -50,4 +84,7 @@ def run_client():
             print("Client exited.")
 
 if __name__ == "__main__":
-    run_client()
+    if len(sys.argv) > 1:
+        run_script(sys.argv[1])
+    else:
+        run_client()
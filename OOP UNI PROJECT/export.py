@@ -0,0 +1,84 @@
+import json
+
+import university_management_last_version1 as ums
+
+KINDS = ("students", "rosters", "attendance", "loans")
+CHUNK_LINES = 1000
+
+
+# each generator builds one record at a time and only holds data_lock while reading that record,
+# so a long export never blocks the other clients for more than a moment
+def student_rows():
+    for student in ums.students:
+        with ums.data_lock:
+            row = student.get_info()
+        yield {"type": "student", **row}
+
+
+def roster_rows():
+    for course in ums.courses:
+        with ums.data_lock:
+            row = course.get_course_info()
+        yield {"type": "roster", **row}
+
+
+def attendance_rows():
+    records = ums.get_attendance_report().attendance_records
+    i = 0
+    while True:
+        with ums.data_lock:
+            if i >= len(records):
+                return
+            record = records[i]
+            row = {"type": "attendance", "student_id": record.get_student().get_id(),
+                   "course_id": record.get_course().course_id, "date": record.get_date(),
+                   "status": record.get_status()}
+        i += 1
+        yield row
+
+
+def loan_rows():
+    for library in ums.libraries:
+        with ums.data_lock:
+            loans = [(sid, title) for sid, member in library._students_registered.items()
+                     for title in member["borrowed_books"]]
+        for sid, title in loans:
+            yield {"type": "loan", "library_id": library.get_library_id(), "student_id": sid, "title": title}
+
+
+ROWS = {"students": student_rows, "rosters": roster_rows, "attendance": attendance_rows, "loans": loan_rows}
+
+
+def parse_kinds(text):
+    kinds = [k.strip().lower() for k in text.split(',') if k.strip()] if text else list(KINDS)
+    for kind in kinds:
+        if kind not in ROWS:
+            raise ValueError(f"Cannot export '{kind}', expected {', '.join(KINDS)}")
+    return kinds
+
+
+def export_lines(kinds=KINDS):
+    for kind in kinds:
+        for row in ROWS[kind]():
+            yield json.dumps(row)
+
+
+def export_chunks(kinds=KINDS, chunk_lines=CHUNK_LINES):
+    # groups lines so the server sends a few large messages instead of one per row
+    chunk = []
+    for line in export_lines(kinds):
+        chunk.append(line)
+        if len(chunk) >= chunk_lines:
+            yield "\n".join(chunk)
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk)
+
+
+def export_file(path, kinds=KINDS):
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for line in export_lines(kinds):
+            f.write(line + "\n")
+            count += 1
+    return count
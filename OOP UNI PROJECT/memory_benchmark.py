@@ -0,0 +1,84 @@
+import argparse
+import gc
+import tracemalloc
+
+import university_management_last_version1 as ums
+
+
+# the layout used before __slots__: a __dict__ per object and a dict per enrollment
+class DictStudent:
+    def __init__(self, student_id, name, major, email):
+        self.email = email
+        self.name = name
+        self._id = student_id
+        self._major = major
+        self._courses_enrolled = {}
+
+
+class DictAttendance:
+    def __init__(self, student, course, date, status):
+        self.student = student
+        self.course = course
+        self.date = date
+        self.status = status
+
+
+class DictSchedule:
+    def __init__(self, schedule_id, course, professor, time_slot, location):
+        self.schedule_id = schedule_id
+        self.course = course
+        self.professor = professor
+        self.time_slot = time_slot
+        self.location = location
+
+
+def build_dicts(n_students, n_courses, n_days):
+    students = []
+    for i in range(n_students):
+        student = DictStudent(str(i), f"Student {i}", "CS", f"s{i}@mail.com")
+        for c in range(n_courses):
+            student._courses_enrolled[f"C{c}"] = {"name": f"Course {c}", "grade": None}
+        students.append(student)
+    attendance = [DictAttendance(s, None, f"2025-01-{d + 1:02d}", "Present")
+                  for s in students for d in range(n_days)]
+    schedules = [DictSchedule(f"sch_{i}", None, None, "Mon 9-11", "Room 1") for i in range(n_students // 10)]
+    return students, attendance, schedules
+
+
+def build_slots(n_students, n_courses, n_days):
+    students = []
+    for i in range(n_students):
+        student = ums.Student(str(i), f"Student {i}", "CS", f"s{i}@mail.com")
+        for c in range(n_courses):
+            student._courses_enrolled[f"C{c}"] = ums.Enrollment(f"Course {c}")
+        students.append(student)
+    attendance = [ums.Attendance(s, None, f"2025-01-{d + 1:02d}", "Present")
+                  for s in students for d in range(n_days)]
+    schedules = [ums.Schedule(f"sch_{i}", None, None, "Mon 9-11", "Room 1") for i in range(n_students // 10)]
+    return students, attendance, schedules
+
+
+def measure(build, *args):
+    gc.collect()
+    tracemalloc.start()
+    data = build(*args)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory used by students, enrollments, attendance and schedules")
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--courses", type=int, default=5, help="enrollments per student")
+    parser.add_argument("--days", type=int, default=10, help="attendance rows per student")
+    args = parser.parse_args()
+
+    sizes = (args.students, args.courses, args.days)
+    before = measure(build_dicts, *sizes)
+    after = measure(build_slots, *sizes)
+    print(f"{args.students} students, {args.students * args.courses} enrollments, "
+          f"{args.students * args.days} attendance rows, {args.students // 10} schedules")
+    print(f"  __dict__ layout: {before / 2 ** 20:8.1f} MiB")
+    print(f"  __slots__ layout: {after / 2 ** 20:7.1f} MiB  ({100 * (before - after) / before:.0f}% less)")
@@ -0,0 +1,628 @@
+import contextlib
+import io
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+import university_management_last_version1 as ums
+
+WAL_PREFIX = "wal-"
+WAL_SUFFIX = ".log"
+SNAPSHOT_FILE = "snapshot.json"  # older text snapshots, still read when no binary one exists
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".bin"
+SNAPSHOT_MAGIC = b"UMSSNAP1"
+SNAPSHOT_VERSION = 1
+
+# binary snapshot layout, all little-endian:
+#   file header, then one (name, offset) entry per section
+#   section: record count and key table count, (name, offset) per key table, record offsets, record blob
+#   key table: record numbers sorted by key (for binary search), key offsets, key blob
+# records and keys are compact JSON, so a record is only decoded when it is first asked for
+FILE_HEADER = struct.Struct("<8sIQI")  # magic, version, log seq, section count
+SECTION_ENTRY = struct.Struct("<16sQ")  # section name, offset in the file
+SECTION_HEADER = struct.Struct("<II")  # record count, key table count
+TABLE_ENTRY = struct.Struct("<16sQ")  # key table name, offset in the section
+
+_building = threading.local()  # set while records from a snapshot are built, their side effects are not logged
+
+
+def entity_to_record(label, item):
+    if label == "Student":
+        return {"id": item.get_id(), "name": item.name, "major": item._major, "email": item.email,
+                "courses": {cid: [info["name"], info["grade"]] for cid, info in item._courses_enrolled.items()}}
+    if label == "Professor":
+        return {"id": item.professor_id, "name": item.name, "department": item.department,
+                "contact_info": item.contact_info, "email": item.email, "courses_taught": list(item.courses_taught)}
+    if label == "Course":
+        return {"id": item.course_id, "name": item.name, "department": item.department, "credits": item.credits,
+                "professor": item.professor.professor_id, "students": list(item.enrolled_students)}
+    if label == "Department":
+        return {"id": item.department_id, "name": item.name, "head": item.head_of_department,
+                "courses": [c.course_id for c in item.courses_offered],
+                "faculty": [p.professor_id for p in item.faculty_members]}
+    if label == "Classroom":
+        return {"id": item.classroom_id, "location": item.location, "capacity": item.capacity,
+                "schedule": [s.get_schedule_id() for s in item.schedule]}
+    if label == "Schedule":
+        return {"id": item.get_schedule_id(), "course": item.get_course().course_id,
+                "professor": item.get_professor().professor_id, "time_slot": item.get_time_slot(),
+                "location": item.get_location()}
+    if label == "Exam":
+        return {"id": item.get_exam_id(), "course": item._course, "date": item.date, "duration": item.duration,
+                "passing_score": item.passing_score, "results": item.get_results()}
+    if label == "Library":
+        return {"id": item.get_library_id(), "books": item._books, "students": item._students_registered}
+    raise ValueError(f"Cannot persist {label} objects.")
+
+
+def record_to_entity(label, rec):
+    # references to other entities are resolved through the registries, so load order matters
+    if label == "Student":
+        student = ums.Student(rec["id"], rec["name"], rec["major"], rec["email"])
+        for cid, (name, grade) in rec["courses"].items():
+            student._courses_enrolled[cid] = ums.Enrollment(name, grade)
+        return student
+    if label == "Professor":
+        professor = ums.Professor(rec["id"], rec["name"], rec["department"], rec["contact_info"], rec["email"])
+        professor.courses_taught = list(rec["courses_taught"])
+        return professor
+    if label == "Course":
+        professor = ums.professors.get(rec["professor"])
+        taught = list(professor.courses_taught)
+        course = ums.Course(rec["id"], rec["name"], rec["department"], rec["credits"], professor)
+        if rec["id"] in taught:
+            professor.courses_taught = taught  # Course() appends again, keep the saved list
+        for sid in rec["students"]:
+            course.enrolled_students[sid] = ums.students.get(sid)
+        return course
+    if label == "Department":
+        department = ums.Department(rec["id"], rec["name"], rec["head"])
+        department.courses_offered = [ums.courses.get(cid) for cid in rec["courses"]]
+        department.faculty_members = [ums.professors.get(pid) for pid in rec["faculty"]]
+        return department
+    if label == "Classroom":
+        capacity = rec["capacity"]
+        if not isinstance(capacity, int):  # saved when capacity was free text, e.g. "120 seats"
+            digits = re.match(r"\s*(\d+)", str(capacity))
+            if digits is None:
+                print(f"Classroom {rec['id']}: capacity '{capacity}' is not a number, loaded as 0 seats.")
+            capacity = int(digits.group(1)) if digits else 0
+        classroom = ums.Classroom(rec["id"], rec["location"], capacity)
+        for sid in rec["schedule"]:
+            classroom.book(ums.schedules.get(sid))
+        return classroom
+    if label == "Schedule":
+        return ums.Schedule(rec["id"], ums.courses.get(rec["course"]), ums.professors.get(rec["professor"]),
+                            rec["time_slot"], rec["location"])
+    if label == "Exam":
+        exam = ums.FinalExam(rec["id"], rec["course"], rec["date"], rec["duration"], rec["passing_score"])
+        for name, score in rec["results"].items():
+            exam.record_results(name, score)
+        return exam
+    if label == "Library":
+        library = ums.Library(rec["id"])
+        library._books = rec["books"]
+        library._students_registered = rec["students"]
+        return library
+    raise ValueError(f"Cannot load {label} objects.")
+
+
+# (label, registry name) in dependency order
+REGISTRIES = [("Professor", "professors"), ("Student", "students"), ("Course", "courses"),
+              ("Department", "departments"), ("Schedule", "schedules"), ("Classroom", "classrooms"),
+              ("Exam", "exams"), ("Library", "libraries")]
+
+
+def registry_for(label):
+    return getattr(ums, dict(REGISTRIES)[label])
+
+
+def dump_state():
+    ums.load_deferred()
+    with ums.data_lock:
+        state = {name: [entity_to_record(label, item) for item in getattr(ums, name)] for label, name in REGISTRIES}
+        state["attendance"] = [[a.get_student().get_id(), a.get_course().course_id, a.get_date(), a.get_status()]
+                               for a in ums.get_attendance_report().attendance_records]
+    return state
+
+
+def clear_state():
+    for label, name in REGISTRIES:
+        getattr(ums, name).clear()
+    ums.deferred_loaders.clear()
+    ums.schedule_rooms.clear()
+    ums.schedule_index.clear()
+    ums.attendance_store.clear()
+
+
+def load_state(state):
+    for label, name in REGISTRIES:
+        registry = getattr(ums, name)
+        registry.add_many([record_to_entity(label, rec) for rec in state.get(name, [])])
+    for sid, cid, date, status in state.get("attendance", []):
+        ums.add_attendance_record(ums.students.get(sid), ums.courses.get(cid), date, status)
+
+
+def encode_args(op, args):
+    if op in ("add", "update"):
+        label, item = args
+        return [label, entity_to_record(label, item)]
+    if op == "add_many":
+        label, items = args
+        return [label, [entity_to_record(label, item) for item in items]]
+    return list(args)
+
+
+def apply_record(op, args):
+    if op == "add":
+        label, rec = args
+        registry_for(label).add(record_to_entity(label, rec))
+    elif op == "add_many":
+        label, recs = args
+        registry_for(label).add_many([record_to_entity(label, rec) for rec in recs])
+    elif op == "update":
+        label, rec = args
+        registry = registry_for(label)
+        item = registry.get(rec["id"])
+        if label == "Student":
+            item._major, item.email = rec["major"], rec["email"]
+        elif label == "Professor":
+            item.department = rec["department"]
+        registry.reindex(item)
+    elif op == "remove":
+        label, key = args
+        if label == "Student":
+            ums.remove_student(key)
+        else:
+            registry_for(label).remove(key)
+    elif op == "enroll":
+        sid, cid, name = args
+        ums.students.get(sid).enroll_course(cid, name)
+    elif op == "drop_course":
+        sid, cid = args
+        ums.students.get(sid).drop_course(cid)
+    elif op == "grade":
+        sid, cid, grade = args
+        ums.students.get(sid).set_grade(cid, grade)
+    elif op == "course_add_student":
+        cid, sid = args
+        ums.courses.get(cid).add_student(ums.students.get(sid))
+    elif op == "course_remove_student":
+        cid, sid = args
+        ums.courses.get(cid).remove_student(ums.students.get(sid))
+    elif op == "department_course":
+        did, cid = args
+        ums.departments.get(did).list_courses(ums.courses.get(cid))
+    elif op == "department_professor":
+        did, pid = args
+        ums.departments.get(did).list_professors(ums.professors.get(pid))
+    elif op == "department_remove_professor":
+        did, pid = args
+        ums.departments.get(did).remove_professor(ums.professors.get(pid))
+    elif op == "schedule_update":
+        sched_id, time_slot, location = args
+        ums.schedules.get(sched_id).update_schedule(time_slot, location, check=False)  # as it was applied then
+    elif op == "allocate_class":
+        room_id, sched_id = args
+        ums.classrooms.get(room_id).book(ums.schedules.get(sched_id))
+    elif op == "exam_result":
+        exam_id, name, score = args
+        ums.exams.get(exam_id).record_results(name, score)
+    elif op == "add_book":
+        lib_id, title, author, category, copies = args
+        ums.libraries.get(lib_id).add_book(title, author, category, copies)
+    elif op == "library_register":
+        lib_id, sid, name = args
+        ums.libraries.get(lib_id).register_student(sid, name)
+    elif op == "borrow_book":
+        lib_id, sid, title = args
+        ums.libraries.get(lib_id).borrow_book(sid, title)
+    elif op == "return_book":
+        lib_id, sid, title = args
+        ums.libraries.get(lib_id).return_book(sid, title)
+    elif op == "attendance":
+        sid, cid, date, status = args
+        ums.add_attendance_record(ums.students.get(sid), ums.courses.get(cid), date, status)
+    elif op == "attendance_batch":
+        cid, date, statuses = args
+        ums.get_attendance_report().add_attendance_batch(
+            ums.courses.get(cid), date, [(ums.students.get(sid), status) for sid, status in statuses])
+    elif op == "attendance_status":
+        sid, date, status, *course = args
+        ums.load_deferred()
+        ums.AttendanceProxy("admin").update_status(sid, date, status, *course)
+    elif op == "attendance_statuses":
+        corrections, = args
+        ums.load_deferred()
+        ums.AttendanceProxy("admin").update_statuses(corrections)
+    else:
+        raise ValueError(f"Unknown log record '{op}'.")
+
+
+def fsync_write(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def building():
+    _building.active = True
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        _building.active = False
+
+
+def is_building():
+    return getattr(_building, "active", False)
+
+
+def pack_json(value):
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def pack_offsets(blobs):
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return struct.pack(f"<{len(offsets)}Q", *offsets)
+
+
+def pack_section(records, tables):
+    count = len(records)
+    head = bytearray(SECTION_HEADER.pack(count, len(tables)))
+    body = bytearray(pack_offsets(records))
+    body += b"".join(records)
+    start = SECTION_HEADER.size + TABLE_ENTRY.size * len(tables)
+    for name, keys in tables.items():
+        head += TABLE_ENTRY.pack(name.encode(), start + len(body))
+        order = sorted(range(count), key=keys.__getitem__)
+        body += struct.pack(f"<{count}I", *order)
+        body += pack_offsets(keys)
+        body += b"".join(keys)
+    return bytes(head + body)
+
+
+def pack_snapshot(seq, sections):
+    out = bytearray(FILE_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, seq, len(sections)))
+    out += bytes(SECTION_ENTRY.size * len(sections))
+    for i, (name, records, tables) in enumerate(sections):
+        SECTION_ENTRY.pack_into(out, FILE_HEADER.size + i * SECTION_ENTRY.size, name.encode(), len(out))
+        out += pack_section(records, tables)
+    return bytes(out)
+
+
+def capture_sections(attendance_rows=None):
+    # call under data_lock; records never built since the last snapshot are copied without decoding them
+    sections = []
+    for label, name in REGISTRIES:
+        registry = getattr(ums, name)
+        source, entries = registry.snapshot_entries()
+        keys = {"id": registry.key_of, **registry.unique_indexes()}
+        records = []
+        tables = {table: [] for table in keys}
+        for entry in entries:
+            if isinstance(entry, int):
+                records.append(source.record_bytes(entry))
+                for table, column in tables.items():
+                    column.append(source.key_bytes(table, entry))
+            else:
+                records.append(pack_json(entity_to_record(label, entry)))
+                for table, column in tables.items():
+                    column.append(pack_json(keys[table](entry)))
+        sections.append((name, records, tables))
+    if attendance_rows is not None:
+        rows = [attendance_rows.record_bytes(n) for n in range(len(attendance_rows))]
+    else:
+        rows = [pack_json([a.get_student().get_id(), a.get_course().course_id, a.get_date(), a.get_status()])
+                for a in ums.get_attendance_report().attendance_records]
+    sections.append(("attendance", rows, {}))
+    return sections
+
+
+class MappedSection:
+    def __init__(self, data, start):
+        self.data = data
+        self.count, table_count = SECTION_HEADER.unpack_from(data, start)
+        self.tables = {}
+        for i in range(table_count):
+            name, offset = TABLE_ENTRY.unpack_from(data, start + SECTION_HEADER.size + i * TABLE_ENTRY.size)
+            self.tables[name.rstrip(b"\0").decode()] = start + offset
+        self.records = start + SECTION_HEADER.size + table_count * TABLE_ENTRY.size
+
+    def __len__(self):
+        return self.count
+
+    def _blob(self, offsets, n):
+        begin, end = struct.unpack_from("<2Q", self.data, offsets + 8 * n)
+        base = offsets + 8 * (self.count + 1)
+        return self.data[base + begin:base + end]
+
+    def record_bytes(self, n):
+        return self._blob(self.records, n)
+
+    def key_bytes(self, table, n):
+        return self._blob(self.tables[table] + 4 * self.count, n)
+
+    def find(self, table, key):
+        # binary search through the sorted record numbers stored with the table
+        order = self.tables[table]
+        offsets = order + 4 * self.count
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            n, = struct.unpack_from("<I", self.data, order + 4 * mid)
+            if self._blob(offsets, n) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            n, = struct.unpack_from("<I", self.data, order + 4 * lo)
+            if self._blob(offsets, n) == key:
+                return n
+        return None
+
+
+class LazyRecords:
+    # what Registry.attach_lazy expects, on top of one mapped section
+    def __init__(self, label, section):
+        self.label = label
+        self.section = section
+
+    def __len__(self):
+        return len(self.section)
+
+    def load(self, n):
+        with building():
+            return record_to_entity(self.label, json.loads(self.section.record_bytes(n)))
+
+    def key_at(self, n):
+        return json.loads(self.section.key_bytes("id", n))
+
+    def lookup(self, index, value):
+        if index not in self.section.tables:
+            return None
+        return self.section.find(index, pack_json(value))
+
+    def record_bytes(self, n):
+        return self.section.record_bytes(n)
+
+    def key_bytes(self, table, n):
+        return self.section.key_bytes(table, n)
+
+
+def open_snapshot(path):
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, seq, section_count = FILE_HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"{path} is not a snapshot this version can read.")
+    sections = {}
+    for i in range(section_count):
+        name, offset = SECTION_ENTRY.unpack_from(data, FILE_HEADER.size + i * SECTION_ENTRY.size)
+        sections[name.rstrip(b"\0").decode()] = MappedSection(data, offset)
+    return seq, sections
+
+
+def list_snapshots(directory):
+    names = sorted(n for n in os.listdir(directory) if n.startswith(SNAPSHOT_PREFIX) and n.endswith(SNAPSHOT_SUFFIX))
+    return [os.path.join(directory, n) for n in names]
+
+
+class WriteAheadLog:
+    # append only; records are buffered and a background thread writes and fsyncs them in groups
+    def __init__(self, directory, start_seq=0, batch_size=512, flush_interval=0.05, fsync=True):
+        self.directory = directory
+        self.seq = start_seq
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._buffer = []
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._file = None
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, name="wal-writer", daemon=True)
+        self._thread.start()
+
+    def _open_segment(self):
+        self.segment = os.path.join(self.directory, f"{WAL_PREFIX}{self.seq + 1:016d}{WAL_SUFFIX}")
+        self._file = open(self.segment, "ab")
+
+    def append(self, op, args):
+        with self._cond:
+            self.seq += 1
+            line = json.dumps([self.seq, op, *args], separators=(",", ":"))
+            self._buffer.append(line)
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+            return self.seq
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self):
+        # one write and one fsync for everything appended since the last flush (group commit)
+        with self._io_lock:
+            with self._cond:
+                lines, self._buffer = self._buffer, []
+            if not lines:
+                return
+            self._file.write(("\n".join(lines) + "\n").encode())
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def rotate(self):
+        # later records go to a new segment; returns the segments that are complete
+        with self._io_lock:
+            with self._cond:
+                lines, self._buffer = self._buffer, []
+                if lines:
+                    self._file.write(("\n".join(lines) + "\n").encode())
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+                self._file.close()
+                self._open_segment()
+        return [p for p in list_segments(self.directory) if p != self.segment]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+
+
+def list_segments(directory):
+    names = sorted(n for n in os.listdir(directory) if n.startswith(WAL_PREFIX) and n.endswith(WAL_SUFFIX))
+    return [os.path.join(directory, n) for n in names]
+
+
+def read_segment(path):
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # torn write at the end of the last segment
+            yield record
+
+
+class PersistentStore:
+    def __init__(self, directory, snapshot_every=50000, snapshot_interval=600, **wal_options):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+        self.wal_options = wal_options
+        self.wal = None
+        self._since_snapshot = 0
+        self._last_snapshot = time.monotonic()
+        self._snapshot_thread = None
+        self._attendance_rows = None
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        seq = self.recover()
+        self.wal = WriteAheadLog(self.directory, seq, **self.wal_options)
+        ums.mutation_listeners.append(self.on_mutation)
+        return self
+
+    def recover(self):
+        seq = 0
+        replayed = 0
+        # replaying calls the normal methods, which print; keep that out of the console
+        with ums.data_lock, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            clear_state()
+            path = os.path.join(self.directory, SNAPSHOT_FILE)
+            snapshots = list_snapshots(self.directory)
+            if snapshots:
+                seq = self.attach_snapshot(snapshots[-1])
+            elif os.path.exists(path):
+                with open(path) as f:
+                    snapshot = json.load(f)
+                load_state(snapshot["state"])
+                seq = snapshot["seq"]
+            for segment in list_segments(self.directory):
+                for record in read_segment(segment):
+                    if record[0] <= seq:
+                        continue
+                    apply_record(record[1], record[2:])
+                    seq = record[0]
+                    replayed += 1
+        print(f"Recovered state from {self.directory} ({replayed} log records replayed).")
+        return seq
+
+    def attach_snapshot(self, path):
+        # the file stays mapped; entities are built from it the first time they are looked up
+        seq, sections = open_snapshot(path)
+        for label, name in REGISTRIES:
+            section = sections.get(name)
+            if section is not None and len(section):
+                getattr(ums, name).attach_lazy(LazyRecords(label, section))
+        rows = sections.get("attendance")
+        if rows is not None and len(rows):
+            self._attendance_rows = rows
+            ums.deferred_loaders.append(self.load_attendance)
+        return seq
+
+    def load_attendance(self):
+        rows, self._attendance_rows = self._attendance_rows, None
+        with building():
+            for n in range(len(rows)):
+                sid, cid, date, status = json.loads(rows.record_bytes(n))
+                student, course = ums.students.get(sid), ums.courses.get(cid)
+                if student is not None and course is not None:  # rows of removed records are left out
+                    ums.add_attendance_record(student, course, date, status)
+
+    def on_mutation(self, op, args):
+        if is_building():
+            return
+        self.wal.append(op, encode_args(op, args))
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every or \
+                time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+            self.snapshot(wait=False)
+
+    def snapshot(self, wait=True):
+        if self._snapshot_thread and self._snapshot_thread.is_alive():
+            if not wait:
+                return  # the previous snapshot is still being written
+            self._snapshot_thread.join()
+        # capture the state and cut the log at the same point, then write the file off the hot path
+        with ums.data_lock:
+            pending = self.load_attendance in ums.deferred_loaders
+            sections = capture_sections(self._attendance_rows if pending else None)
+            seq = self.wal.seq
+            done_segments = self.wal.rotate()
+            self._since_snapshot = 0
+            self._last_snapshot = time.monotonic()
+        self._snapshot_thread = threading.Thread(target=self._write_snapshot, args=(sections, seq, done_segments),
+                                                 name="snapshot-writer", daemon=True)
+        self._snapshot_thread.start()
+        if wait:
+            self._snapshot_thread.join()
+
+    def _write_snapshot(self, sections, seq, done_segments):
+        # a new file per snapshot, so the one that is still mapped is never overwritten
+        path = os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{seq:016d}{SNAPSHOT_SUFFIX}")
+        if not os.path.exists(path):
+            fsync_write(path, pack_snapshot(seq, sections))
+        for old in list_snapshots(self.directory) + [os.path.join(self.directory, SNAPSHOT_FILE)]:
+            if old != path and os.path.exists(old):
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass  # still mapped on Windows, removed after the next snapshot instead
+        for segment in done_segments:
+            os.remove(segment)
+
+    def close(self):
+        if self.on_mutation in ums.mutation_listeners:
+            ums.mutation_listeners.remove(self.on_mutation)
+        if self._snapshot_thread:
+            self._snapshot_thread.join()
+        self.wal.close()
+
+
+def open_store(directory, **options):
+    return PersistentStore(directory, **options).open()
@@ -0,0 +1,109 @@
+import asyncio
+import struct
+import threading
+
+# every message (request or reply) is a 4 byte big-endian length followed by that many bytes of UTF-8
+HEADER = struct.Struct("!I")
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+# a streamed reply is any number of "DATA <text>" messages followed by one "END <rows>" message
+STREAM_DATA = "DATA "
+STREAM_END = "END "
+
+
+def check_size(size):
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Message of {size} bytes is larger than {MAX_MESSAGE_SIZE} bytes.")
+
+
+def encode_message(text):
+    data = text.encode()
+    check_size(len(data))
+    return HEADER.pack(len(data)) + data
+
+
+def recv_exact(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            if received == 0:
+                return None  # clean disconnect between messages
+            raise ConnectionError("Connection closed in the middle of a message.")
+        received += n
+    return bytes(buf)
+
+
+def send_message(sock, text):
+    sock.sendall(encode_message(text))
+
+
+def recv_message(sock):
+    header = recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    size, = HEADER.unpack(header)
+    check_size(size)
+    if size == 0:
+        return ""
+    data = recv_exact(sock, size)
+    if data is None:
+        raise ConnectionError("Connection closed in the middle of a message.")
+    return data.decode()
+
+
+def recv_reply(sock):
+    # one reply; the parts of a streamed reply are joined into one text ending with its END line
+    msg = recv_message(sock)
+    parts = []
+    while msg is not None and msg.startswith(STREAM_DATA):
+        parts.append(msg[len(STREAM_DATA):])
+        msg = recv_message(sock)
+    if not parts:
+        return msg
+    return "\n".join(parts + [msg or ""])
+
+
+def send_pipeline(sock, messages):
+    # a thread sends every request while this one reads the replies, which come back in the same order;
+    # reading while sending keeps a large script from filling both socket buffers and blocking both sides.
+    # Stops early when the server closes the connection
+    def send_all():
+        try:
+            sock.sendall(b"".join(encode_message(m) for m in messages))
+        except OSError:
+            pass  # the server hung up, the reader sees it too
+
+    sender = threading.Thread(target=send_all, daemon=True)
+    sender.start()
+    replies = []
+    for _ in messages:
+        reply = recv_reply(sock)
+        if reply is None:
+            break
+        replies.append(reply)
+    sender.join()
+    return replies
+
+
+async def read_message(reader):
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ConnectionError("Connection closed in the middle of a message.")
+    size, = HEADER.unpack(header)
+    check_size(size)
+    try:
+        data = await reader.readexactly(size)
+    except asyncio.IncompleteReadError:
+        raise ConnectionError("Connection closed in the middle of a message.")
+    return data.decode()
+
+
+def write_message(writer, text):
+    # caller awaits writer.drain() when it wants back-pressure
+    writer.write(encode_message(text))
+
@@ -0,0 +1,375 @@
+import bisect
+import json
+import sqlite3
+import threading
+from array import array
+
+import university_management_last_version1 as ums
+import persistence
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS professors (id TEXT PRIMARY KEY, name TEXT, department TEXT, contact_info TEXT,
+                                       email TEXT, courses_taught TEXT);
+CREATE INDEX IF NOT EXISTS professors_department ON professors (department);
+CREATE TABLE IF NOT EXISTS students (id TEXT PRIMARY KEY, name TEXT, major TEXT, email TEXT);
+CREATE INDEX IF NOT EXISTS students_email ON students (lower(email));
+CREATE INDEX IF NOT EXISTS students_major ON students (major);
+CREATE TABLE IF NOT EXISTS courses (id TEXT PRIMARY KEY, name TEXT, department TEXT, credits, professor_id TEXT);
+CREATE INDEX IF NOT EXISTS courses_professor ON courses (professor_id);
+CREATE TABLE IF NOT EXISTS enrollments (student_id TEXT, course_id TEXT, course_name TEXT, grade,
+                                        UNIQUE (student_id, course_id));
+CREATE INDEX IF NOT EXISTS enrollments_course ON enrollments (course_id);
+CREATE TABLE IF NOT EXISTS course_students (course_id TEXT, student_id TEXT, UNIQUE (course_id, student_id));
+CREATE INDEX IF NOT EXISTS course_students_student ON course_students (student_id);
+CREATE TABLE IF NOT EXISTS libraries (id TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS books (library_id TEXT, title TEXT, author TEXT, category TEXT, copies INTEGER,
+                                  UNIQUE (library_id, title));
+CREATE TABLE IF NOT EXISTS library_members (library_id TEXT, student_id TEXT, name TEXT,
+                                            UNIQUE (library_id, student_id));
+CREATE TABLE IF NOT EXISTS loans (library_id TEXT, student_id TEXT, title TEXT);
+CREATE INDEX IF NOT EXISTS loans_member ON loans (library_id, student_id);
+CREATE TABLE IF NOT EXISTS attendance (student_id TEXT, course_id TEXT, date TEXT, status TEXT);
+CREATE INDEX IF NOT EXISTS attendance_student_date ON attendance (student_id, date);
+CREATE INDEX IF NOT EXISTS attendance_course ON attendance (course_id);
+CREATE TABLE IF NOT EXISTS entities (label TEXT, id TEXT, record TEXT, PRIMARY KEY (label, id));
+"""
+
+# entities without their own tables are kept as JSON in the entities table
+TABLES = {"Professor": "professors", "Student": "students", "Course": "courses", "Library": "libraries"}
+
+# (label, registry index) -> query returning matching rowids, in insertion order
+LOOKUPS = {
+    ("Student", "email"): "SELECT rowid FROM students WHERE lower(email) = ? ORDER BY rowid",
+    ("Student", "major"): "SELECT rowid FROM students WHERE major = ? ORDER BY rowid",
+    ("Professor", "department"): "SELECT rowid FROM professors WHERE department = ? ORDER BY rowid",
+    ("Department", "name"): "SELECT rowid FROM entities WHERE label = 'Department' "
+                            "AND json_extract(record, '$.name') = ? ORDER BY rowid",
+}
+
+
+def save_statements(label, item, replace=True):
+    # every row for one entity; replace clears the child rows stored before (not needed for new entities)
+    rec = persistence.entity_to_record(label, item)
+    key = rec["id"]
+    if label == "Student":
+        yield ("INSERT INTO students (id, name, major, email) VALUES (?, ?, ?, ?) ON CONFLICT (id) DO UPDATE "
+               "SET name = excluded.name, major = excluded.major, email = excluded.email",
+               (key, rec["name"], rec["major"], rec["email"]))
+        if replace:
+            yield "DELETE FROM enrollments WHERE student_id = ?", (key,)
+        for cid, (name, grade) in rec["courses"].items():
+            yield ("INSERT INTO enrollments (student_id, course_id, course_name, grade) VALUES (?, ?, ?, ?)",
+                   (key, cid, name, grade))
+    elif label == "Professor":
+        yield ("INSERT INTO professors (id, name, department, contact_info, email, courses_taught) "
+               "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET name = excluded.name, "
+               "department = excluded.department, contact_info = excluded.contact_info, email = excluded.email, "
+               "courses_taught = excluded.courses_taught",
+               (key, rec["name"], rec["department"], rec["contact_info"], rec["email"],
+                json.dumps(rec["courses_taught"])))
+    elif label == "Course":
+        yield ("INSERT INTO courses (id, name, department, credits, professor_id) VALUES (?, ?, ?, ?, ?) "
+               "ON CONFLICT (id) DO UPDATE SET name = excluded.name, department = excluded.department, "
+               "credits = excluded.credits, professor_id = excluded.professor_id",
+               (key, rec["name"], rec["department"], rec["credits"], rec["professor"]))
+        if replace:
+            yield "DELETE FROM course_students WHERE course_id = ?", (key,)
+        for sid in rec["students"]:
+            yield "INSERT INTO course_students (course_id, student_id) VALUES (?, ?)", (key, sid)
+    elif label == "Library":
+        yield "INSERT INTO libraries (id) VALUES (?) ON CONFLICT (id) DO NOTHING", (key,)
+        if replace:
+            for table in ("books", "library_members", "loans"):
+                yield f"DELETE FROM {table} WHERE library_id = ?", (key,)
+        for title, book in rec["books"].items():
+            yield ("INSERT INTO books (library_id, title, author, category, copies) VALUES (?, ?, ?, ?, ?)",
+                   (key, title, book["author"], book["category"], book["copies"]))
+        for sid, member in rec["students"].items():
+            yield "INSERT INTO library_members (library_id, student_id, name) VALUES (?, ?, ?)", (key, sid, member["name"])
+            for title in member["borrowed_books"]:
+                yield "INSERT INTO loans (library_id, student_id, title) VALUES (?, ?, ?)", (key, sid, title)
+    else:
+        yield ("INSERT INTO entities (label, id, record) VALUES (?, ?, ?) "
+               "ON CONFLICT (label, id) DO UPDATE SET record = excluded.record",
+               (label, key, json.dumps(rec)))
+
+
+def remove_statements(label, key):
+    if label == "Student":
+        yield "DELETE FROM students WHERE id = ?", (key,)
+        yield "DELETE FROM enrollments WHERE student_id = ?", (key,)
+        yield "DELETE FROM course_students WHERE student_id = ?", (key,)  # remove_student drops the rosters too
+        yield "DELETE FROM attendance WHERE student_id = ?", (key,)  # and the attendance rows
+    elif label == "Professor":
+        yield "DELETE FROM professors WHERE id = ?", (key,)
+    elif label == "Course":
+        yield "DELETE FROM courses WHERE id = ?", (key,)
+        yield "DELETE FROM course_students WHERE course_id = ?", (key,)
+    elif label == "Library":
+        for table in ("books", "library_members", "loans"):
+            yield f"DELETE FROM {table} WHERE library_id = ?", (key,)
+        yield "DELETE FROM libraries WHERE id = ?", (key,)
+    else:
+        yield "DELETE FROM entities WHERE label = ? AND id = ?", (label, key)
+
+
+def book_statement(library_id, title):
+    book = ums.libraries.get(library_id)._books[title]
+    return ("INSERT INTO books (library_id, title, author, category, copies) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (library_id, title) DO UPDATE SET copies = excluded.copies",
+            (library_id, title, book["author"], book["category"], book["copies"]))
+
+
+def status_statement(sid, date, status, course_id=None):
+    if course_id is None:
+        return "UPDATE attendance SET status = ? WHERE student_id = ? AND date = ?", (status, sid, date)
+    return ("UPDATE attendance SET status = ? WHERE student_id = ? AND date = ? AND course_id = ?",
+            (status, sid, date, course_id))
+
+
+def taught_statements(label, items):
+    # Course() appends to its professor's courses_taught, which lives in the professor's row
+    if label != "Course":
+        return []
+    professors = {id(course.professor): course.professor for course in items}
+    return [stmt for professor in professors.values() for stmt in save_statements("Professor", professor)]
+
+
+def mutation_statements(op, args):
+    # runs inside the mutation, so values read from the objects are the ones just written
+    if op in ("add", "update"):
+        label, item = args
+        return list(save_statements(label, item, replace=op == "update")) + taught_statements(label, [item])
+    if op == "add_many":
+        label, items = args
+        return [stmt for item in items for stmt in save_statements(label, item, replace=False)] + \
+            taught_statements(label, items)
+    if op == "remove":
+        label, key = args
+        return list(remove_statements(label, key))
+    if op == "enroll":
+        sid, cid, name = args
+        return [("INSERT INTO enrollments (student_id, course_id, course_name, grade) VALUES (?, ?, ?, NULL) "
+                 "ON CONFLICT DO NOTHING", (sid, cid, name))]
+    if op == "drop_course":
+        return [("DELETE FROM enrollments WHERE student_id = ? AND course_id = ?", tuple(args))]
+    if op == "grade":
+        sid, cid, grade = args
+        return [("UPDATE enrollments SET grade = ? WHERE student_id = ? AND course_id = ?", (grade, sid, cid))]
+    if op == "course_add_student":
+        return [("INSERT INTO course_students (course_id, student_id) VALUES (?, ?) ON CONFLICT DO NOTHING",
+                 tuple(args))]
+    if op == "course_remove_student":
+        cid, sid = args  # Course.remove_student drops the student's enrollment as well
+        return [("DELETE FROM course_students WHERE course_id = ? AND student_id = ?", (cid, sid)),
+                ("DELETE FROM enrollments WHERE student_id = ? AND course_id = ?", (sid, cid))]
+    if op in ("department_course", "department_professor", "department_remove_professor"):
+        return list(save_statements("Department", ums.departments.get(args[0])))
+    if op == "schedule_update":
+        return list(save_statements("Schedule", ums.schedules.get(args[0])))
+    if op == "allocate_class":
+        return list(save_statements("Classroom", ums.classrooms.get(args[0])))
+    if op == "exam_result":
+        return list(save_statements("Exam", ums.exams.get(args[0])))
+    if op == "add_book":
+        library_id, title = args[:2]
+        return [book_statement(library_id, title)]
+    if op == "library_register":
+        return [("INSERT INTO library_members (library_id, student_id, name) VALUES (?, ?, ?) "
+                 "ON CONFLICT DO NOTHING", tuple(args))]
+    if op == "borrow_book":
+        library_id, sid, title = args
+        return [book_statement(library_id, title),
+                ("INSERT INTO loans (library_id, student_id, title) VALUES (?, ?, ?)", (library_id, sid, title))]
+    if op == "return_book":
+        library_id, sid, title = args
+        return [book_statement(library_id, title),
+                ("DELETE FROM loans WHERE rowid = (SELECT rowid FROM loans WHERE library_id = ? AND student_id = ? "
+                 "AND title = ? ORDER BY rowid LIMIT 1)", (library_id, sid, title))]
+    if op == "attendance":
+        return [("INSERT INTO attendance (student_id, course_id, date, status) VALUES (?, ?, ?, ?)", tuple(args))]
+    if op == "attendance_batch":
+        cid, date, statuses = args
+        return [("INSERT INTO attendance (student_id, course_id, date, status) VALUES (?, ?, ?, ?)",
+                 (sid, cid, date, status)) for sid, status in statuses]
+    if op == "attendance_status":
+        return [status_statement(*args)]
+    if op == "attendance_statuses":
+        corrections, = args
+        return [status_statement(*correction) for correction in corrections]
+    raise ValueError(f"Unknown mutation '{op}'.")
+
+
+class TableRecords:
+    # what Registry.attach_lazy expects, backed by the rows that were in the database when it was opened
+    def __init__(self, store, label):
+        self.store = store
+        self.label = label
+        self.table = TABLES.get(label)
+        if self.table:
+            rows = store.query(f"SELECT rowid FROM {self.table} ORDER BY rowid")
+        else:
+            rows = store.query("SELECT rowid FROM entities WHERE label = ? ORDER BY rowid", (label,))
+        self.rowids = array("q", (rowid for rowid, in rows))
+
+    def __len__(self):
+        return len(self.rowids)
+
+    def _number(self, rowid):
+        n = bisect.bisect_left(self.rowids, rowid)
+        return n if n < len(self.rowids) and self.rowids[n] == rowid else None
+
+    def key_at(self, n):
+        if self.table:
+            return self.store.query(f"SELECT id FROM {self.table} WHERE rowid = ?", (self.rowids[n],))[0][0]
+        return self.store.query("SELECT id FROM entities WHERE rowid = ?", (self.rowids[n],))[0][0]
+
+    def lookup(self, index, value):
+        found = self.lookup_all(index, value)
+        return found[0] if found else None
+
+    def lookup_all(self, index, value):
+        if index == "id":
+            if self.table:
+                rows = self.store.query(f"SELECT rowid FROM {self.table} WHERE id = ?", (value,))
+            else:
+                rows = self.store.query("SELECT rowid FROM entities WHERE label = ? AND id = ?", (self.label, value))
+        else:
+            rows = self.store.query(LOOKUPS[(self.label, index)], (value,))
+        # rows added after opening are already in memory
+        found = (self._number(rowid) for rowid, in rows)
+        return [n for n in found if n is not None]
+
+    def load(self, n):
+        with persistence.building():
+            return persistence.record_to_entity(self.label, self.read_record(self.rowids[n]))
+
+    def read_record(self, rowid):
+        query = self.store.query
+        if self.label == "Student":
+            (key, name, major, email), = query("SELECT id, name, major, email FROM students WHERE rowid = ?", (rowid,))
+            courses = {cid: [course_name, grade] for cid, course_name, grade in query(
+                "SELECT course_id, course_name, grade FROM enrollments WHERE student_id = ? ORDER BY rowid", (key,))}
+            return {"id": key, "name": name, "major": major, "email": email, "courses": courses}
+        if self.label == "Professor":
+            (key, name, department, contact_info, email, taught), = query(
+                "SELECT id, name, department, contact_info, email, courses_taught FROM professors WHERE rowid = ?",
+                (rowid,))
+            return {"id": key, "name": name, "department": department, "contact_info": contact_info,
+                    "email": email, "courses_taught": json.loads(taught)}
+        if self.label == "Course":
+            (key, name, department, credits, professor), = query(
+                "SELECT id, name, department, credits, professor_id FROM courses WHERE rowid = ?", (rowid,))
+            students = [sid for sid, in query(
+                "SELECT student_id FROM course_students WHERE course_id = ? ORDER BY rowid", (key,))]
+            return {"id": key, "name": name, "department": department, "credits": credits,
+                    "professor": professor, "students": students}
+        if self.label == "Library":
+            (key,), = query("SELECT id FROM libraries WHERE rowid = ?", (rowid,))
+            books = {title: {"author": author, "category": category, "copies": copies}
+                     for title, author, category, copies in query(
+                         "SELECT title, author, category, copies FROM books WHERE library_id = ? ORDER BY rowid",
+                         (key,))}
+            members = {sid: {"name": name, "borrowed_books": []} for sid, name in query(
+                "SELECT student_id, name FROM library_members WHERE library_id = ? ORDER BY rowid", (key,))}
+            for sid, title in query("SELECT student_id, title FROM loans WHERE library_id = ? ORDER BY rowid", (key,)):
+                members[sid]["borrowed_books"].append(title)
+            return {"id": key, "books": books, "students": members}
+        (record,), = query("SELECT record FROM entities WHERE rowid = ?", (rowid,))
+        return json.loads(record)
+
+
+class SqliteStore:
+    # the registries stay the working set; rows are built into objects the first time they are looked up,
+    # and every change is queued and written by a background thread in batched transactions
+    def __init__(self, path, batch_size=1000, flush_interval=0.05):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = None
+        self._db_lock = threading.Lock()
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    def open(self):
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        with ums.data_lock:
+            persistence.clear_state()
+            for label, name in persistence.REGISTRIES:
+                source = TableRecords(self, label)
+                if len(source):
+                    getattr(ums, name).attach_lazy(source)
+            if self.query("SELECT 1 FROM attendance LIMIT 1"):
+                ums.deferred_loaders.append(self.load_attendance)
+        ums.mutation_listeners.append(self.on_mutation)
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+        print(f"Using database {self.path}.")
+        return self
+
+    def query(self, sql, params=()):
+        with self._db_lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def load_attendance(self):
+        rows = self.query("SELECT student_id, course_id, date, status FROM attendance ORDER BY rowid")
+        with persistence.building():
+            for sid, cid, date, status in rows:
+                student, course = ums.students.get(sid), ums.courses.get(cid)
+                if student is not None and course is not None:  # rows of removed records are left out
+                    ums.add_attendance_record(student, course, date, status)
+
+    def on_mutation(self, op, args):
+        if persistence.is_building():
+            return
+        statements = mutation_statements(op, args)
+        with self._cond:
+            self._pending.extend(statements)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self):
+        # one transaction for everything queued; runs of the same statement go through executemany
+        with self._db_lock:
+            with self._cond:
+                statements, self._pending = self._pending, []
+            if not statements:
+                return
+            with self.conn:
+                start = 0
+                while start < len(statements):
+                    sql = statements[start][0]
+                    end = start
+                    while end < len(statements) and statements[end][0] == sql:
+                        end += 1
+                    self.conn.executemany(sql, [params for _, params in statements[start:end]])
+                    start = end
+
+    def close(self):
+        if self.on_mutation in ums.mutation_listeners:
+            ums.mutation_listeners.remove(self.on_mutation)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+        self.conn.close()
+
+
+def open_database(path, **options):
+    return SqliteStore(path, **options).open()
@@ -0,0 +1,89 @@
+import json
+import threading
+import unittest
+
+import analytics
+import university_management_last_version1 as ums
+from attendance_store import AttendanceStore, day_ordinal
+
+
+class TestAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.store = AttendanceStore()
+        professor = ums.Professor("p1", "Dr. Ali", "CS", "555", "a@b.c")
+        self.intro = ums.Course("CS101", "Intro", "CS", 3, professor)
+        self.math = ums.Course("MATH1", "Calculus", "Math", 3, professor)
+        self.asma = ums.Student("1", "Asma", "CS", "asma@mail.com")
+        self.omar = ums.Student("2", "Omar", "CS", "omar@mail.com")
+        # 2025-01-06 is a Monday; Asma misses the Wednesdays in MATH1, Omar attends everything
+        for week in range(2):
+            for offset, weekday in [(0, "Mon"), (2, "Wed")]:
+                day = day_ordinal("2025-01-06") + 7 * week + offset
+                self.store.append("1", self.asma, "CS101", self.intro, day, True)
+                self.store.append("1", self.asma, "MATH1", self.math, day, weekday == "Mon")
+                self.store.append("2", self.omar, "MATH1", self.math, day, True)
+
+    def check(self):
+        self.assertEqual(analytics.course_rates(self.store)["MATH1"], {"present": 6, "total": 8, "rate": 75.0})
+        self.assertEqual(analytics.course_rates(self.store)["CS101"]["rate"], 100.0)
+        risk = analytics.at_risk(self.store)
+        self.assertEqual([(r["Student ID"], r["Course ID"], r["Rate"]) for r in risk], [("1", "MATH1", 50.0)])
+        self.assertEqual(analytics.at_risk(self.store, 40), [])
+        trends = analytics.weekly_trends(self.store)
+        self.assertEqual([(w["week"], w["present"], w["total"]) for w in trends["1"]],
+                         [("2025-01-06", 3, 4), ("2025-01-13", 3, 4)])
+        self.assertEqual(list(analytics.weekly_trends(self.store, "2")), ["2"])
+        self.assertEqual(analytics.weekly_trends(self.store, "2", cols=analytics.columns(self.store)),
+                         analytics.weekly_trends(self.store, "2"))
+        self.assertEqual(analytics.weekly_trends(self.store, "9"), {})
+        self.assertEqual(analytics.weekday_heatmap(self.store, "MATH1"), {"MATH1": {"Mon": 100.0, "Wed": 50.0}})
+        self.assertEqual([s["From"] for s in analytics.absence_streaks(self.store, 1, "MATH1")],
+                         ["2025-01-08", "2025-01-15"])
+        self.assertEqual(analytics.absence_streaks(self.store, 2), [])
+
+    @unittest.skipIf(analytics.np is None, "numpy is not installed")
+    def test_figures(self):
+        self.check()
+
+    def test_figures_without_numpy(self):
+        saved = analytics.np
+        analytics.np = None
+        try:
+            self.check()
+        finally:
+            analytics.np = saved
+
+    def test_server_command(self):
+        try:
+            ums.process_command("ADD_STUDENT 1,Asma,CS,asma@mail.com")
+            ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+            ums.process_command("ADD_COURSE CS101,Intro,CS,3,p1")
+            ums.process_command("RECORD_ATTENDANCE 1,CS101,2025-01-06,Absent")
+            resp, _ = ums.process_command("ATTENDANCE_ANALYTICS at_risk")
+            self.assertEqual(json.loads(resp)[0]["Rate"], 0.0)
+            # another thread holding data_lock does not hold the report up
+            held, done = threading.Event(), threading.Event()
+
+            def hold_lock():
+                with ums.data_lock:
+                    held.set()
+                    done.wait(5)
+            holder = threading.Thread(target=hold_lock)
+            holder.start()
+            held.wait(5)
+            try:
+                report = json.loads(ums.process_command("ATTENDANCE_ANALYTICS nightly")[0])
+            finally:
+                done.set()
+                holder.join()
+            self.assertEqual(report["courses"]["CS101"]["total"], 1)
+            self.assertTrue(ums.process_command("ATTENDANCE_ANALYTICS at_risk,high")[0].startswith("ERROR"))
+            self.assertTrue(ums.process_command("ATTENDANCE_ANALYTICS monthly")[0].startswith("ERROR"))
+        finally:
+            for registry in [ums.students, ums.professors, ums.courses, ums.attendance_store]:
+                registry.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+
+import university_management_last_version1 as ums
+from attendance_store import AttendanceStore, day_ordinal, day_text
+
+
+class TestAttendanceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = AttendanceStore()
+        self.asma = ums.Student("1", "Asma", "CS", "asma@mail.com")
+        self.omar = ums.Student("2", "Omar", "CS", "omar@mail.com")
+        self.course = ums.Course("CS101", "Intro", "CS", 3, ums.Professor("p1", "Dr. Ali", "CS", "555", "a@b.c"))
+
+    def tearDown(self):
+        ums.attendance_store.clear()
+
+    def test_day_ordinals(self):
+        self.assertEqual(day_text(day_ordinal("2025-03-01")), "2025-03-01")
+        with self.assertRaises(ValueError):
+            day_ordinal("01/03/2025")
+
+    def test_rows_and_counts(self):
+        for i, present in enumerate([True, False, True]):
+            self.store.append("1", self.asma, "CS101", self.course, day_ordinal(f"2025-01-0{i + 1}"), present)
+        self.store.append("2", self.omar, "CS101", self.course, day_ordinal("2025-01-01"), False)
+        rows = self.store.rows_where(student_id="1")
+        self.assertEqual(rows, [0, 1, 2])
+        self.assertEqual(sorted(self.store.rows_where(course_id="CS101", day=day_ordinal("2025-01-01"))), [0, 3])
+        self.assertEqual(self.store.rows_where(student_id="9"), [])
+        self.assertEqual(list(self.store.by_course[self.store.course_codes["CS101"]]), [0, 3, 1, 2])
+        self.assertEqual(self.store.rows_where(student_id="2", course_id="CS101"), [3])
+        self.assertEqual(self.store.counts("1"), (2, 3))
+        self.assertTrue(self.store.set_present(1, True))
+        self.assertFalse(self.store.set_present(1, True))
+        self.assertEqual(self.store.counts("1"), (3, 3))
+        self.assertEqual(self.store.counts("1", "CS101"), (3, 3))
+        self.assertEqual(self.store.counts("2", "CS101"), (0, 1))
+        self.assertEqual(self.store.counts("2", "MATH1"), (0, 0))
+
+    def test_report_and_proxy_share_the_columns(self):
+        report = ums.AttendanceReport()
+        report.add_attendance(ums.Attendance(self.asma, self.course, "2025-01-01", "Absent"))
+        report.add_attendance(ums.Attendance(self.asma, self.course, "2025-01-02", "Present"))
+        self.assertEqual(report.calculate_attendance_percentage(self.asma, self.course), 50)
+        proxy = ums.AttendanceProxy("admin")
+        self.assertTrue(proxy.attendance_records.store is report.attendance_records.store)
+        self.assertTrue(proxy.update_status("1", "2025-01-01", "Present"))
+        self.assertEqual(report.calculate_attendance_percentage(self.asma), 100)
+        self.assertEqual([r["Status"] for r in report.get_course_attendance(self.course)], ["Present", "Present"])
+        self.assertEqual(report.attendance_records[-1].get_date(), "2025-01-02")
+        report.attendance_records[-1].set_status("Absent")
+        self.assertEqual(report.attendance_records[-1].get_status(), "Absent")
+        self.assertEqual(report.calculate_attendance_percentage(self.asma), 50)
+        with self.assertRaises(ValueError):
+            report.attendance_records[0].set_date("2025-02-01")
+
+    def test_keyed_and_bulk_corrections(self):
+        other = ums.Course("MATH1", "Calculus", "Math", 3, ums.Professor("p2", "Dr. Sara", "Math", "556", "s@b.c"))
+        report = ums.AttendanceReport()
+        for course in (self.course, other):
+            report.add_attendance(ums.Attendance(self.asma, course, "2025-01-01", "Absent"))
+        report.add_attendance(ums.Attendance(self.omar, self.course, "2025-01-01", "Absent"))
+        proxy = ums.AttendanceProxy("professor")
+        self.assertTrue(proxy.update_status("1", "2025-01-01", "Present", "MATH1"))
+        self.assertEqual(report.attendance_records.store.counts("1"), (1, 2))
+        result = proxy.update_statuses([("1", "2025-01-01", "Present"),
+                                        ("2", "2025-01-01", "Present", "CS101"),
+                                        ("2", "2025-01-02", "Present"),
+                                        ("2", "01/01/2025", "Present"),
+                                        ("2", "2025-01-01")])
+        # asma's MATH1 row was already present, so only two rows changed
+        self.assertEqual(result["updated"], 2)
+        self.assertEqual([f["record"][1] for f in result["failed"]], ["2025-01-02", "01/01/2025", "2025-01-01"])
+        self.assertEqual(proxy.update_statuses([("1", "2025-01-01", "Present")]), {"updated": 0, "failed": []})
+        self.assertEqual(report.attendance_records.store.counts("2"), (1, 1))
+        self.assertIsNone(ums.AttendanceProxy("student").update_statuses([]))
+        with self.assertRaises(PermissionError):
+            ums.AttendanceProxy("student").add_record(ums.Attendance(self.omar, other, "2025-01-03", "Present"))
+        ums.AttendanceProxy("admin").add_record(ums.Attendance(self.omar, other, "2025-01-03", "Present"))
+        self.assertEqual(ums.get_attendance_report().attendance_records.store.counts("2"), (2, 2))
+
+    def test_remove_student_renumbers_the_rows(self):
+        report = ums.AttendanceReport(ums.AttendanceRecords(self.store))
+        for day, student in [(1, self.asma), (1, self.omar), (2, self.omar), (2, self.asma), (3, self.asma)]:
+            report.add_attendance(ums.Attendance(student, self.course, f"2025-01-0{day}", "Present"))
+        self.assertEqual(self.store.remove_student("2"), 2)
+        self.assertEqual(self.store.counts("2"), (0, 0))
+        self.assertEqual(self.store.counts("1", "CS101"), (3, 3))
+        self.assertEqual(self.store.rows_on("1", day_ordinal("2025-01-02")), [1])
+        self.assertEqual(self.store.rows_where(course_id="CS101"), [0, 1, 2])
+        self.assertEqual(self.store.remove_student("2"), 0)
+
+    def test_date_ranges_and_absence_streaks(self):
+        report = ums.AttendanceReport()
+        statuses = ["Present", "Absent", "Absent", "Absent", "Present", "Absent"]
+        for day in [3, 1, 2, 6, 5, 4]:  # out of order on purpose
+            report.add_attendance(ums.Attendance(self.asma, self.course, f"2025-01-0{day}", statuses[day - 1]))
+        week = report.get_attendance_between("2025-01-02", "2025-01-04", course=self.course)
+        self.assertEqual([r["Date"] for r in week], ["2025-01-02", "2025-01-03", "2025-01-04"])
+        self.assertEqual(report.get_attendance_between("2025-02-01", "2025-02-07", student=self.asma), [])
+        streaks = report.get_absence_streaks(3)
+        self.assertEqual([(s["From"], s["To"], s["Days"]) for s in streaks], [("2025-01-02", "2025-01-04", 3)])
+        self.assertEqual(report.get_absence_streaks(1, self.course)[-1]["From"], "2025-01-06")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import university_management_last_version1 as ums
+import bulk_import
+
+
+class TestBulkImport(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for registry in [ums.students, ums.professors, ums.courses, ums.departments]:
+            registry.clear()
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_csv_students_with_rejected_rows(self):
+        ums.students.add(ums.Student("9", "Old", "CS", "taken@mail.com"))
+        path = self.write("students.csv", "id,name,major,email\n"
+                                          "1,Asma,CS,asma@mail.com\n"
+                                          "2,Omar,Math,no-email\n"
+                                          "1,Again,CS,again@mail.com\n"
+                                          "3,Copy,CS,TAKEN@mail.com\n"
+                                          "4,Lina,Physics,lina@mail.com\n")
+        report = bulk_import.import_file(path, "students", chunk_size=2)
+        self.assertEqual((report["rows"], report["imported"], report["rejected"]), (5, 2, 3))
+        self.assertEqual([r["line"] for r in report["rejects"]], [3, 4, 5])
+        self.assertEqual(ums.students.ids(), ["9", "1", "4"])
+        self.assertEqual(ums.find_student_by_email("lina@mail.com").name, "Lina")
+
+    def test_jsonl_professors_and_courses(self):
+        ums.departments.add(ums.Department("d1", "CS", "Dr. Ali"))
+        professors = self.write("professors.jsonl", '{"id": "p1", "name": "Dr. Ali", "department": "CS", '
+                                                    '"contact_info": "555", "email": "ali@mail.com"}\n'
+                                                    'not json\n')
+        courses = self.write("courses.jsonl", '{"id": "CS101", "name": "Intro", "department": "CS", '
+                                              '"credits": 3, "professor_id": "p1"}\n'
+                                              '{"id": "CS102", "name": "Data", "department": "CS", '
+                                              '"credits": 3, "professor_id": "nobody"}\n')
+        self.assertEqual(bulk_import.import_file(professors, "professors")["rejected"], 1)
+        report = bulk_import.import_file(courses, "courses")
+        self.assertEqual(report["imported"], 1)
+        self.assertEqual(ums.courses.get("CS101").professor, ums.professors.get("p1"))
+        self.assertEqual(ums.courses.get("CS101").credits, "3")
+        department = ums.departments.get("d1")
+        self.assertEqual([c.course_id for c in department.courses_offered], ["CS101"])
+        self.assertEqual(len(department.faculty_members), 1)
+
+    def test_import_command_reads_only_the_import_directory(self):
+        saved = ums.IMPORT_DIR
+        ums.IMPORT_DIR = self.directory
+        try:
+            self.write("students.csv", "id,name,major,email\n1,Asma,CS,asma@mail.com\n")
+            resp, _ = ums.process_command("IMPORT_FILE students,students.csv")
+            self.assertEqual(json.loads(resp)["imported"], 1)
+            self.assertIn("IMPORT_FILE", ums.UNLOCKED)
+            resp, _ = ums.process_command("IMPORT_FILE students,none.csv")
+            self.assertTrue(resp.startswith("ERROR: Cannot read"))
+            outside = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+            outside.close()
+            try:
+                for path in [outside.name, os.path.join("..", os.path.basename(outside.name))]:
+                    resp, _ = ums.process_command(f"IMPORT_FILE students,{path}")
+                    self.assertIn("only files in the import directory", resp)
+            finally:
+                os.remove(outside.name)
+        finally:
+            ums.IMPORT_DIR = saved
+
+
+if __name__ == '__main__':
+    unittest.main()
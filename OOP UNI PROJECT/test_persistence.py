@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import university_management_last_version1 as ums
+import persistence
+
+
+class TestPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = persistence.open_store(self.directory, snapshot_every=4)
+
+    def tearDown(self):
+        if self.store:
+            self.store.close()
+        persistence.clear_state()
+        shutil.rmtree(self.directory)
+
+    def run_commands(self, *commands):
+        for cmd in commands:
+            resp, _ = ums.process_command(cmd)
+            self.assertFalse(resp.startswith("ERROR"), f"{cmd} -> {resp}")
+
+    def reopen(self):
+        self.store.close()
+        persistence.clear_state()
+        self.store = persistence.open_store(self.directory)
+
+    def test_state_survives_restart(self):
+        self.run_commands("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com",
+                          "ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com",
+                          "ADD_COURSE CS101,Intro,CS,3,p1",
+                          "ENROLL 1,CS101",
+                          "ENROLL 2,CS101",
+                          "DROP 2,CS101",
+                          "ADD_LIBRARY L1",
+                          "ADD_BOOK L1,Dune,Herbert,Fiction,2",
+                          "REGISTER_LIBRARY L1,1",
+                          "BORROW_BOOK L1,1,Dune",
+                          "RECORD_ATTENDANCE 1,CS101,2025-01-01,Absent",
+                          "UPDATE_ATTENDANCE admin,1,2025-01-01,Present",
+                          "RECORD_ATTENDANCE 1,CS101,2025-01-02,Present",
+                          "UPDATE_ATTENDANCE_BATCH admin;1,2025-01-02,Absent,CS101",
+                          "ROLL_CALL CS101,2025-01-03,1",
+                          "ADD_CLASSROOM r1,Hall A,120",
+                          "ADD_SCHEDULE CS101,p1,r1,Mon 9-11",
+                          "UPDATE_SCHEDULE sch_1,Mon 10-12")
+        before = persistence.dump_state()
+        self.reopen()
+        self.assertEqual(persistence.dump_state(), before)
+        self.assertEqual(list(ums.courses.get("CS101").enrolled_students), ["1"])
+        self.assertFalse(ums.classrooms.get("r1").check_availability("Mon 11-13"))
+        self.assertEqual(ums.libraries.get("L1")._books["Dune"]["copies"], 1)
+
+    def test_snapshot_truncates_the_log(self):
+        self.run_commands(*[f"ADD_STUDENT {i},Student {i},CS,s{i}@mail.com" for i in range(10)])
+        self.store.snapshot()
+        segments = persistence.list_segments(self.directory)
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(os.path.getsize(segments[0]), 0)
+        self.reopen()
+        self.assertEqual(len(ums.students), 10)
+
+    def test_torn_last_record_is_ignored(self):
+        self.run_commands("ADD_STUDENT 1,Asma,CS,asma@mail.com")
+        self.store.wal.flush()
+        with open(self.store.wal.segment, "ab") as f:
+            f.write(b'[99,"add","Stud')
+        self.reopen()
+        self.assertEqual(ums.students.ids(), ["1"])
+
+    def test_snapshot_records_are_built_on_demand(self):
+        self.run_commands(*[f"ADD_STUDENT {i},Student {i},CS,s{i}@mail.com" for i in range(10)])
+        self.store.snapshot()
+        self.reopen()
+        self.assertEqual(len(ums.students), 10)
+        self.assertEqual(ums.students.get("3").name, "Student 3")
+        self.assertEqual(ums.find_student_by_email("S7@mail.com").get_id(), "7")
+        self.assertEqual(len(ums.students._items), 2)
+        with self.assertRaises(ValueError):
+            ums.students.add(ums.Student("x", "Copy", "CS", "s5@mail.com"))
+        self.assertEqual(ums.students.ids(), [str(i) for i in range(10)])
+
+    def test_snapshot_of_unbuilt_records_survives_restart(self):
+        self.run_commands("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com",
+                          "ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com",
+                          "ADD_COURSE CS101,Intro,CS,3,p1",
+                          "ENROLL 1,CS101",
+                          "RECORD_ATTENDANCE 1,CS101,2025-01-01,Absent")
+        before = persistence.dump_state()
+        self.store.snapshot()
+        self.reopen()
+        self.run_commands("UPDATE_STUDENT 2,major,Physics")
+        self.store.snapshot()
+        self.reopen()
+        before["students"][1]["major"] = "Physics"
+        self.assertEqual(persistence.dump_state(), before)
+        self.assertEqual(len(persistence.list_snapshots(self.directory)), 1)
+
+    def test_short_batch_line_keeps_earlier_corrections(self):
+        self.run_commands("ADD_STUDENT 1,Asma,CS,asma@mail.com",
+                          "ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com",
+                          "ADD_COURSE CS101,Intro,CS,3,p1",
+                          "ENROLL 1,CS101",
+                          "RECORD_ATTENDANCE 1,CS101,2025-01-01,Absent",
+                          "UPDATE_ATTENDANCE_BATCH admin;1,2025-01-01,Present;1,2025-01-02")
+        self.reopen()
+        self.assertEqual(ums.get_attendance_report().calculate_attendance_percentage(ums.students.get("1")), 100)
+
+    def test_legacy_classroom_records(self):
+        self.run_commands("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com",
+                          "ADD_COURSE CS101,Intro,CS,3,p1")
+        ums.schedules.add(ums.Schedule("sch_1", ums.courses.get("CS101"), ums.professors.get("p1"), "mornings",
+                                       "Hall A"))
+        with persistence.building():
+            for rec in [{"id": "r1", "location": "Hall A", "capacity": "120 seats", "schedule": ["sch_1"]},
+                        {"id": "r2", "location": "Lab", "capacity": "big", "schedule": []}]:
+                ums.classrooms.add(persistence.record_to_entity("Classroom", rec))
+        self.assertEqual([r.capacity for r in ums.classrooms], [120, 0])
+        self.assertEqual(ums.find_free_rooms("Tue 9-11"), [ums.classrooms.get("r2")])
+        self.assertTrue(ums.schedules.get("sch_1").update_schedule("Mon 9-11"))
+        self.assertEqual([r.classroom_id for r in ums.find_free_rooms("Tue 9-11")], ["r2", "r1"])
+        self.assertEqual(ums.find_free_rooms("Mon 10-12"), [ums.classrooms.get("r2")])
+
+    def test_logged_schedule_update_replays_without_clash_checks(self):
+        self.run_commands("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com",
+                          "ADD_COURSE CS101,Intro,CS,3,p1",
+                          "ADD_COURSE CS102,Data,CS,3,p1",
+                          "ADD_CLASSROOM r1,Hall A,120",
+                          "ADD_SCHEDULE CS101,p1,r1,Mon 9-11",
+                          "ADD_SCHEDULE CS102,p1,r1,Tue 9-11")
+        ums.log_mutation("schedule_update", "sch_2", "Mon 10-12", None)  # written before clashes were checked
+        self.reopen()
+        self.assertEqual(ums.schedules.get("sch_2").get_time_slot(), "Mon 10-12")
+        self.assertEqual({c["Type"] for c in ums.term_conflicts()}, {"room", "professor"})
+        self.assertTrue(ums.classrooms.get("r1").check_availability("Tue 9-11"))
+
+    def test_removed_student_attendance_after_restart(self):
+        self.run_commands("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com",
+                          "ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com",
+                          "ADD_COURSE CS101,Intro,CS,3,p1",
+                          "RECORD_ATTENDANCE 1,CS101,2025-01-01,Present",
+                          "RECORD_ATTENDANCE 2,CS101,2025-01-01,Absent")
+        self.store.snapshot()
+        self.run_commands("REMOVE_STUDENT 2")
+        self.assertEqual(len(ums.attendance_store), 1)
+        self.reopen()
+        self.run_commands("RECORD_ATTENDANCE 1,CS101,2025-01-02,Absent")
+        self.assertEqual(persistence.dump_state()["attendance"],
+                         [["1", "CS101", "2025-01-01", "Present"], ["1", "CS101", "2025-01-02", "Absent"]])
+        self.store.snapshot()
+        self.reopen()
+        self.assertEqual(ums.get_attendance_report().calculate_attendance_percentage(ums.students.get("1")), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import socket
+import threading
+import unittest
+
+import university_management_last_version1 as ums
+from protocol import send_message, recv_message, send_pipeline, encode_message
+
+
+class TestProtocol(unittest.TestCase):
+
+    def setUp(self):
+        self.client, self.server = socket.socketpair()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        ums.students.clear()
+
+    def test_message_round_trip(self):
+        send_message(self.client, "GET_STUDENT_INFO 1")
+        self.assertEqual(recv_message(self.server), "GET_STUDENT_INFO 1")
+
+    def test_large_message_is_not_truncated(self):
+        text = "x" * 200000
+        sender = threading.Thread(target=send_message, args=(self.client, text))
+        sender.start()
+        self.assertEqual(recv_message(self.server), text)
+        sender.join()
+
+    def test_back_to_back_messages_stay_separate(self):
+        self.client.sendall(encode_message("GET_STUDENT_COUNT") + encode_message("QUIT"))
+        self.assertEqual(recv_message(self.server), "GET_STUDENT_COUNT")
+        self.assertEqual(recv_message(self.server), "QUIT")
+
+    def test_disconnect_returns_none(self):
+        self.client.close()
+        self.assertIsNone(recv_message(self.server))
+
+    def test_pipelined_replies_come_back_in_order(self):
+        worker = threading.Thread(target=ums.handle_client, args=(self.server, ("127.0.0.1", 0)))
+        worker.start()
+        replies = send_pipeline(self.client, ["ADD_STUDENT p1,Asma,CS,asma@mail.com",
+                                              "GET_STUDENT_INFO p1",
+                                              "GET_STUDENT_INFO missing",
+                                              "QUIT"])
+        worker.join()
+        self.assertTrue(replies[0].startswith("SUCCESS"))
+        self.assertIn('"ID": "p1"', replies[1])
+        self.assertTrue(replies[2].startswith("ERROR"))
+        self.assertEqual(replies[3], "INFO: Disconnecting.")
+
+    def test_streamed_reply_in_a_pipeline(self):
+        worker = threading.Thread(target=ums.handle_client, args=(self.server, ("127.0.0.1", 0)))
+        worker.start()
+        replies = send_pipeline(self.client, ["ADD_STUDENTS p1,Asma,CS,asma@mail.com;p2,Omar,CS,omar@mail.com",
+                                              "EXPORT students",
+                                              "GET_STUDENT_COUNT",
+                                              "QUIT"])
+        worker.join()
+        lines = replies[1].split("\n")
+        self.assertEqual(lines[-1], "END 2")
+        self.assertEqual([json.loads(line)["ID"] for line in lines[:-1]], ["p1", "p2"])
+        self.assertEqual(replies[3], "INFO: Disconnecting.")
+
+    def test_pipeline_larger_than_the_socket_buffers(self):
+        worker = threading.Thread(target=ums.handle_client, args=(self.server, ("127.0.0.1", 0)))
+        worker.start()
+        commands = ["ADD_STUDENT p1,Asma,CS,asma@mail.com"] + ["GET_STUDENT_INFO p1"] * 20000 + ["QUIT"]
+        replies = send_pipeline(self.client, commands)
+        worker.join()
+        self.assertEqual(len(replies), 20002)
+        self.assertEqual(replies[-1], "INFO: Disconnecting.")
+
+    def test_async_server_streams_off_the_event_loop(self):
+        threads = []
+
+        def rows():
+            threads.append(threading.current_thread())
+            yield "DATA one"
+            threads.append(threading.current_thread())
+            yield "END 1"
+
+        ums.STREAMS["TEST_STREAM"] = (lambda: (threads.append(threading.current_thread()), rows())[1], ums.no_args)
+
+        async def run():
+            server = await asyncio.start_server(ums.handle_async_client, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                with socket.create_connection(("127.0.0.1", port)) as sock:
+                    return await asyncio.to_thread(send_pipeline, sock, ["TEST_STREAM", "GET_STUDENT_COUNT", "QUIT"])
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        try:
+            replies = asyncio.run(run())
+        finally:
+            del ums.STREAMS["TEST_STREAM"]
+        self.assertEqual(replies, ["one\nEND 1", "COUNT: 0", "INFO: Disconnecting."])
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.main_thread(), threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from university_management_last_version1 import Registry, Student
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry("Student", Student.get_id)
+        self.registry.add_index("email", lambda s: s.email, unique=True)
+        self.registry.add_index("major", lambda s: s._major)
+        self.asma = self.registry.add(Student("1", "Asma", "CS", "asma@mail.com"))
+        self.omar = self.registry.add(Student("2", "Omar", "Math", "omar@mail.com"))
+
+    def test_lookup_by_id(self):
+        self.assertIs(self.registry.get("2"), self.omar)
+        self.assertIsNone(self.registry.get("3"))
+        self.assertIn("1", self.registry)
+
+    def test_duplicate_id_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.registry.add(Student("1", "Someone", "Art", "x@mail.com"))
+        self.assertEqual(len(self.registry), 2)
+
+    def test_iteration_and_index_keep_insertion_order(self):
+        self.assertEqual([s.name for s in self.registry], ["Asma", "Omar"])
+        self.assertIs(self.registry[1], self.omar)
+
+    def test_remove(self):
+        self.assertIs(self.registry.remove("1"), self.asma)
+        self.assertEqual(self.registry.ids(), ["2"])
+        with self.assertRaises(LookupError):
+            self.registry.remove("1")
+
+    def test_add_many_is_all_or_nothing(self):
+        with self.assertRaises(ValueError):
+            self.registry.add_many([Student("3", "A", "CS", "a@mail.com"), Student("2", "B", "CS", "b@mail.com")])
+        self.assertNotIn("3", self.registry)
+        self.registry.add_many([Student("3", "A", "CS", "a@mail.com"), Student("4", "B", "CS", "b@mail.com")])
+        self.assertEqual(self.registry.ids(), ["1", "2", "3", "4"])
+
+    def test_secondary_indexes(self):
+        self.registry.add(Student("3", "Mona", "CS", "mona@mail.com"))
+        self.assertEqual([s.name for s in self.registry.find("major", "CS")], ["Asma", "Mona"])
+        self.assertIs(self.registry.find_one("email", "omar@mail.com"), self.omar)
+        self.assertEqual(self.registry.find("major", "Art"), [])
+
+    def test_duplicate_email_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.registry.add(Student("3", "Other", "Art", "asma@mail.com"))
+        self.assertNotIn("3", self.registry)
+
+    def test_reindex_after_update(self):
+        self.omar._major = "CS"
+        self.omar.email = "omar@uni.edu"
+        self.registry.reindex(self.omar)
+        self.assertEqual(self.registry.find("major", "Math"), [])
+        self.assertIn(self.omar, self.registry.find("major", "CS"))
+        self.assertIsNone(self.registry.find_one("email", "omar@mail.com"))
+        self.assertIs(self.registry.find_one("email", "omar@uni.edu"), self.omar)
+
+    def test_remove_unlinks_indexes(self):
+        self.registry.remove("1")
+        self.assertEqual(self.registry.find("major", "CS"), [])
+        self.assertIsNone(self.registry.find_one("email", "asma@mail.com"))
+
+    def test_new_id_skips_ids_in_use(self):
+        self.registry.remove("1")
+        self.assertEqual(self.registry.new_id(""), "3")
+        self.registry.add(Student("s2", "Mona", "CS", "mona@mail.com"))
+        self.assertEqual(self.registry.new_id("s"), "s3")
+
+
+if __name__ == '__main__':
+    unittest.main()
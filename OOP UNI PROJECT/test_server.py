@@ -0,0 +1,154 @@
+import json
+import unittest
+
+import university_management_last_version1 as ums
+
+
+class TestServerCommands(unittest.TestCase):
+
+    def tearDown(self):
+        for registry in [ums.students, ums.professors, ums.courses, ums.departments, ums.libraries,
+                         ums.attendance_store]:
+            registry.clear()
+
+    def test_add_students_batch(self):
+        records = "\n".join(["1,Asma,CS,asma@mail.com",
+                             "2,Omar,Math,omar@mail.com",
+                             "1,Asma Again,CS,asma2@mail.com",
+                             "3,No Email,CS,",
+                             "4,Too,Few"])
+        resp, keep_open = ums.process_command(f"ADD_STUDENTS {records}")
+        result = json.loads(resp)
+        self.assertTrue(keep_open)
+        self.assertEqual(result["added"], 2)
+        self.assertEqual(result["rejected"], 3)
+        self.assertEqual([r["status"] for r in result["results"]],
+                         ["added", "added", "duplicate", "invalid", "invalid"])
+        self.assertEqual(len(ums.students), 2)
+
+    def test_add_students_rejects_existing_ids(self):
+        ums.process_command("ADD_STUDENT 1,Asma,CS,asma@mail.com")
+        resp, _ = ums.process_command("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com")
+        self.assertEqual([r["status"] for r in json.loads(resp)["results"]], ["duplicate", "added"])
+
+    def test_get_students_info(self):
+        ums.process_command("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com")
+        resp, _ = ums.process_command("GET_STUDENTS_INFO 2,missing,1")
+        result = json.loads(resp)
+        self.assertEqual(list(result), ["2", "missing", "1"])
+        self.assertEqual(result["2"]["Name"], "Omar")
+        self.assertIsNone(result["missing"])
+
+    def test_unknown_command_and_bad_arguments(self):
+        self.assertEqual(ums.process_command("FLY_AWAY"), ("ERROR: Unknown command", True))
+        resp, _ = ums.process_command("ENROLL only-one-field")
+        self.assertEqual(resp, "ERROR: Invalid ENROLL format. Use student_id,course_id")
+
+    def test_every_command_is_listed(self):
+        resp, _ = ums.process_command("LIST_COMMANDS")
+        self.assertEqual(set(json.loads(resp)), set(ums.COMMANDS) | set(ums.STREAMS))
+
+    def test_update_attendance_batch(self):
+        ums.process_command("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com")
+        ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+        ums.process_command("ADD_COURSE CS101,Intro,CS,3,p1")
+        ums.process_command("RECORD_ATTENDANCE 1,CS101,2025-01-01,Absent")
+        ums.process_command("RECORD_ATTENDANCE 2,CS101,2025-01-01,Absent")
+        resp, _ = ums.process_command("UPDATE_ATTENDANCE_BATCH admin;1,2025-01-01,Present;2,2025-01-01,Present,CS101")
+        self.assertEqual(json.loads(resp), {"updated": 2, "failed": []})
+        self.assertEqual(ums.process_command("GET_ATTENDANCE_PERCENTAGE 2")[0], "PERCENTAGE: 100.00")
+        self.assertTrue(ums.process_command("UPDATE_ATTENDANCE_BATCH student;1,2025-01-01,Absent")[0].startswith("ERROR"))
+
+    def test_attendance_range_commands(self):
+        ums.process_command("ADD_STUDENT 1,Asma,CS,asma@mail.com")
+        ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+        ums.process_command("ADD_COURSE CS101,Intro,CS,3,p1")
+        for day in range(1, 8):
+            ums.process_command(f"RECORD_ATTENDANCE 1,CS101,2025-01-0{day},{'Absent' if day > 4 else 'Present'}")
+        week = json.loads(ums.process_command("GET_COURSE_ATTENDANCE_RANGE CS101,2025-01-03,2025-01-05")[0])
+        self.assertEqual([r["Status"] for r in week], ["Present", "Present", "Absent"])
+        self.assertEqual(len(json.loads(ums.process_command("GET_STUDENT_ATTENDANCE_RANGE 1,2025-01-06,2025-01-31")[0])), 2)
+        streaks = json.loads(ums.process_command("GET_ABSENCE_STREAKS 3,CS101")[0])
+        self.assertEqual(streaks, [{"Student ID": "1", "Student": "Asma", "From": "2025-01-05", "To": "2025-01-07",
+                                    "Days": 3}])
+        self.assertTrue(ums.process_command("GET_ABSENCE_STREAKS x")[0].startswith("ERROR"))
+
+    def test_roll_call(self):
+        ums.process_command("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com;3,Mona,CS,mona@mail.com")
+        ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+        ums.process_command("ADD_COURSE CS101,Intro,CS,3,p1")
+        for sid in "123":
+            ums.process_command(f"ENROLL {sid},CS101")
+        resp, _ = ums.process_command("ROLL_CALL CS101,2025-01-01,1;3")
+        self.assertEqual(json.loads(resp), {"present": 2, "absent": 1})
+        self.assertEqual(ums.process_command("GET_ATTENDANCE_PERCENTAGE 2,CS101")[0], "PERCENTAGE: 0.00")
+        self.assertEqual(ums.process_command("ROLL_CALL CS101,2025-01-02,9")[0], "ERROR: Not enrolled in CS101: 9")
+        self.assertTrue(ums.process_command("ROLL_CALL CS101,02/01/2025")[0].startswith("ERROR"))
+        self.assertEqual(len(ums.get_attendance_report().attendance_records), 3)
+
+    def test_export_streams_json_lines(self):
+        ums.process_command("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com")
+        ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+        ums.process_command("ADD_COURSE CS101,Intro,CS,3,p1")
+        ums.process_command("ENROLL 1,CS101")
+        ums.process_command("RECORD_ATTENDANCE 1,CS101,2025-01-01,Present")
+        resp, keep_open = ums.process_command("EXPORT students,rosters,attendance")
+        messages = list(resp)
+        self.assertEqual(messages[-1], "END 4")
+        rows = [json.loads(line) for m in messages[:-1] for line in m[len("DATA "):].split("\n")]
+        self.assertEqual([r["type"] for r in rows], ["student", "student", "roster", "attendance"])
+        self.assertEqual(rows[2]["Enrolled Students"], ["1"])
+        self.assertEqual(ums.process_command("EXPORT grades")[0],
+                         "ERROR: Cannot export 'grades', expected students, rosters, attendance, loans")
+
+    def test_enroll_and_attendance_commands(self):
+        ums.process_command("ADD_STUDENT 1,Asma,CS,asma@mail.com")
+        ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+        self.assertTrue(ums.process_command("ADD_COURSE CS101,Intro,CS,3,p1")[0].startswith("SUCCESS"))
+        self.assertTrue(ums.process_command("ENROLL 1,CS101")[0].startswith("SUCCESS"))
+        self.assertTrue(ums.process_command("ENROLL 1,CS101")[0].startswith("ERROR"))
+        self.assertEqual(ums.process_command("ENROLL 1,NOPE")[0], "ERROR: Course with ID NOPE not found.")
+
+        ums.process_command("RECORD_ATTENDANCE 1,CS101,2025-01-01,Present")
+        ums.process_command("RECORD_ATTENDANCE 1,CS101,2025-01-02,Absent")
+        self.assertEqual(ums.process_command("GET_ATTENDANCE_PERCENTAGE 1,CS101")[0], "PERCENTAGE: 50.00")
+
+    def test_library_commands(self):
+        ums.process_command("ADD_STUDENT 1,Asma,CS,asma@mail.com")
+        ums.process_command("ADD_LIBRARY L1")
+        ums.process_command("ADD_BOOK L1,Dune,Herbert,Fiction")
+        self.assertTrue(ums.process_command("BORROW_BOOK L1,1,Dune")[0].startswith("ERROR"))
+        ums.process_command("REGISTER_LIBRARY L1,1")
+        self.assertTrue(ums.process_command("BORROW_BOOK L1,1,Dune")[0].startswith("SUCCESS"))
+        self.assertTrue(ums.process_command("BORROW_BOOK L1,1,Dune")[0].startswith("ERROR"))
+        self.assertEqual(json.loads(ums.process_command("SEARCH_BOOKS L1,herb")[0])["Dune"]["copies"], 0)
+
+    def test_index_queries(self):
+        ums.process_command("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com;3,Mona,CS,mona@mail.com")
+        cs = json.loads(ums.process_command("FIND_STUDENTS_BY_MAJOR CS")[0])
+        self.assertEqual([s["ID"] for s in cs], ["1", "3"])
+
+        ums.process_command("UPDATE_STUDENT 2,major,CS")
+        ums.process_command("UPDATE_STUDENT 1,email,asma@uni.edu")
+        self.assertEqual(len(json.loads(ums.process_command("FIND_STUDENTS_BY_MAJOR CS")[0])), 3)
+        self.assertEqual(json.loads(ums.process_command("FIND_STUDENT_BY_EMAIL ASMA@uni.edu")[0])["ID"], "1")
+        self.assertTrue(ums.process_command("UPDATE_STUDENT 3,email,asma@uni.edu")[0].startswith("ERROR"))
+        self.assertEqual(ums.students.get("3").email, "mona@mail.com")
+
+        ums.process_command("REMOVE_STUDENT 3")
+        self.assertEqual(len(json.loads(ums.process_command("FIND_STUDENTS_BY_MAJOR CS")[0])), 2)
+
+    def test_department_faculty(self):
+        ums.process_command("ADD_DEPARTMENT d1,CS,Dr. Head")
+        ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+        ums.process_command("ADD_PROFESSOR p2,Dr. Sara,Math,556,sara@mail.com")
+        faculty = json.loads(ums.process_command("GET_DEPARTMENT_FACULTY CS")[0])
+        self.assertEqual([p["ID"] for p in faculty], ["p1"])
+
+        ums.process_command("UPDATE_PROFESSOR_DEPARTMENT p2,CS")
+        self.assertEqual(len(json.loads(ums.process_command("GET_DEPARTMENT_FACULTY CS")[0])), 2)
+        self.assertEqual(len(ums.departments.get("d1").faculty_members), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import university_management_last_version1 as ums
+import persistence
+import sqlite_store
+
+
+class TestSqliteStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "ums.db")
+        self.store = sqlite_store.open_database(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        persistence.clear_state()
+        shutil.rmtree(self.directory)
+
+    def run_commands(self, *commands):
+        for cmd in commands:
+            resp, _ = ums.process_command(cmd)
+            self.assertFalse(resp.startswith("ERROR"), f"{cmd} -> {resp}")
+
+    def reopen(self):
+        self.store.close()
+        persistence.clear_state()
+        self.store = sqlite_store.open_database(self.path)
+
+    def test_state_survives_restart(self):
+        self.run_commands("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com",
+                          "ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com",
+                          "ADD_COURSE CS101,Intro,CS,3,p1",
+                          "ADD_DEPARTMENT d1,CS,Dr. Ali",
+                          "ENROLL 1,CS101",
+                          "ENROLL 2,CS101",
+                          "DROP 2,CS101",
+                          "ASSIGN_GRADE p1,1,CS101,A",
+                          "ADD_LIBRARY L1",
+                          "ADD_BOOK L1,Dune,Herbert,Fiction,2",
+                          "REGISTER_LIBRARY L1,1",
+                          "BORROW_BOOK L1,1,Dune",
+                          "RECORD_ATTENDANCE 1,CS101,2025-01-01,Absent",
+                          "UPDATE_ATTENDANCE admin,1,2025-01-01,Present",
+                          "RECORD_ATTENDANCE 1,CS101,2025-01-02,Present",
+                          "UPDATE_ATTENDANCE_BATCH admin;1,2025-01-02,Absent,CS101",
+                          "ROLL_CALL CS101,2025-01-03,1",
+                          "UPDATE_STUDENT 2,major,Physics",
+                          "ADD_CLASSROOM r1,Hall A,120",
+                          "ADD_SCHEDULE CS101,p1,r1,Mon 9-11",
+                          "UPDATE_SCHEDULE sch_1,Mon 10-12")
+        before = persistence.dump_state()
+        self.reopen()
+        self.assertEqual(persistence.dump_state(), before)
+        self.assertFalse(ums.classrooms.get("r1").check_availability("Mon 11-13"))
+
+    def test_rows_are_built_on_demand(self):
+        self.run_commands(*[f"ADD_STUDENT {i},Student {i},{'CS' if i % 2 else 'Math'},s{i}@mail.com"
+                            for i in range(10)])
+        self.reopen()
+        self.assertEqual(len(ums.students), 10)
+        self.assertEqual(ums.find_student_by_email("S4@mail.com").get_id(), "4")
+        self.assertEqual([s.get_id() for s in ums.find_students_by_major("CS")], ["1", "3", "5", "7", "9"])
+        self.assertEqual(len(ums.students._items), 6)
+        with self.assertRaises(ValueError):
+            ums.students.add(ums.Student("x", "Copy", "CS", "s8@mail.com"))
+        self.run_commands("REMOVE_STUDENT 0")
+        self.reopen()
+        self.assertEqual(ums.students.ids(), [str(i) for i in range(1, 10)])
+
+    def test_grading_after_restart(self):
+        self.run_commands("ADD_STUDENT 1,Asma,CS,asma@mail.com",
+                          "ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com",
+                          "ADD_COURSE CS101,Intro,CS,3,p1",
+                          "ENROLL 1,CS101")
+        self.reopen()
+        self.assertEqual(ums.professors.get("p1").courses_taught, ["CS101"])
+        self.run_commands("ASSIGN_GRADE p1,1,CS101,A")
+        self.reopen()
+        self.assertEqual(ums.students.get("1")._courses_enrolled["CS101"]["grade"], "A")
+
+    def test_removed_student_attendance_after_restart(self):
+        self.run_commands("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,Math,omar@mail.com",
+                          "ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com",
+                          "ADD_COURSE CS101,Intro,CS,3,p1",
+                          "RECORD_ATTENDANCE 1,CS101,2025-01-01,Present",
+                          "RECORD_ATTENDANCE 2,CS101,2025-01-01,Absent")
+        self.store.flush()
+        self.run_commands("REMOVE_STUDENT 2")
+        self.assertEqual(len(ums.attendance_store), 1)
+        self.reopen()
+        self.run_commands("RECORD_ATTENDANCE 1,CS101,2025-01-02,Absent")
+        self.assertEqual(persistence.dump_state()["attendance"],
+                         [["1", "CS101", "2025-01-01", "Present"], ["1", "CS101", "2025-01-02", "Absent"]])
+        self.store.flush()
+        self.reopen()
+        self.assertEqual(ums.get_attendance_report().calculate_attendance_percentage(ums.students.get("1")), 50)
+
+    def test_dropped_course_stays_dropped_after_restart(self):
+        self.run_commands("ADD_STUDENT 2,Omar,Math,omar@mail.com",
+                          "ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com",
+                          "ADD_COURSE CS101,Intro,CS,3,p1",
+                          "ENROLL 2,CS101",
+                          "DROP 2,CS101")
+        self.reopen()
+        self.assertEqual(ums.students.get("2")._courses_enrolled, {})
+        self.assertEqual(list(ums.courses.get("CS101").enrolled_students), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
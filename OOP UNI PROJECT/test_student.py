@@ -32,5 +32,12 @@ class TestStudent(unittest.TestCase):
         course_info = self.student._courses_enrolled["CS101"]
         self.assertEqual(course_info["grade"], "A")
 
+    def test_enrollment_is_compact(self):
+        self.student.enroll_course("CS101", "Intro to CS")
+        course_info = self.student._courses_enrolled["CS101"]
+        self.assertEqual((course_info["name"], course_info["grade"]), ("Intro to CS", None))
+        self.assertFalse(hasattr(course_info, "__dict__"))
+        self.assertFalse(hasattr(self.student, "__dict__"))
+
 if __name__ == '__main__':
     unittest.main()
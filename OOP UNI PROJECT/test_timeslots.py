@@ -0,0 +1,115 @@
+import json
+import unittest
+
+import university_management_last_version1 as ums
+from timeslots import AvailabilityIndex, SlotIndex, TimeSlot, format_time_slot, overlapping_pairs, parse_time_slot
+
+
+class TestTimeSlots(unittest.TestCase):
+
+    def tearDown(self):
+        for registry in [ums.students, ums.professors, ums.courses, ums.classrooms, ums.schedules,
+                         ums.schedule_rooms, ums.schedule_index]:
+            registry.clear()
+
+    def test_parse(self):
+        self.assertEqual(parse_time_slot("Mon 9-11"), TimeSlot(0, 540, 660))
+        self.assertEqual(parse_time_slot("tuesday 14:30-16"), TimeSlot(1, 870, 960))
+        self.assertEqual(format_time_slot(parse_time_slot("Thurs 8:05-9")), "Thu 8:05-9")
+        for text in ["Mon 11-9", "Mon 9-25", "Mo 9-11", "Mon 9:75-11", "Mon", ""]:
+            with self.assertRaises(ValueError):
+                parse_time_slot(text)
+
+    def test_overlapping(self):
+        index = SlotIndex()
+        for i, text in enumerate(["Mon 8-9", "Mon 9-11", "Mon 13-14", "Tue 9-11", "Mon 7-12"]):
+            index.add(parse_time_slot(text), i)
+        self.assertEqual(index.overlapping(parse_time_slot("Mon 10-12")), [4, 1])
+        self.assertEqual(index.overlapping(parse_time_slot("Mon 12-13")), [])
+        self.assertTrue(index.is_free(parse_time_slot("Wed 9-11")))
+        self.assertTrue(index.remove(parse_time_slot("Mon 7-12"), 4))
+        self.assertEqual(index.overlapping(parse_time_slot("Mon 10-12")), [1])
+        self.assertEqual(index.overlapping(parse_time_slot("Mon 9-11"), key="room 2"), [])
+
+    def test_classroom_rejects_overlaps(self):
+        ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+        ums.process_command("ADD_COURSE CS101,Intro,CS,3,p1")
+        ums.process_command("ADD_CLASSROOM r1,Hall A,120")
+        self.assertTrue(ums.process_command("ADD_SCHEDULE CS101,p1,r1,Mon 9-11")[0].startswith("SUCCESS"))
+        self.assertEqual(ums.process_command("ADD_SCHEDULE CS101,p1,r1,Mon 10-12")[0],
+                         "ERROR: Time slot Mon 10-12 overlaps Mon 9-11 (sch_1) in Hall A.")
+        self.assertTrue(ums.process_command("ADD_SCHEDULE CS101,p1,r1,Mon 11-13")[0].startswith("SUCCESS"))
+        self.assertTrue(ums.process_command("ADD_SCHEDULE CS101,p1,r1,Mon 9 to 11")[0].startswith("ERROR"))
+        self.assertTrue(ums.process_command("UPDATE_SCHEDULE sch_1,Mon 12-14")[0].startswith("ERROR"))
+        self.assertTrue(ums.process_command("UPDATE_SCHEDULE sch_1,Mon 8-10")[0].startswith("SUCCESS"))
+        room = ums.classrooms.get("r1")
+        self.assertTrue(room.check_availability("Mon 10-11"))
+        self.assertFalse(room.check_availability("Mon 9:30-10"))
+        self.assertEqual(len(room.booked), 2)
+
+    def test_overlapping_pairs(self):
+        entries = [(parse_time_slot(t), t) for t in ["Mon 9-11", "Mon 10-12", "Mon 11-13", "Tue 10-11", "Mon 8-14"]]
+        pairs = {(a, b) for day, a, b in overlapping_pairs(entries)}
+        self.assertEqual(pairs, {("Mon 8-14", "Mon 9-11"), ("Mon 8-14", "Mon 10-12"), ("Mon 9-11", "Mon 10-12"),
+                                 ("Mon 8-14", "Mon 11-13"), ("Mon 10-12", "Mon 11-13")})
+
+    def test_professor_course_and_student_conflicts(self):
+        ums.process_command("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,CS,omar@mail.com")
+        ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+        ums.process_command("ADD_PROFESSOR p2,Dr. Sara,Math,556,sara@mail.com")
+        ums.process_command("ADD_COURSE CS101,Intro,CS,3,p1")
+        ums.process_command("ADD_COURSE MATH1,Calculus,Math,3,p2")
+        for sid, cid in [("1", "CS101"), ("1", "MATH1"), ("2", "MATH1")]:
+            ums.process_command(f"ENROLL {sid},{cid}")
+        ums.process_command("ADD_CLASSROOM r1,Hall A,120")
+        ums.process_command("ADD_CLASSROOM r2,Hall B,60")
+        ums.process_command("ADD_SCHEDULE CS101,p1,r1,Mon 9-11")
+        self.assertEqual(ums.process_command("ADD_SCHEDULE MATH1,p1,r2,Mon 10-12")[0],
+                         "ERROR: Dr. Ali already teaches at Mon 9-11 (sch_1).")
+        self.assertEqual(ums.process_command("ADD_SCHEDULE CS101,p2,r2,Mon 10-12")[0],
+                         "ERROR: Intro already meets at Mon 9-11 (sch_1).")
+        resp = ums.process_command("ADD_SCHEDULE MATH1,p2,r2,Mon 10-12")[0]
+        self.assertEqual(resp, "SUCCESS: Schedule sch_2 created. "
+                               "Warning: 1 student(s) of MATH1 have another class at Mon 10-12 (sch_1).")
+        self.assertTrue(ums.process_command("UPDATE_SCHEDULE sch_2,Mon 8-9")[0].startswith("SUCCESS"))
+        self.assertEqual(json.loads(ums.process_command("GET_CONFLICTS")[0]), [])
+        ums.process_command("UPDATE_SCHEDULE sch_2,Mon 9-10")
+        conflicts = json.loads(ums.process_command("GET_CONFLICTS")[0])
+        self.assertEqual([(c["Type"], c["Schedules"], c["Students"]) for c in conflicts],
+                         [("students", ["sch_2", "sch_1"], ["1"])])
+
+    def test_availability_index(self):
+        index = AvailabilityIndex()
+        index.set("a", "A", 120, [parse_time_slot("Tue 13-15")])
+        index.set("b", "B", 60, [])
+        index.set("c", "C", 200, [parse_time_slot("Tue 16-18")])
+        self.assertEqual(index.free(parse_time_slot("Tue 14-16"), 100), ["C"])
+        self.assertEqual(index.free(parse_time_slot("Tue 15-16")), ["B", "A", "C"])
+        self.assertEqual(index.free(parse_time_slot("Tue 15-17"), 0, 150), ["B", "A"])
+        index.set("b", "B", 150, [parse_time_slot("Tue 8:59-9:01")])
+        self.assertEqual(index.free(parse_time_slot("Tue 9:01-10"), 130), ["B", "C"])
+        self.assertEqual(index.free(parse_time_slot("Tue 9-10"), 130), ["C"])
+
+    def test_find_free_rooms(self):
+        with self.assertRaises(ValueError):
+            ums.Classroom("r0", "Lab", "big")
+        ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+        ums.process_command("ADD_COURSE CS101,Intro,CS,3,p1")
+        ums.process_command("ADD_CLASSROOM r1,Hall A,120")
+        ums.process_command("ADD_CLASSROOM r2,Room 5,40")
+        self.assertEqual(ums.classrooms.get("r1").capacity, 120)
+        self.assertEqual(json.loads(ums.process_command("FIND_FREE_ROOMS Tue 14-16,100")[0]),
+                         [{"Classroom ID": "r1", "Location": "Hall A", "Capacity": 120}])
+        ums.process_command("ADD_SCHEDULE CS101,p1,r1,Tue 15-17")
+        self.assertEqual(ums.process_command("FIND_FREE_ROOMS Tue 14-16,100")[0], "[]")
+        ums.process_command("ADD_CLASSROOM r3,Hall B,300")
+        self.assertEqual([r["Classroom ID"] for r in json.loads(ums.process_command("FIND_FREE_ROOMS Tue 14-16")[0])],
+                         ["r2", "r3"])
+        ums.process_command("UPDATE_SCHEDULE sch_1,Wed 9-11")
+        self.assertEqual(len(json.loads(ums.process_command("FIND_FREE_ROOMS Tue 14-16")[0])), 3)
+        self.assertTrue(ums.process_command("FIND_FREE_ROOMS Tue 14-16,many")[0].startswith("ERROR"))
+        self.assertTrue(ums.process_command("ADD_CLASSROOM r4,Hall C,lots")[0].startswith("ERROR"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import unittest
+
+import timetable
+import university_management_last_version1 as ums
+from timeslots import overlaps, parse_time_slot
+
+
+class TestTimetable(unittest.TestCase):
+
+    def setUp(self):
+        ums.process_command("ADD_STUDENTS 1,Asma,CS,asma@mail.com;2,Omar,CS,omar@mail.com;3,Mona,CS,mona@mail.com")
+        ums.process_command("ADD_PROFESSOR p1,Dr. Ali,CS,555,ali@mail.com")
+        ums.process_command("ADD_PROFESSOR p2,Dr. Sara,Math,556,sara@mail.com")
+        for course in ["CS101,Intro,CS,3,p1", "CS102,Data,CS,3,p1", "MATH1,Calculus,Math,3,p2",
+                       "MATH2,Algebra,Math,3,p2"]:
+            ums.process_command(f"ADD_COURSE {course}")
+        for sid, cid in [("1", "CS101"), ("1", "MATH1"), ("2", "CS101"), ("2", "MATH2"), ("3", "MATH1"),
+                         ("3", "MATH2"), ("3", "CS102")]:
+            ums.process_command(f"ENROLL {sid},{cid}")
+        ums.process_command("ADD_CLASSROOM r1,Hall A,2")
+        ums.process_command("ADD_CLASSROOM r2,Room 5,1")
+
+    def tearDown(self):
+        for registry in [ums.students, ums.professors, ums.courses, ums.classrooms, ums.schedules,
+                         ums.schedule_rooms, ums.schedule_index]:
+            registry.clear()
+
+    def test_solution_has_no_conflicts(self):
+        # every two courses share a professor or a student, and Mon 9-11 overlaps Mon 10-12
+        slots = ["Mon 9-11", "Mon 10-12", "Tue 9-11", "Wed 9-11", "Thu 9-11"]
+        for workers in (1, 2):
+            result = timetable.solve(timetable.build_problem(slots=slots), seconds=0.5, workers=workers, seed=7)
+            self.assertEqual(result["unassigned"], [])
+            rows = {row["Course ID"]: row for row in result["assignments"]}
+            self.assertTrue(all(row["Students"] <= row["Capacity"] for row in rows.values()))
+            placed = [parse_time_slot(row["Time Slot"]) for row in rows.values()]
+            self.assertFalse(any(overlaps(a, b) for i, a in enumerate(placed) for b in placed[i + 1:]))
+        applied = timetable.apply_timetable(result)
+        self.assertEqual((len(applied["created"]), applied["failed"]), (4, []))
+        self.assertEqual(ums.term_conflicts(), [])
+        self.assertEqual(timetable.build_problem()["courses"], [])
+
+    def test_booked_schedules_and_capacity(self):
+        ums.process_command("ADD_SCHEDULE CS101,p1,r1,Mon 8-10")
+        problem = timetable.build_problem(slots=["Mon 9-11", "Tue 9-11"])
+        self.assertEqual([c[0] for c in problem["courses"]], ["CS102", "MATH1", "MATH2"])
+        self.assertEqual(problem["blocked"], [[0], [0], [0]])  # professor p1, then students 1 and 2
+        ums.process_command("ENROLL 1,CS102")
+        ums.process_command("ENROLL 2,CS102")
+        result = timetable.solve(timetable.build_problem(slots=["Tue 9-11"]), seconds=0.2, workers=1)
+        self.assertIn("CS102", result["unassigned"])  # three students, no room that big
+
+    def test_server_command(self):
+        ums.process_command("ADD_SCHEDULE CS101,p1,r1,Fri 8-10")
+        ums.schedules.add(ums.Schedule("sch_3", ums.courses.get("MATH1"), ums.professors.get("p2"), "Fri 16-18",
+                                       "GUI"))  # an id picked by hand, where the next generated one would go
+        resp = json.loads(ums.process_command("SOLVE_TIMETABLE 0.5,apply;p1,Mon 8-18,Tue 8-18,Wed 8-18")[0])
+        self.assertEqual(len(resp["created"]), len(resp["assignments"]))
+        self.assertEqual(resp["failed"], [])
+        cs102 = [row for row in resp["assignments"] if row["Course ID"] == "CS102"]
+        self.assertIn(cs102[0]["Time Slot"].split()[0], ("Thu", "Fri"))
+        for args in ["soon", "1;p1", "1;p1,Someday 9-11", "1;p9,Mon 9-11"]:
+            self.assertTrue(ums.process_command(f"SOLVE_TIMETABLE {args}")[0].startswith("ERROR"), args)
+
+    def test_one_solve_at_a_time(self):
+        timetable._solving.acquire()
+        try:
+            with self.assertRaises(ValueError):
+                timetable.solve(timetable.build_problem(), seconds=0.1, workers=1)
+        finally:
+            timetable._solving.release()
+
+
+if __name__ == '__main__':
+    unittest.main()
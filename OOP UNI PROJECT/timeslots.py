@@ -0,0 +1,187 @@
+import bisect
+import heapq
+import re
+from collections import namedtuple
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+DAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+DAY_MINUTES = 24 * 60
+
+# day is 0 (Mon) to 6 (Sun), start and end are minutes after midnight
+TimeSlot = namedtuple("TimeSlot", ["day", "start", "end"])
+
+SLOT_PATTERN = re.compile(r"^\s*([A-Za-z]+)\.?\s+(\d{1,2})(?::(\d{2}))?\s*-\s*(\d{1,2})(?::(\d{2}))?\s*$")
+
+_parsed = {}
+
+
+def parse_day(text):
+    name = text.lower()
+    if len(name) >= 3:
+        for day, full in enumerate(DAY_NAMES):
+            if full.startswith(name):
+                return day
+    raise ValueError(f"Unknown day '{text}'")
+
+
+def parse_time_slot(text):
+    # "Mon 9-11", "Tuesday 14:30-16" -> TimeSlot; each distinct string is parsed only once
+    slot = _parsed.get(text)
+    if slot is None:
+        match = SLOT_PATTERN.match(text) if isinstance(text, str) else None
+        if not match:
+            raise ValueError(f"Invalid time slot '{text}', expected e.g. 'Mon 9-11' or 'Tue 14:30-16'")
+        day, start_h, start_m, end_h, end_m = match.groups()
+        start = int(start_h) * 60 + int(start_m or 0)
+        end = int(end_h) * 60 + int(end_m or 0)
+        if (start_m and int(start_m) >= 60) or (end_m and int(end_m) >= 60) or not 0 <= start < end <= 24 * 60:
+            raise ValueError(f"Invalid time slot '{text}', the end must come after the start within one day")
+        slot = _parsed[text] = TimeSlot(parse_day(day), start, end)
+    return slot
+
+
+def format_time(minutes):
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}" if minutes else str(hours)
+
+
+def format_time_slot(slot):
+    return f"{DAYS[slot.day]} {format_time(slot.start)}-{format_time(slot.end)}"
+
+
+def overlaps(a, b):
+    return a.day == b.day and a.start < b.end and b.start < a.end
+
+
+class SlotIndex:
+    # intervals per (key, day), each list sorted by start. Finding what overlaps [start, end) is a binary
+    # search for the first interval starting at or after end, then a walk back over the intervals that
+    # start less than the longest interval of that list before start, so O(log n + matches)
+    def __init__(self):
+        self.days = {}  # (key, day) -> [starts, entries, longest]; entries are (start, end, item)
+
+    def __len__(self):
+        return sum(len(entry[0]) for entry in self.days.values())
+
+    def add(self, slot, item, key=None):
+        entry = self.days.get((key, slot.day))
+        if entry is None:
+            entry = self.days[(key, slot.day)] = [[], [], 0]
+        starts, entries, longest = entry
+        i = bisect.bisect_right(starts, slot.start)
+        starts.insert(i, slot.start)
+        entries.insert(i, (slot.start, slot.end, item))
+        entry[2] = max(longest, slot.end - slot.start)
+
+    def remove(self, slot, item, key=None):
+        entry = self.days.get((key, slot.day))
+        if entry is None:
+            return False
+        starts, entries, longest = entry
+        i = bisect.bisect_left(starts, slot.start)
+        while i < len(starts) and starts[i] == slot.start:
+            if entries[i][2] is item and entries[i][1] == slot.end:
+                del starts[i]
+                del entries[i]
+                if not starts:
+                    del self.days[(key, slot.day)]
+                return True
+            i += 1
+        return False
+
+    def overlapping(self, slot, key=None):
+        # items whose interval overlaps slot, in start order
+        entry = self.days.get((key, slot.day))
+        if entry is None:
+            return []
+        starts, entries, longest = entry
+        i = bisect.bisect_left(starts, slot.end)
+        found = []
+        while i > 0 and starts[i - 1] + longest > slot.start:
+            i -= 1
+            start, end, item = entries[i]
+            if end > slot.start:
+                found.append(item)
+        found.reverse()
+        return found
+
+    def is_free(self, slot, key=None):
+        return not self.overlapping(slot, key)
+
+    def items(self, key=None, day=None):
+        # (slot, item) pairs of one key, optionally one day, in day and start order
+        days = [day] if day is not None else range(len(DAYS))
+        for d in days:
+            entry = self.days.get((key, d))
+            if entry:
+                for start, end, item in entry[1]:
+                    yield TimeSlot(d, start, end), item
+
+    def clear(self):
+        self.days.clear()
+
+
+def slot_mask(slot):
+    # the slot as bits of a week-long bitmap, one bit per minute
+    return ((1 << (slot.end - slot.start)) - 1) << (slot.day * DAY_MINUTES + slot.start)
+
+
+class AvailabilityIndex:
+    # a busy bitmap (see slot_mask) and a capacity per key, with the keys also kept sorted by capacity:
+    # "capacity >= n and free at slot" is a binary search for n, then one AND per larger room
+    def __init__(self):
+        self.rooms = {}  # key -> (item, capacity, busy bitmap)
+        self.by_capacity = []  # sorted (capacity, key)
+        self.version = None  # what the index was built from, for the owner to compare
+
+    def __len__(self):
+        return len(self.rooms)
+
+    def get(self, key):
+        entry = self.rooms.get(key)
+        return None if entry is None else entry[0]
+
+    def set(self, key, item, capacity, slots):
+        old = self.rooms.get(key)
+        if old is not None and old[1] != capacity:
+            self.by_capacity.remove((old[1], key))
+        if old is None or old[1] != capacity:
+            bisect.insort(self.by_capacity, (capacity, key))
+        busy = 0
+        for slot in slots:
+            busy |= slot_mask(slot)
+        self.rooms[key] = (item, capacity, busy)
+
+    def free(self, slot, min_capacity=0, max_capacity=None):
+        # items free for the whole slot with min_capacity <= capacity (<= max_capacity), smallest first
+        mask = slot_mask(slot)
+        first = bisect.bisect_left(self.by_capacity, (min_capacity,))
+        last = len(self.by_capacity) if max_capacity is None else bisect.bisect_left(self.by_capacity,
+                                                                                     (max_capacity + 1,))
+        found = []
+        for capacity, key in self.by_capacity[first:last]:
+            item, capacity, busy = self.rooms[key]
+            if not busy & mask:
+                found.append(item)
+        return found
+
+    def clear(self):
+        self.rooms.clear()
+        self.by_capacity.clear()
+        self.version = None
+
+
+def overlapping_pairs(entries):
+    # (day, item a, item b) for every two (slot, item) entries that overlap, from one sweep per day over the
+    # entries sorted by start; only intervals still open are compared, not every pair
+    by_day = {}
+    for slot, item in entries:
+        by_day.setdefault(slot.day, []).append((slot.start, slot.end, item))
+    for day in sorted(by_day):
+        open_now = []  # heap of (end, order, item)
+        for order, (start, end, item) in enumerate(sorted(by_day[day], key=lambda e: (e[0], e[1]))):
+            while open_now and open_now[0][0] <= start:
+                heapq.heappop(open_now)
+            for _, _, other in open_now:
+                yield day, other, item
+            heapq.heappush(open_now, (end, order, item))
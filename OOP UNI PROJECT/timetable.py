@@ -0,0 +1,281 @@
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import university_management_last_version1 as ums
+from timeslots import DAYS, overlaps, parse_time_slot
+
+# the slots the solver chooses from unless given others: two-hour blocks, Monday to Friday, 8 to 18
+DEFAULT_SLOTS = tuple(f"{day} {hour}-{hour + 2}" for day in DAYS[:5] for hour in range(8, 18, 2))
+DEFAULT_SECONDS = 5.0
+MAX_SOLVES = 1  # solves running at once; each one keeps every worker process busy for its whole budget
+
+_solving = threading.BoundedSemaphore(MAX_SOLVES)
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def parse_unavailable(lines):
+    # "professor_id,time slot[,time slot...]" lines -> {professor_id: [time slot, ...]} for build_problem
+    unavailable = {}
+    for line in lines:
+        values = [v.strip() for v in line.split(',')]
+        if len(values) < 2 or not all(values):
+            raise ValueError(f"Expected professor_id,time slot[,time slot...], got '{line}'")
+        ums.find_professor(values[0])
+        for text in values[1:]:
+            parse_time_slot(text)
+        unavailable.setdefault(values[0], []).extend(values[1:])
+    return unavailable
+
+
+def build_problem(course_ids=None, slots=DEFAULT_SLOTS, unavailable=None):
+    # plain tuples and lists (so it can be sent to worker processes) describing the courses to place.
+    # By default these are the courses with no schedule yet; schedules already booked stay where they are
+    # and block their room, their professor and their students' other courses.
+    # unavailable maps a professor id to time slots they cannot teach
+    with ums.data_lock:
+        ums.classrooms.load_all()
+        booked = [(parse_time_slot(s.get_time_slot()), s) for slot, s in ums.schedule_index.slots.items()]
+        if course_ids is None:
+            scheduled = {s.get_course().course_id for slot, s in booked}
+            chosen = [c for c in ums.courses if c.course_id not in scheduled]
+        else:
+            chosen = [ums.courses.get(cid) for cid in course_ids]
+            missing = [cid for cid, c in zip(course_ids, chosen) if c is None]
+            if missing:
+                raise LookupError(f"Course with ID {missing[0]} not found.")
+            chosen_ids = set(course_ids)
+            booked = [(slot, s) for slot, s in booked if s.get_course().course_id not in chosen_ids]
+        parsed = [parse_time_slot(text) for text in slots]
+        overlap = [[j for j, other in enumerate(parsed) if overlaps(slot, other)] for slot in parsed]
+        rooms = sorted(((c.classroom_id, c.capacity) for c in ums.classrooms), key=lambda r: r[1])
+        room_number = {room_id: r for r, (room_id, capacity) in enumerate(rooms)}
+        courses = [(c.course_id, c.professor.professor_id, len(c.enrolled_students)) for c in chosen]
+
+        # courses that may not meet at overlapping times: same professor or at least one shared student
+        linked = [set() for _ in chosen]
+        by_professor = {}
+        for i, (course_id, professor_id, size) in enumerate(courses):
+            by_professor.setdefault(professor_id, []).append(i)
+        for group in by_professor.values():
+            for i in group:
+                linked[i].update(j for j in group if j != i)
+        taking = {}
+        for i, course in enumerate(chosen):
+            for sid in course.enrolled_students:
+                taking.setdefault(sid, []).append(i)
+        for group in taking.values():
+            for i in group:
+                linked[i].update(j for j in group if j != i)
+
+        # (room, slot) pairs taken by booked schedules, and slots each course cannot use
+        room_busy = set()
+        blocked = [set() for _ in chosen]
+        unavailable = {pid: [parse_time_slot(s) for s in texts] for pid, texts in (unavailable or {}).items()}
+        for i, (course_id, professor_id, size) in enumerate(courses):
+            for off in unavailable.get(professor_id, ()):
+                blocked[i].update(k for k, slot in enumerate(parsed) if overlaps(slot, off))
+        for slot, schedule in booked:
+            hit = [k for k, candidate in enumerate(parsed) if overlaps(slot, candidate)]
+            if not hit:
+                continue
+            room = ums.schedule_rooms.get(schedule.get_schedule_id())
+            if room is not None and room.classroom_id in room_number:
+                room_busy.update((room_number[room.classroom_id], k) for k in hit)
+            for i in by_professor.get(schedule.get_professor().professor_id, ()):
+                blocked[i].update(hit)
+            for sid in schedule.get_course().enrolled_students:
+                for i in taking.get(sid, ()):
+                    blocked[i].update(hit)
+    return {"slots": list(slots), "overlap": overlap, "rooms": rooms, "courses": courses,
+            "linked": [sorted(s) for s in linked], "blocked": [sorted(s) for s in blocked],
+            "room_busy": sorted(room_busy)}
+
+
+class Search:
+    # one search run: a greedy colouring (most constrained course first, each one on a slot none of its
+    # linked courses use, in the smallest free room that fits) followed by a min-conflicts local search that
+    # places a left-out course where it displaces the fewest others and retries those, until every course
+    # is placed or the time is up
+    def __init__(self, problem, seed):
+        self.random = random.Random(seed)
+        self.overlap = problem["overlap"]
+        self.courses = problem["courses"]
+        self.linked = [set(linked) for linked in problem["linked"]]
+        self.capacity = [capacity for room_id, capacity in problem["rooms"]]
+        self.room_busy = set(map(tuple, problem["room_busy"]))
+        # rooms big enough for each course, smallest first (rooms come sorted by capacity), and usable slots
+        self.fits = [[r for r, capacity in enumerate(self.capacity) if capacity >= size]
+                     for course_id, professor_id, size in self.courses]
+        self.allowed = [sorted(set(range(len(self.overlap))).difference(blocked)) for blocked in problem["blocked"]]
+        self.placed = [None] * len(self.courses)  # course -> (slot, room)
+        self.room_at = {}  # (room, slot) -> course
+        self.at_slot = [set() for _ in self.overlap]  # slot -> courses placed there
+
+    def placeable(self, i):
+        return bool(self.fits[i] and self.allowed[i])
+
+    def linked_at(self, i, slot):
+        # linked courses (same professor or shared students) placed at a slot overlapping this one
+        return {j for k in self.overlap[slot] for j in self.at_slot[k] if j in self.linked[i]}
+
+    def in_room(self, room, slot):
+        # courses using room at an overlapping slot, or None when a booked schedule holds it
+        found = set()
+        for k in self.overlap[slot]:
+            if (room, k) in self.room_busy:
+                return None
+            other = self.room_at.get((room, k))
+            if other is not None:
+                found.add(other)
+        return found
+
+    def place(self, i, slot, room):
+        self.placed[i] = (slot, room)
+        self.room_at[(room, slot)] = i
+        self.at_slot[slot].add(i)
+
+    def remove(self, i):
+        slot, room = self.placed[i]
+        self.placed[i] = None
+        del self.room_at[(room, slot)]
+        self.at_slot[slot].discard(i)
+
+    def place_free(self, i, slots):
+        for slot in slots:
+            if not self.linked_at(i, slot):
+                for room in self.fits[i]:
+                    if self.in_room(room, slot) == set():
+                        self.place(i, slot, room)
+                        return True
+        return False
+
+    def greedy(self):
+        order = sorted(range(len(self.courses)),
+                       key=lambda i: (len(self.fits[i]) * len(self.allowed[i]), -len(self.linked[i]),
+                                      self.random.random()))
+        for i in order:
+            # emptiest slots first, so courses spread over the week
+            slots = sorted(self.allowed[i], key=lambda k: (len(self.at_slot[k]), self.random.random()))
+            self.place_free(i, slots)
+
+    def score(self):
+        # (courses left out, empty seats in the rooms used); lower is better
+        waste = sum(self.capacity[p[1]] - self.courses[i][2] for i, p in enumerate(self.placed) if p)
+        return self.placed.count(None), waste
+
+    def improve(self, deadline):
+        best_score, best = self.score(), list(self.placed)
+        tabu = {}
+        step = 0
+        while time.monotonic() < deadline:
+            left = [i for i, p in enumerate(self.placed) if p is None and self.placeable(i)]
+            if not left:
+                break
+            step += 1
+            i = self.random.choice(left)
+            best_move = None
+            for slot in self.allowed[i]:
+                linked = self.linked_at(i, slot)
+                for room in self.fits[i]:
+                    found = self.in_room(room, slot)
+                    if found is None:
+                        continue
+                    found |= linked
+                    if any(tabu.get(j, 0) > step for j in found):
+                        continue
+                    move = (len(found), self.random.random(), slot, room, found)
+                    if best_move is None or move < best_move:
+                        best_move = move
+                    if not found:
+                        break
+            if best_move is None:
+                continue
+            fewest, _, slot, room, found = best_move
+            for j in found:
+                self.remove(j)
+                tabu[j] = step + 5
+            self.place(i, slot, room)
+            tabu[i] = step + 2
+            # the displaced courses may fit somewhere free straight away
+            for j in found:
+                self.place_free(j, self.allowed[j])
+            current = self.score()
+            if current < best_score:
+                best_score, best = current, list(self.placed)
+        return best_score, best
+
+
+def search(problem, seed, seconds):
+    # one worker: returns (score, placements) of the best timetable it found
+    deadline = time.monotonic() + seconds
+    run = Search(problem, seed)
+    run.greedy()
+    return run.improve(deadline)
+
+
+def worker_pool(workers):
+    # one pool kept for later solves. Its processes are spawned, not forked: a fork copies the locks held by
+    # the server's other threads at that moment, and a child could wait on one of them forever
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def solve(problem, seconds=DEFAULT_SECONDS, workers=None, seed=None):
+    # runs one search per worker process with different seeds and keeps the best result;
+    # at most MAX_SOLVES run at a time, others are turned away rather than queued
+    workers = workers or min(os.cpu_count() or 1, 4)
+    seed = random.randrange(2 ** 32) if seed is None else seed
+    if not _solving.acquire(blocking=False):
+        raise ValueError("Another timetable is being solved, try again when it has finished")
+    try:
+        started = time.monotonic()
+        if workers == 1 or not problem["courses"]:
+            results = [search(problem, seed, seconds)]
+        else:
+            pool = worker_pool(workers)
+            results = list(pool.map(search, [problem] * workers, range(seed, seed + workers), [seconds] * workers))
+    finally:
+        _solving.release()
+    (left_out, waste), placed = min(results, key=lambda result: result[0])
+    assignments = []
+    for (course_id, professor_id, size), p in zip(problem["courses"], placed):
+        if p:
+            room_id, capacity = problem["rooms"][p[1]]
+            assignments.append({"Course ID": course_id, "Professor ID": professor_id, "Classroom ID": room_id,
+                                "Time Slot": problem["slots"][p[0]], "Students": size, "Capacity": capacity})
+    return {"assignments": assignments,
+            "unassigned": [c[0] for c, p in zip(problem["courses"], placed) if p is None],
+            "empty_seats": waste, "workers": workers, "seconds": round(time.monotonic() - started, 3)}
+
+
+def apply_timetable(result):
+    # books the solved slots as schedules; each one is still checked, so a change made meanwhile is reported
+    created = []
+    failed = []
+    with ums.data_lock:
+        for row in result["assignments"]:
+            try:
+                course = ums.find_course(row["Course ID"])
+                classroom = ums.find_classroom(row["Classroom ID"])
+                ums.check_schedule_slot(classroom, course, course.professor, row["Time Slot"])
+                schedule = ums.Schedule(ums.schedules.new_id("sch_"), course, course.professor, row["Time Slot"],
+                                        classroom.location)
+                ums.schedules.add(schedule)
+            except (LookupError, ValueError) as e:
+                failed.append({"Course ID": row["Course ID"], "error": str(e)})
+                continue
+            classroom.allocate_class(schedule)
+            created.append(schedule.get_schedule_id())
+    return {"created": created, "failed": failed}
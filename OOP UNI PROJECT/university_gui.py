@@ -188,7 +188,7 @@ class UniversityGUI:
         frame.pack(fill="both", expand=True, padx=10, pady=10)
 
         ttk.Button(frame, text="Add Classroom", command=self.add_classroom).grid(row=0, column=0, padx=5, pady=5)
-        # Add View Classroom Info if needed
+        ttk.Button(frame, text="Find Free Rooms", command=self.find_free_rooms).grid(row=0, column=1, padx=5, pady=5)
 
         self.classroom_list = tk.Listbox(frame, width=60, height=15)
         self.classroom_list.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
@@ -363,11 +363,15 @@ class UniversityGUI:
             major = dialog.result.get("Major")
             email = dialog.result.get("Email")
             if name and student_id and major and email:
-                if any(s._id == student_id for s in ums.students):
+                if student_id in ums.students:
                     messagebox.showerror("Error", f"Student with ID {student_id} already exists.")
                     return
                 student = ums.Student(student_id, name, major, email)
-                ums.students.append(student)
+                try:
+                    ums.students.add(student)
+                except ValueError as e:  # e.g. the email is already taken
+                    messagebox.showerror("Error", str(e))
+                    return
                 messagebox.showinfo("Success", f"Student {name} added.")
                 self.refresh_students()
             else:
@@ -377,7 +381,7 @@ class UniversityGUI:
         if not ums.students: messagebox.showinfo("Info", "No students available."); return
         student_id = simpledialog.askstring("Input", "Enter Student ID:")
         if student_id:
-            student = next((s for s in ums.students if s.get_id() == student_id), None)
+            student = ums.students.get(student_id)
             if student:
                 info = student.get_info()
                 result_str = "\n".join([f"{k}: {v}" for k, v in info.items()])
@@ -394,8 +398,8 @@ class UniversityGUI:
         if dialog.result:
             student_id = dialog.result.get("Student ID")
             course_id = dialog.result.get("Course ID")
-            student = next((s for s in ums.students if s.get_id() == student_id), None)
-            course = next((c for c in ums.courses if c.course_id == course_id), None)
+            student = ums.students.get(student_id)
+            course = ums.courses.get(course_id)
 
             if student and course:
                 capture_output(student.enroll_course, course.course_id, course.name)
@@ -414,8 +418,8 @@ class UniversityGUI:
         if dialog.result:
             student_id = dialog.result.get("Student ID")
             course_id = dialog.result.get("Course ID")
-            student = next((s for s in ums.students if s.get_id() == student_id), None)
-            course = next((c for c in ums.courses if c.course_id == course_id), None)
+            student = ums.students.get(student_id)
+            course = ums.courses.get(course_id)
             if student and course:
                 capture_output(student.drop_course, course.course_id)
                 capture_output(course.remove_student, student)
@@ -440,13 +444,13 @@ class UniversityGUI:
             contact = dialog.result.get("Contact Info")
             email = dialog.result.get("Email")
             if all([name, prof_id, dept_name, contact, email]):
-                if any(p.professor_id == prof_id for p in ums.professors):
+                if prof_id in ums.professors:
                     messagebox.showerror("Error", f"Professor with ID {prof_id} already exists.")
                     return
                 prof = ums.Professor(prof_id, name, dept_name, contact, email)
-                ums.professors.append(prof)
+                ums.professors.add(prof)
                 # link to department
-                department_obj = next((d for d in ums.departments if d.name == dept_name), None)
+                department_obj = ums.find_department_by_name(dept_name)
                 if department_obj:
                     department_obj.list_professors(prof)
                 else:
@@ -461,7 +465,7 @@ class UniversityGUI:
         if not ums.professors: messagebox.showinfo("Info", "No professors available."); return
         prof_id = simpledialog.askstring("Input", "Enter Professor ID:")
         if prof_id:
-            professor = next((p for p in ums.professors if p.professor_id == prof_id), None)
+            professor = ums.professors.get(prof_id)
             if professor:
                 info = professor.get_info()
                 result_str = "\n".join([f"{k}: {v}" for k, v in info.items()])
@@ -494,7 +498,7 @@ class UniversityGUI:
             messagebox.showwarning("Input Error", "All fields are required.")
             return
         
-        if any(c.course_id == course_id for c in ums.courses):
+        if course_id in ums.courses:
             messagebox.showerror("Error", f"Course with ID {course_id} already exists.")
             return
 
@@ -512,9 +516,9 @@ class UniversityGUI:
             return
 
         course = ums.Course(course_id, name, dept_name, credits, selected_professor)
-        ums.courses.append(course)
+        ums.courses.add(course)
 
-        department_obj = next((d for d in ums.departments if d.name == dept_name), None)
+        department_obj = ums.find_department_by_name(dept_name)
         if department_obj:
             department_obj.list_courses(course)
         else:
@@ -528,7 +532,7 @@ class UniversityGUI:
         if not ums.courses: messagebox.showinfo("Info", "No courses available."); return
         course_id = simpledialog.askstring("Input", "Enter Course ID:")
         if course_id:
-            course = next((c for c in ums.courses if c.course_id == course_id), None)
+            course = ums.courses.get(course_id)
             if course:
                 info = course.get_course_info()
                 result_str = "\n".join([f"{k}: {v}" for k, v in info.items()])
@@ -550,11 +554,11 @@ class UniversityGUI:
             name = dialog.result.get("Name")
             hod = dialog.result.get("Head of Department")
             if all([dept_id, name, hod]):
-                if any(d.department_id == dept_id for d in ums.departments):
+                if dept_id in ums.departments:
                     messagebox.showerror("Error", f"Department with ID {dept_id} already exists.")
                     return
                 dept = ums.Department(dept_id, name, hod)
-                ums.departments.append(dept)
+                ums.departments.add(dept)
                 messagebox.showinfo("Success", f"Department {name} added.")
                 self.refresh_departments()
             else:
@@ -658,11 +662,11 @@ class UniversityGUI:
             if all([class_id, location, capacity_str]):
                 try:
                     capacity = int(capacity_str)
-                    if any(cr.classroom_id == class_id for cr in ums.classrooms):
+                    if class_id in ums.classrooms:
                         messagebox.showerror("Error", f"Classroom with ID {class_id} already exists.")
                         return
                     classroom = ums.Classroom(class_id, location, capacity)
-                    ums.classrooms.append(classroom)
+                    ums.classrooms.add(classroom)
                     messagebox.showinfo("Success", f"Classroom {class_id} at {location} added.")
                     self.refresh_classrooms()
                 except ValueError:
@@ -670,6 +674,23 @@ class UniversityGUI:
             else:
                 messagebox.showwarning("Input Error", "All fields are required.")
 
+    def find_free_rooms(self):
+        fields = [("Time Slot (e.g., Tue 14-16)", ""), ("Minimum Capacity (optional)", "")]
+        dialog = InputDialog(self.root, "Find Free Rooms", fields)
+        if not dialog.result: return
+        time_slot = dialog.result.get("Time Slot (e.g., Tue 14-16)")
+        min_capacity = dialog.result.get("Minimum Capacity (optional)")
+        if not time_slot:
+            messagebox.showwarning("Input Error", "Time Slot is required."); return
+        try:
+            rooms = ums.find_free_rooms(time_slot, int(min_capacity) if min_capacity else 0)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e)); return
+        if not rooms:
+            messagebox.showinfo("Free Rooms", f"No free rooms for {time_slot}."); return
+        messagebox.showinfo("Free Rooms", "\n".join(f"{r.classroom_id} - {r.location} (Cap: {r.capacity})"
+                                                     for r in rooms))
+
     def refresh_classrooms(self):
         self.classroom_list.delete(0, tk.END)
         for cr in ums.classrooms:
@@ -688,7 +709,7 @@ class UniversityGUI:
         if not all([schedule_id, time_slot]):
             messagebox.showwarning("Input Error", "Schedule ID and Time Slot are required.");
             return
-        if any(s.get_schedule_id() == schedule_id for s in ums.schedules):
+        if schedule_id in ums.schedules:
             messagebox.showerror("Error", f"Schedule with ID {schedule_id} already exists.");
             return
 
@@ -704,10 +725,15 @@ class UniversityGUI:
                                                       lambda cr: f"{cr.location} (ID: {cr.classroom_id})")
         if not selected_classroom: return
 
+        try:
+            ums.check_schedule_slot(selected_classroom, selected_course, selected_professor, time_slot)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e)); return
+
         # create schedule
         schedule_obj = ums.Schedule(schedule_id, selected_course, selected_professor, time_slot,
                                     selected_classroom.location)
-        ums.schedules.append(schedule_obj)
+        ums.schedules.add(schedule_obj)
 
         output = capture_output(selected_classroom.allocate_class, schedule_obj)
         messagebox.showinfo("Schedule Creation", output.strip())
@@ -786,7 +812,7 @@ class UniversityGUI:
             if not all([exam_id, date, duration_str, passing_score_str]):
                 messagebox.showwarning("Input Error", "All fields are required.");
                 return
-            if any(e.get_exam_id() == exam_id for e in ums.exams):
+            if exam_id in ums.exams:
                 messagebox.showerror("Error", f"Exam with ID {exam_id} already exists.");
                 return
 
@@ -794,7 +820,7 @@ class UniversityGUI:
                 duration = float(duration_str)
                 passing_score = float(passing_score_str)
                 exam = ums.FinalExam(exam_id, selected_course.name, date, duration, passing_score)
-                ums.exams.append(exam)
+                ums.exams.add(exam)
                 messagebox.showinfo("Success", f"Exam {exam_id} for course {selected_course.name} added.")
                 self.refresh_exams()
             except ValueError:
@@ -854,11 +880,11 @@ class UniversityGUI:
         if dialog.result:
             lib_id = dialog.result.get("Library ID")
             if lib_id:
-                if any(l.get_library_id() == lib_id for l in ums.libraries):
+                if lib_id in ums.libraries:
                     messagebox.showerror("Error", f"Library with ID {lib_id} already exists.")
                     return
                 lib = ums.Library(lib_id)
-                ums.libraries.append(lib)
+                ums.libraries.add(lib)
                 messagebox.showinfo("Success", f"Library {lib_id} added.")
                 self.refresh_libraries_list_display()
             else:
@@ -1,9 +1,28 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import asyncio
 import socket
+import sys
+import threading
 import json
 
+from attendance_store import AttendanceStore, STATUS_NAMES, day_ordinal, day_text
+from timeslots import DAYS, DAY_MINUTES, AvailabilityIndex, SlotIndex, TimeSlot, overlapping_pairs, parse_time_slot
+from protocol import send_message, recv_message, read_message, write_message, STREAM_DATA, STREAM_END
+
+# callables notified of every state change as listener(op, args), e.g. the write-ahead log
+mutation_listeners = []
+
+
+def log_mutation(op, *args):
+    for listener in mutation_listeners:
+        listener(op, args)
+
 class Person(ABC):
+    __slots__ = ("email", "name")  # subclasses without __slots__ (Professor, Admin) still get a __dict__
+
     def __init__(self, email, name):
         self.email = email
         self.name = name
@@ -13,7 +32,36 @@ class Person(ABC):
         pass
 
 
+class Enrollment:
+    # one course in Student._courses_enrolled; still readable and writable as info["name"] / info["grade"]
+    __slots__ = ("name", "grade")
+
+    def __init__(self, name, grade=None):
+        self.name = name
+        self.grade = grade
+
+    def __getitem__(self, field):
+        if field not in Enrollment.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in Enrollment.__slots__:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __eq__(self, other):
+        if isinstance(other, Enrollment):
+            return (self.name, self.grade) == (other.name, other.grade)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Enrollment(name={self.name!r}, grade={self.grade!r})"
+
+
 class Student(Person):
+    __slots__ = ("_id", "_major", "_courses_enrolled")
+
     def __init__(self, student_id, name, major, email):
         super().__init__(email, name)
         self._id = student_id
@@ -25,7 +73,8 @@ class Student(Person):
 
     def enroll_course(self, course_id, course_name):
         if course_id not in self._courses_enrolled:
-            self._courses_enrolled[course_id] = {"name": course_name, "grade": None}
+            self._courses_enrolled[course_id] = Enrollment(course_name)
+            log_mutation("enroll", self._id, course_id, course_name)
             print(f"{self.name} has enrolled in {course_name}")
         else:
             print(f"{self.name} is already enrolled in {course_name}")
@@ -34,6 +83,7 @@ class Student(Person):
         if course_id in self._courses_enrolled:
             course_name = self._courses_enrolled[course_id]["name"]  # to display
             del self._courses_enrolled[course_id]
+            log_mutation("drop_course", self._id, course_id)
             print(f"{self.name} has dropped {course_name}")
         else:
             print(f"{self.name} is not enrolled in course {course_id}")
@@ -41,6 +91,7 @@ class Student(Person):
     def set_grade(self, course_id, grade):
         if course_id in self._courses_enrolled:
             self._courses_enrolled[course_id]["grade"] = grade  # to update
+            log_mutation("grade", self._id, course_id, grade)
         else:
             print(f"{self.name} is not enrolled in course {course_id}")
 
@@ -76,6 +127,7 @@ class Professor(Person):
     def assign_grade(self, student, course_id, grade):
         if course_id in self.courses_taught and course_id in student._courses_enrolled:
             student._courses_enrolled[course_id]["grade"] = grade
+            log_mutation("grade", student._id, course_id, grade)
             print(f"Grade {grade} assigned to {student.name} for {student._courses_enrolled[course_id]['name']}")
         else:
             print("Cannot assign grade: Course not found or student not enrolled.")
@@ -116,11 +168,13 @@ class Course:
     def add_student(self, student):
         if student._id not in self.enrolled_students:
             self.enrolled_students[student._id] = student
+            log_mutation("course_add_student", self.course_id, student._id)
 
     def remove_student(self, student):
         if student._id in self.enrolled_students:
             del self.enrolled_students[student._id]
             del student._courses_enrolled[self.course_id]
+            log_mutation("course_remove_student", self.course_id, student._id)
             print(f"{student.name} has been removed from {self.name}")
         else:
             print(f"{student.name} is not enrolled in {self.name}")
@@ -151,9 +205,16 @@ class Department:
 
     def list_courses(self, course):
         self.courses_offered.append(course)
+        log_mutation("department_course", self.department_id, course.course_id)
 
     def list_professors(self, professor):
         self.faculty_members.append(professor)
+        log_mutation("department_professor", self.department_id, professor.professor_id)
+
+    def remove_professor(self, professor):
+        if professor in self.faculty_members:
+            self.faculty_members.remove(professor)
+            log_mutation("department_remove_professor", self.department_id, professor.professor_id)
 
 
 class Admin(Person):
@@ -226,6 +287,7 @@ class Admin(Person):
 
 
 class ScheduleBase(ABC):
+    __slots__ = ()
 
     @abstractmethod
     def assign_schedule(self):
@@ -241,6 +303,8 @@ class ScheduleBase(ABC):
 
 
 class Schedule(ScheduleBase):
+    __slots__ = ("__schedule_id", "__course", "__professor", "__time_slot", "__location")
+
     def __init__(self, schedule_id, course, professor, time_slot, location):
         self.__schedule_id = schedule_id
         self.__course = course
@@ -264,21 +328,38 @@ class Schedule(ScheduleBase):
         return self.__location
 
     def set_time_slot(self, time_slot):
+        classrooms.load_all()
+        room = schedule_rooms.get(self.__schedule_id)
+        if room is not None:
+            room.move(self, time_slot)
         self.__time_slot = time_slot
+        log_mutation("schedule_update", self.__schedule_id, time_slot, None)
 
     def set_location(self, location):
         self.__location = location
+        log_mutation("schedule_update", self.__schedule_id, None, location)
 
     def assign_schedule(self):
         print(
             f"Assigned Schedule:\nCourse: {self.__course.name}, Professor: {self.__professor.name}, Time Slot: {self.__time_slot}, Location: {self.__location}")
 
-    def update_schedule(self, time_slot=None, location=None):
+    def update_schedule(self, time_slot=None, location=None, check=True):
+        # check=False skips the clash checks, for replaying a change that was accepted when it was logged
         if time_slot:
+            classrooms.load_all()
+            room = schedule_rooms.get(self.__schedule_id)
+            try:
+                if room is not None:
+                    room.move(self, time_slot, check)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return False
             self.__time_slot = time_slot
         if location:
             self.__location = location
+        log_mutation("schedule_update", self.__schedule_id, time_slot, location)
         print("Schedule updated successfully.")
+        return True
 
     def view_schedule(self):
         return (f"Schedule ID: {self.__schedule_id}, Course: {self.__course.name}, "
@@ -290,21 +371,90 @@ class Classroom:
     def __init__(self, classroom_id, location, capacity):
         self.classroom_id = classroom_id
         self.location = location
-        self.capacity = capacity
+        try:
+            self.capacity = int(capacity)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid capacity '{capacity}', expected a whole number of seats")
+        if self.capacity < 0:
+            raise ValueError(f"Invalid capacity '{capacity}', expected a whole number of seats")
         self.schedule = []
+        self.booked = SlotIndex()  # the schedules above by parsed time slot, for overlap checks
+        self.unparsed = []  # schedules whose saved time slot could not be read
+
+    def busy_slots(self):
+        # what the free-room index counts as taken; a booking with an unreadable slot could be at any time
+        if self.unparsed:
+            return [TimeSlot(day, 0, DAY_MINUTES) for day in range(len(DAYS))]
+        return [slot for slot, s in self.booked.items()]
+
+    def update_availability(self):
+        # keeps the free-room index in step with this room's bookings
+        if room_availability.get(self.classroom_id) is self:
+            room_availability.set(self.classroom_id, self, self.capacity, self.busy_slots())
+
+    def conflicts(self, time_slot, ignore=None):
+        # schedules in this room whose time slot overlaps time_slot ("Mon 9-11" clashes with "Mon 10-12")
+        return [s for s in self.booked.overlapping(parse_time_slot(time_slot)) if s is not ignore]
 
     def check_availability(self, time_slot):
-        for s in self.schedule:
-            if s.get_time_slot() == time_slot:
-                return False
-        return True
+        return not self.conflicts(time_slot)
 
-    def allocate_class(self, schedule):
-        if not self.check_availability(schedule.get_time_slot()):
-            print(f"Time slot {schedule.get_time_slot()} is already taken in {self.location}.")
-            return
+    def check_free(self, time_slot, ignore=None):
+        clashes = self.conflicts(time_slot, ignore)
+        if clashes:
+            raise ValueError(f"Time slot {time_slot} overlaps {clashes[0].get_time_slot()} "
+                             f"({clashes[0].get_schedule_id()}) in {self.location}.")
+
+    def book(self, schedule):
+        # no checks and no log record, used when restoring saved state
         self.schedule.append(schedule)
+        schedule_rooms[schedule.get_schedule_id()] = self
+        try:
+            slot = parse_time_slot(schedule.get_time_slot())
+        except ValueError:
+            # saved before slots were parsed; the room is shown as busy until the slot is fixed
+            print(f"Schedule {schedule.get_schedule_id()} in {self.classroom_id} has an unreadable time slot "
+                  f"'{schedule.get_time_slot()}', the room is not offered as free until it is updated.")
+            self.unparsed.append(schedule)
+            self.update_availability()
+            return
+        self.booked.add(slot, schedule)
+        schedule_index.add(slot, schedule)
+        self.update_availability()
+
+    def move(self, schedule, time_slot, check=True):
+        # re-index schedule under a new time slot, ValueError if the room, professor or course is busy then
+        # (unless check is False)
+        if check:
+            check_schedule_slot(self, schedule.get_course(), schedule.get_professor(), time_slot, ignore=schedule)
+        try:
+            old = parse_time_slot(schedule.get_time_slot())
+            self.booked.remove(old, schedule)
+            schedule_index.remove(old, schedule)
+        except ValueError:
+            self.unparsed = [s for s in self.unparsed if s is not schedule]
+        try:
+            slot = parse_time_slot(time_slot)
+        except ValueError:
+            if check:
+                raise
+            self.unparsed.append(schedule)
+            self.update_availability()
+            return
+        self.booked.add(slot, schedule)
+        schedule_index.add(slot, schedule)
+        self.update_availability()
+
+    def allocate_class(self, schedule):
+        try:
+            check_schedule_slot(self, schedule.get_course(), schedule.get_professor(), schedule.get_time_slot())
+        except ValueError as e:
+            print(e)
+            return False
+        self.book(schedule)
+        log_mutation("allocate_class", self.classroom_id, schedule.get_schedule_id())
         print(f"Class allocated at {self.location} for course {schedule.get_course().name}")
+        return True
 
     def get_classroom_info(self):
         return {
@@ -315,6 +465,47 @@ class Classroom:
         }
 
 
+class ScheduleIndex:
+    # every booked schedule by parsed time slot, filed under its professor, under its course and under None
+    # (all schedules), so checking a new or moved schedule is a few binary searches
+    def __init__(self):
+        self.slots = SlotIndex()
+
+    @staticmethod
+    def keys(schedule):
+        return [None, ("professor", schedule.get_professor().professor_id), ("course", schedule.get_course().course_id)]
+
+    def add(self, slot, schedule):
+        for key in self.keys(schedule):
+            self.slots.add(slot, schedule, key)
+
+    def remove(self, slot, schedule):
+        for key in self.keys(schedule):
+            self.slots.remove(slot, schedule, key)
+
+    def check(self, course, professor, time_slot, ignore=None):
+        slot = parse_time_slot(time_slot)
+        for key, busy in [(("professor", professor.professor_id), f"{professor.name} already teaches"),
+                          (("course", course.course_id), f"{course.name} already meets")]:
+            clashes = [s for s in self.slots.overlapping(slot, key) if s is not ignore]
+            if clashes:
+                raise ValueError(f"{busy} at {clashes[0].get_time_slot()} ({clashes[0].get_schedule_id()}).")
+
+    def student_clashes(self, course, time_slot, ignore=None):
+        # {schedule id: student ids} for other courses meeting at an overlapping time that share students
+        found = {}
+        for other in self.slots.overlapping(parse_time_slot(time_slot)):
+            if other is ignore or other.get_course() is course:
+                continue
+            shared = course.enrolled_students.keys() & other.get_course().enrolled_students.keys()
+            if shared:
+                found[other.get_schedule_id()] = sorted(shared)
+        return found
+
+    def clear(self):
+        self.slots.clear()
+
+
 class Exam(ABC):
     def __init__(self, exam_id, course, date, duration):
         self.__exam_id = exam_id
@@ -347,10 +538,14 @@ class Exam(ABC):
                 raise ValueError("Score must be between 0 and 100!")
             else:
                 self.__student_results[student_name] = score
+                log_mutation("exam_result", self.__exam_id, student_name, score)
                 print(f"Result recorded for {student_name}: {score}")
         except ValueError as e:
             print(f"Error: {e}")
 
+    def get_results(self):
+        return dict(self.__student_results)
+
     def view_results(self):
         if self.__student_results:
             print("Student Results:")
@@ -397,6 +592,7 @@ class Library:
                 "category": category,
                 "copies": copies
             }
+        log_mutation("add_book", self.__library_id, book_title, author, category, copies)
         print(f"Added {copies} {'copy' if copies == 1 else 'copies'} of '{book_title}' to the library.")
 
     def register_student(self, student_id, student_name):
@@ -405,6 +601,7 @@ class Library:
                 "name": student_name,
                 "borrowed_books": []
             }
+            log_mutation("library_register", self.__library_id, student_id, student_name)
             print(f"Student '{student_name}' registered in the library.")
         else:
             print(f"Student '{student_name}' is already registered.")
@@ -417,6 +614,7 @@ class Library:
                 raise ValueError(f"Book '{book_title}' is not available.")
             self._books[book_title]["copies"] -= 1
             self._students_registered[student_id]["borrowed_books"].append(book_title)
+            log_mutation("borrow_book", self.__library_id, student_id, book_title)
             print(f"Book '{book_title}' borrowed by {self._students_registered[student_id]['name']}.")
         except ValueError as e:
             print(f"Error: {e}")
@@ -433,6 +631,7 @@ class Library:
                 print(f"Book '{book_title}' returned by {self._students_registered[student_id]['name']}.")
             else:
                 print(f"{self._students_registered[student_id]['name']} did not borrow '{book_title}'.")
+            log_mutation("return_book", self.__library_id, student_id, book_title)
         except ValueError as e:
             print(f"Error: {e}")
 
@@ -442,13 +641,16 @@ class Library:
         else:
             print(f"'{book_title}' is not available.")
 
+    def find_books(self, keyword):
+        keyword = keyword.lower()
+        return {title: details for title, details in self._books.items()
+                if keyword in title.lower() or keyword in details["author"].lower() or keyword in
+                details["category"].lower()}
+
     def search_book(self, keyword):
-        found = False
-        for title, details in self._books.items():
-            if keyword.lower() in title.lower() or keyword.lower() in details["author"].lower() or keyword.lower() in \
-                    details["category"].lower():
-                print(f"Found: '{title}' by {details['author']} ({details['category']}) - Copies: {details['copies']}")
-                found = True
+        found = self.find_books(keyword)
+        for title, details in found.items():
+            print(f"Found: '{title}' by {details['author']} ({details['category']}) - Copies: {details['copies']}")
         if not found:
             print(f"No books found matching '{keyword}'.")
 
@@ -515,12 +717,16 @@ class User:
 
 
 class AttendanceRecord(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def record_attendance(self):
         pass
 
 
 class Attendance(AttendanceRecord):
+    __slots__ = ("__student", "__course", "__date", "__status")
+
     def __init__(self, student, course, date, status="Absent"):
         self.__student = student
         self.__course = course
@@ -538,11 +744,17 @@ class Attendance(AttendanceRecord):
         return self.__date
 
     def set_date(self, value):
-        try:
-            datetime.strptime(value, "%Y-%m-%d")
-            self.__date = value
-        except ValueError:
-            raise ValueError("Invalid date format. Use YYYY-MM-DD")
+        self.__date = day_text(day_ordinal(value))  # raises ValueError for anything but YYYY-MM-DD
+
+    @classmethod
+    def restore(cls, student, course, date, status):
+        # for values that were already checked, e.g. a row read back from an AttendanceStore
+        record = cls.__new__(cls)
+        record.__student = student
+        record.__course = course
+        record.__date = date
+        record.__status = status
+        return record
 
     def get_status(self):
         return self.__status
@@ -566,20 +778,97 @@ class Attendance(AttendanceRecord):
         }
 
 
+class StoredAttendance(Attendance):
+    # an Attendance built from one row of an AttendanceStore; set_status writes back to that row
+    __slots__ = ("store", "row")
+
+    def set_status(self, new_status):
+        super().set_status(new_status)
+        self.store.set_present(self.row, new_status == "Present")
+        log_mutation("attendance_status", self.get_student().get_id(), self.get_date(), new_status,
+                     self.get_course().course_id)
+
+    def set_date(self, value):
+        raise ValueError("The date of a stored attendance record cannot be changed")
+
+
+class AttendanceRecords:
+    # list-like view of an AttendanceStore (the shared attendance_store unless one is given);
+    # items are StoredAttendance objects built when they are read
+    def __init__(self, store=None):
+        self.store = store if store is not None else attendance_store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return [self[i] for i in range(*n.indices(len(self)))]
+        if n < 0:
+            n += len(self)
+        student, course, day, present = self.store.row(n)
+        record = StoredAttendance.restore(student, course, day_text(day), STATUS_NAMES[present])
+        record.store = self.store
+        record.row = n
+        return record
+
+    def __iter__(self):
+        with self.store.lock:
+            records = self[:]
+        return iter(records)
+
+    def append(self, attendance_obj):
+        student, course = attendance_obj.get_student(), attendance_obj.get_course()
+        self.store.append(student.get_id(), student, course.course_id, course,
+                          day_ordinal(attendance_obj.get_date()), attendance_obj.get_status() == "Present")
+
+    def clear(self):
+        self.store.clear()
+
+    def info(self, rows):
+        with self.store.lock:
+            return [self[n].get_attendance_info() for n in rows]
+
+
 class AttendanceReport:
-    def __init__(self):
-        self.attendance_records = []
+    def __init__(self, attendance_records=None):
+        self.attendance_records = attendance_records if attendance_records is not None else AttendanceRecords()
 
     def add_attendance(self, attendance_obj):
         if isinstance(attendance_obj, Attendance):
             self.attendance_records.append(attendance_obj)
+            log_mutation("attendance", attendance_obj.get_student().get_id(),
+                         attendance_obj.get_course().course_id, attendance_obj.get_date(),
+                         attendance_obj.get_status())
         else:
             raise TypeError("Only Attendance objects can be added")
 
+    def add_attendance_batch(self, course, date, statuses):
+        # (student, "Present"/"Absent") pairs for one course and date, stored as one batch with one log record
+        day = day_ordinal(date)
+        rows = []
+        for student, status in statuses:
+            if status not in ["Present", "Absent"]:
+                raise ValueError("Status must be 'Present' or 'Absent'")
+            rows.append((student.get_id(), student, course.course_id, course, day, status == "Present"))
+        self.attendance_records.store.append_many(rows)
+        log_mutation("attendance_batch", course.course_id, day_text(day),
+                     [[student.get_id(), status] for student, status in statuses])
+        return len(rows)
+
+    def record_roll_call(self, course, date, present_ids):
+        # everyone enrolled in the course is marked present if listed, absent otherwise
+        present_ids = set(present_ids)
+        unknown = sorted(present_ids - set(course.enrolled_students))
+        if unknown:
+            raise ValueError(f"Not enrolled in {course.course_id}: {', '.join(unknown)}")
+        statuses = [(student, "Present" if sid in present_ids else "Absent")
+                    for sid, student in course.enrolled_students.items()]
+        self.add_attendance_batch(course, date, statuses)
+        return {"present": len(present_ids), "absent": len(statuses) - len(present_ids)}
+
     def get_student_attendance(self, student):
-        records = [record.get_attendance_info()
-                   for record in self.attendance_records
-                   if record.get_student().get_id() == student.get_id()]
+        records = self.attendance_records.info(self.attendance_records.store.rows_where(student_id=student.get_id()))
 
         if not records:
             print(f"No attendance records found for {student.name}")
@@ -592,9 +881,7 @@ class AttendanceReport:
         return records
 
     def get_course_attendance(self, course):
-        records = [record.get_attendance_info()
-                   for record in self.attendance_records
-                   if record.get_course().course_id == course.course_id]
+        records = self.attendance_records.info(self.attendance_records.store.rows_where(course_id=course.course_id))
 
         if not records:
             print(f"No attendance records found for course {course.name}")
@@ -606,16 +893,22 @@ class AttendanceReport:
 
         return records
 
-    def calculate_attendance_percentage(self, student, course=None):
-        total_days = 0
-        present_days = 0
+    def get_attendance_between(self, start_date, end_date, student=None, course=None):
+        # records of a student and/or course from start_date to end_date (inclusive), in date order
+        start, end = day_ordinal(start_date), day_ordinal(end_date)
+        rows = self.attendance_records.store.rows_between(start, end, student.get_id() if student else None,
+                                                          course.course_id if course else None)
+        return self.attendance_records.info(rows)
 
-        for record in self.attendance_records:
-            if record.get_student().get_id() == student.get_id():
-                if course is None or record.get_course().course_id == course.course_id:
-                    total_days += 1
-                    if record.get_status() == "Present":
-                        present_days += 1
+    def get_absence_streaks(self, min_days=3, course=None):
+        return [{"Student ID": student.get_id(), "Student": student.name, "From": day_text(first),
+                 "To": day_text(last), "Days": days}
+                for student, first, last, days in
+                self.attendance_records.store.absence_streaks(min_days, course.course_id if course else None)]
+
+    def calculate_attendance_percentage(self, student, course=None):
+        present_days, total_days = self.attendance_records.store.counts(student.get_id(),
+                                                                        course.course_id if course else None)
 
         if total_days == 0:
             print(f"No attendance records found for {student.name}")
@@ -629,18 +922,19 @@ class AttendanceReport:
 
 
 class AttendanceProxy:
-    def __init__(self, user_role):
+    # permission checks in front of the same store the reports read, so there is nothing to copy or re-assign
+    def __init__(self, user_role, attendance_records=None):
         self.user_role = user_role.lower()
-        self.attendance_records = []
+        self.attendance_records = attendance_records if attendance_records is not None else AttendanceRecords()
+
+    def can_update(self):
+        return self.user_role in ["admin", "professor"]
 
     def add_record(self, attendance_obj):
-        if self.user_role not in ["admin", "professor"]:
+        if not self.can_update():
             raise PermissionError("Unauthorized: Only admins and professors can add attendance")
 
-        if not isinstance(attendance_obj, Attendance):
-            raise TypeError("Only Attendance objects can be added")
-
-        self.attendance_records.append(attendance_obj)
+        AttendanceReport(self.attendance_records).add_attendance(attendance_obj)
         print("Attendance record added successfully")
 
     def view_records(self, student=None, course=None):
@@ -648,11 +942,9 @@ class AttendanceProxy:
             print("No attendance records available")
             return []
 
-        filtered_records = []
-        for record in self.attendance_records:
-            if (student is None or record.get_student().get_id() == student.get_id()) and \
-                    (course is None or record.get_course().course_id == course.course_id):
-                filtered_records.append(record.get_attendance_info())
+        rows = self.attendance_records.store.rows_where(student_id=student.get_id() if student else None,
+                                                        course_id=course.course_id if course else None)
+        filtered_records = self.attendance_records.info(rows)
 
         if not filtered_records:
             print("No matching records found")
@@ -664,14 +956,13 @@ class AttendanceProxy:
 
         return filtered_records
 
-    def update_status(self, student_id, date, new_status):
-        if self.user_role not in ["admin", "professor"]:
+    def update_status(self, student_id, date, new_status, course_id=None):
+        if not self.can_update():
             print("Unauthorized: Only admins and professors can update attendance")
             return False
 
-        from datetime import datetime
         try:
-            datetime.strptime(date, "%Y-%m-%d")
+            day = day_ordinal(date)
         except ValueError:
             print("Invalid date format. Please use YYYY-MM-DD")
             return False
@@ -680,37 +971,1143 @@ class AttendanceProxy:
             print("Invalid status. Must be 'Present' or 'Absent'")
             return False
 
-        updated = False
-        for record in self.attendance_records:
-            if (record.get_student().get_id() == student_id and
-                    record.get_date() == date):
-                record.set_status(new_status)
-                updated = True
-                print(f"Attendance status for {record.get_student().name} updated to {new_status}")
+        store = self.attendance_records.store
+        with store.lock:
+            rows = store.rows_on(student_id, day, course_id)
+            for n in rows:
+                store.set_present(n, new_status == "Present")
+                print(f"Attendance status for {store.row(n)[0].name} updated to {new_status}")
 
-        if not updated:
+        if not rows:
             print("No matching attendance record found")
             return False
 
+        log_mutation("attendance_status", student_id, day_text(day), new_status, course_id)
         return True
 
+    def update_statuses(self, corrections):
+        # bulk form of update_status for (student_id, date, status[, course_id]) tuples: one pass over the
+        # index, no printing per row and a single log record; returns the number of rows changed and the failures
+        if not self.can_update():
+            print("Unauthorized: Only admins and professors can update attendance")
+            return None
 
-students = []
-courses = []
-professors = []
-departments = []
+        store = self.attendance_records.store
+        applied = []
+        failed = []
+        updated = 0
+        with store.lock:
+            for correction in corrections:
+                if len(correction) not in (3, 4):
+                    failed.append({"record": list(correction), "error": "Expected student_id,date,status[,course_id]"})
+                    continue
+                student_id, date, new_status, course_id = (list(correction) + [None])[:4]
+                try:
+                    day = day_ordinal(date)
+                except ValueError as e:
+                    failed.append({"record": list(correction), "error": str(e)})
+                    continue
+                if new_status not in ["Present", "Absent"]:
+                    failed.append({"record": list(correction), "error": "Status must be 'Present' or 'Absent'"})
+                    continue
+                rows = store.rows_on(student_id, day, course_id)
+                if not rows:
+                    failed.append({"record": list(correction), "error": "No matching attendance record found"})
+                    continue
+                for n in rows:
+                    updated += store.set_present(n, new_status == "Present")
+                applied.append([student_id, day_text(day), new_status, course_id])
+        if applied:
+            log_mutation("attendance_statuses", applied)
+        return {"updated": updated, "failed": failed}
+
+
+# shared by every worker thread, hold it while reading or changing the registries below
+data_lock = threading.RLock()
+
+
+class Registry:
+    # keeps objects by primary key (O(1) get / contains) while iterating in insertion order like a list
+    def __init__(self, label, key):
+        self.label = label
+        self._key = key
+        self._items = {}
+        self._ordered = None  # cached list for iteration and index access, rebuilt after a change
+        self._indexes = {}  # name -> (key function, unique, {value: id} or {value: {id: item}})
+        self._indexed_values = {}  # id -> {index name: value}, so updates know what to unlink
+        self._lazy = None  # records not built yet (see attach_lazy)
+        self._lazy_done = set()  # lazy record numbers already built or removed
+        self._lazy_left = 0
+        self.version = 0  # bumped when items are added or removed, for indexes kept outside the registry
+
+    def key_of(self, item):
+        return self._key(item)
+
+    def new_id(self, prefix):
+        # prefix followed by the first number from len + 1 up that no item uses (ids may also be chosen by hand)
+        with data_lock:
+            n = len(self) + 1
+            while f"{prefix}{n}" in self:
+                n += 1
+            return f"{prefix}{n}"
+
+    def unique_indexes(self):
+        return {name: key for name, (key, unique, entries) in self._indexes.items() if unique}
+
+    def attach_lazy(self, source):
+        # source (e.g. a memory-mapped snapshot) holds records that are only built when first asked for;
+        # it needs len(), load(n), key_at(n) and lookup(index name, value) -> record number or None,
+        # and may have lookup_all(index name, value) -> record numbers to answer non-unique queries itself
+        with data_lock:
+            self._lazy = source
+            self._lazy_done = set()
+            self._lazy_left = len(source)
+            self._ordered = None
+            self.version += 1
+
+    def _lazy_number(self, index, value):
+        if self._lazy is None:
+            return None
+        n = self._lazy.lookup(index, value)
+        return None if n is None or n in self._lazy_done else n
+
+    def _load_lazy(self, key):
+        with data_lock:
+            n = self._lazy_number("id", key)
+            if n is None:
+                return self._items.get(key)
+            return self._load_number(n, key)
+
+    def _load_number(self, n, key):
+        with data_lock:
+            item = self._lazy.load(n)
+            self._lazy_done.add(n)
+            self._lazy_left -= 1
+            self._items[key] = item
+            self._index_item(key, item)
+            self._ordered = None
+            return item
+
+    def load_all(self):
+        # iteration order and non-unique indexes need every record, build the rest in snapshot order
+        if self._lazy is None:
+            return
+        with data_lock:
+            if self._lazy is None:
+                return
+            ordered = {}
+            for n in range(len(self._lazy)):
+                if n not in self._lazy_done:
+                    item = self._lazy.load(n)
+                    key = self._key(item)
+                    self._index_item(key, item)
+                    ordered[key] = item
+                else:
+                    key = self._lazy.key_at(n)
+                    if key in self._items:
+                        ordered[key] = self._items[key]
+            for key, item in self._items.items():
+                ordered.setdefault(key, item)
+            self._items = ordered
+            self._lazy = None
+            self._lazy_done = set()
+            self._lazy_left = 0
+            self._ordered = None
+
+    def snapshot_entries(self):
+        # (lazy source, entries in iteration order); an entry is a record number not built yet or an item,
+        # so a new snapshot can copy unbuilt records as they are
+        with data_lock:
+            if self._lazy is None:
+                return None, list(self._items.values())
+            entries = []
+            placed = set()
+            for n in range(len(self._lazy)):
+                if n not in self._lazy_done:
+                    entries.append(n)
+                    continue
+                key = self._lazy.key_at(n)
+                if key in self._items:
+                    entries.append(self._items[key])
+                    placed.add(key)
+            entries.extend(item for key, item in self._items.items() if key not in placed)
+            return self._lazy, entries
+
+    def add_index(self, name, key, unique=False):
+        with data_lock:
+            self._indexes[name] = (key, unique, {})
+            for item_id, item in self._items.items():
+                self._index_item(item_id, item, [name])
+
+    def _check_unique(self, item_id, item, pending=None):
+        for name, (key, unique, entries) in self._indexes.items():
+            if not unique:
+                continue
+            value = key(item)
+            owner = entries.get(value, item_id)
+            n = self._lazy_number(name, value) if owner == item_id else None
+            if n is not None:
+                owner = self._lazy.key_at(n)
+            if owner != item_id or (pending is not None and (name, value) in pending):
+                raise ValueError(f"{self.label} with {name} {value} already exists.")
+            if pending is not None:
+                pending.add((name, value))
+
+    def _index_item(self, item_id, item, names=None):
+        values = self._indexed_values.setdefault(item_id, {})
+        for name in names or self._indexes:
+            key, unique, entries = self._indexes[name]
+            value = key(item)
+            values[name] = value
+            if unique:
+                entries[value] = item_id
+            else:
+                entries.setdefault(value, {})[item_id] = item
+
+    def _unindex_item(self, item_id):
+        for name, value in self._indexed_values.pop(item_id, {}).items():
+            key, unique, entries = self._indexes[name]
+            if unique:
+                if entries.get(value) == item_id:
+                    del entries[value]
+            else:
+                bucket = entries.get(value)
+                if bucket is not None:
+                    bucket.pop(item_id, None)
+                    if not bucket:
+                        del entries[value]
+
+    def add(self, item):
+        key = self._key(item)
+        with data_lock:
+            if key in self:
+                raise ValueError(f"{self.label} with ID {key} already exists.")
+            self._check_unique(key, item)
+            self._items[key] = item
+            self._index_item(key, item)
+            self._ordered = None
+            self.version += 1
+            log_mutation("add", self.label, item)
+        return item
+
+    def add_many(self, items):
+        # all or nothing, so a bad batch leaves the registry untouched
+        with data_lock:
+            keys = [self._key(item) for item in items]
+            seen = set()
+            pending = set()
+            for key, item in zip(keys, items):
+                if key in self or key in seen:
+                    raise ValueError(f"{self.label} with ID {key} already exists.")
+                seen.add(key)
+                self._check_unique(key, item, pending)
+            self._items.update(zip(keys, items))
+            for key, item in zip(keys, items):
+                self._index_item(key, item)
+            self._ordered = None
+            self.version += 1
+            log_mutation("add_many", self.label, items)
+        return items
+
+    def reindex(self, item):
+        # call after changing an indexed attribute of an item already in the registry
+        key = self._key(item)
+        with data_lock:
+            self._check_unique(key, item)
+            self._unindex_item(key)
+            self._index_item(key, item)
+            log_mutation("update", self.label, item)
+
+    def find(self, index, value):
+        key, unique, entries = self._indexes[index]
+        if unique:
+            item_id = entries.get(value)
+            if item_id is None:
+                n = self._lazy_number(index, value)
+                item_id = None if n is None else self._lazy.key_at(n)
+            item = None if item_id is None else self.get(item_id)
+            return [] if item is None else [item]
+        with data_lock:
+            lookup_all = getattr(self._lazy, "lookup_all", None)
+            if lookup_all is None:
+                self.load_all()
+            else:
+                for n in lookup_all(index, value):
+                    if n not in self._lazy_done:
+                        self._load_number(n, self._lazy.key_at(n))
+        return list(entries.get(value, {}).values())
+
+    def find_one(self, index, value):
+        found = self.find(index, value)
+        return found[0] if found else None
+
+    def index_values(self, index):
+        self.load_all()
+        return list(self._indexes[index][2])
+
+    def get(self, key, default=None):
+        item = self._items.get(key)
+        if item is None and self._lazy is not None:
+            item = self._load_lazy(key)
+        return default if item is None else item
+
+    def remove(self, key):
+        with data_lock:
+            if self._lazy is not None:
+                self._load_lazy(key)
+            if key not in self._items:
+                raise LookupError(f"{self.label} with ID {key} not found.")
+            item = self._items.pop(key)
+            self._unindex_item(key)
+            self._ordered = None
+            self.version += 1
+            log_mutation("remove", self.label, key)
+        return item
+
+    def clear(self):
+        with data_lock:
+            self._lazy = None
+            self._lazy_done = set()
+            self._lazy_left = 0
+            self._items.clear()
+            self._indexed_values.clear()
+            for key, unique, entries in self._indexes.values():
+                entries.clear()
+            self._ordered = None
+            self.version += 1
+
+    def ids(self):
+        self.load_all()
+        return list(self._items)
+
+    def _values(self):
+        ordered = self._ordered
+        if ordered is None:
+            with data_lock:
+                self.load_all()
+                ordered = self._ordered = list(self._items.values())
+        return ordered
+
+    def __contains__(self, key):
+        return key in self._items or self._lazy_number("id", key) is not None
+
+    def __len__(self):
+        return len(self._items) + self._lazy_left
+
+    def __iter__(self):
+        return iter(self._values())
+
+    def __getitem__(self, index):
+        # positional, like the lists this replaced (menus pick by number); use get() for IDs
+        return self._values()[index]
+
+
+students = Registry("Student", Student.get_id)
+courses = Registry("Course", lambda c: c.course_id)
+professors = Registry("Professor", lambda p: p.professor_id)
+departments = Registry("Department", lambda d: d.department_id)
 administrators = []
-classrooms = []
-schedules = []
-exams = []
-libraries = []
-attendance_records = []
-attendance_reports = []
+classrooms = Registry("Classroom", lambda c: c.classroom_id)
+schedules = Registry("Schedule", Schedule.get_schedule_id)
+exams = Registry("Exam", Exam.get_exam_id)
+schedule_rooms = {}  # schedule id -> the Classroom it is booked in
+schedule_index = ScheduleIndex()
+room_availability = AvailabilityIndex()  # rebuilt from classrooms when rooms are added or removed
+libraries = Registry("Library", Library.get_library_id)
+
+students.add_index("email", lambda s: s.email.lower(), unique=True)
+students.add_index("major", lambda s: s._major)
+professors.add_index("department", lambda p: p.department)
+departments.add_index("name", lambda d: d.name)
+
+
+def find_students_by_major(major):
+    return students.find("major", major)
+
+
+def find_student_by_email(email):
+    return students.find_one("email", email.lower())
+
+
+def find_professors_by_department(department_name):
+    return professors.find("department", department_name)
+
+
+def find_department_by_name(name):
+    return departments.find_one("name", name)
+
+
+def update_student(student_id, major=None, email=None):
+    with data_lock:
+        student = students.get(student_id)
+        if student is None:
+            raise LookupError(f"Student with ID {student_id} not found.")
+        old_major, old_email = student._major, student.email
+        student._major = major or old_major
+        student.email = email or old_email
+        try:
+            students.reindex(student)
+        except ValueError:
+            student._major, student.email = old_major, old_email
+            raise
+        return student
+
+
+def update_professor_department(professor_id, department_name):
+    with data_lock:
+        professor = professors.get(professor_id)
+        if professor is None:
+            raise LookupError(f"Professor with ID {professor_id} not found.")
+        old_dept = find_department_by_name(professor.department)
+        if old_dept:
+            old_dept.remove_professor(professor)
+        professor.department = department_name
+        professors.reindex(professor)
+        new_dept = find_department_by_name(department_name)
+        if new_dept:
+            new_dept.list_professors(professor)
+        return professor
+
+
+def remove_student(student_id):
+    with data_lock:
+        load_deferred()  # attendance still waiting to be loaded would come back without its student
+        student = students.remove(student_id)
+        for course_id in list(student._courses_enrolled):
+            course = courses.get(course_id)
+            if course:
+                course.enrolled_students.pop(student_id, None)
+        attendance_store.remove_student(student_id)
+        return student
+attendance_store = AttendanceStore()  # every attendance row; reports and proxies are views over it
+attendance_report = AttendanceReport()
+deferred_loaders = []  # run once before attendance is first used, e.g. rows from a mapped snapshot
 attendance_proxies = []
 users = []
 
 SERVER_HOST = '127.0.0.1'
 SERVER_PORT = 3000
+SERVER_WORKERS = 64     # max clients served at the same time
+SERVER_BACKLOG = 128    # pending connections queued by the OS
+IMPORT_DIR = "imports"  # IMPORT_FILE only reads files in here, relative to the server's working directory
+CLIENT_TIMEOUT = 300    # seconds an idle client may hold a worker
+
+
+def parse_student_record(line):
+    fields = [f.strip() for f in line.split(',')]
+    if len(fields) != 4:
+        raise ValueError("Expected id,name,major,email")
+    if not all(fields):
+        raise ValueError("All fields are required")
+    if '@' not in fields[3]:
+        raise ValueError(f"Invalid email '{fields[3]}'")
+    return fields
+
+
+def add_students_batch(lines):
+    # validate, dedupe and insert a whole batch with one pass over the existing students
+    results = []
+    new_students = []
+    with data_lock:
+        taken = set()
+        emails = set()
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                s_id, name, major, email = parse_student_record(line)
+            except ValueError as e:
+                results.append({"record": line, "status": "invalid", "error": str(e)})
+                continue
+            if s_id in taken or s_id in students:
+                results.append({"id": s_id, "status": "duplicate"})
+                continue
+            if email.lower() in emails or find_student_by_email(email):
+                results.append({"id": s_id, "status": "duplicate", "error": f"Email {email} already in use"})
+                continue
+            taken.add(s_id)
+            emails.add(email.lower())
+            new_students.append(Student(s_id, name, major, email))
+            results.append({"id": s_id, "status": "added"})
+        students.add_many(new_students)
+    return {"added": len(new_students), "rejected": len(results) - len(new_students), "results": results}
+
+
+# maps a command name to (handler, argument parser); add new commands with @command
+COMMANDS = {}
+# commands registered with locked=False: long-running ones that take the locks they need themselves,
+# run without data_lock (and off the asyncio event loop)
+UNLOCKED = set()
+
+
+def command(name, parse=None, locked=True):
+    def register(handler):
+        COMMANDS[name] = (handler, parse or no_args)
+        if not locked:
+            UNLOCKED.add(name)
+        return handler
+    return register
+
+
+# commands that reply with several messages: the handler checks its arguments and returns a generator
+# of messages, which is sent without holding data_lock (see protocol.STREAM_DATA)
+STREAMS = {}
+
+
+def stream_command(name, parse=None):
+    def register(handler):
+        STREAMS[name] = (handler, parse or no_args)
+        return handler
+    return register
+
+
+def replies(resp):
+    return [resp] if isinstance(resp, str) else resp
+
+
+def runs_unlocked(msg):
+    cmd = msg.split(' ', 1)[0].upper()
+    return cmd in STREAMS or cmd in UNLOCKED
+
+
+def stream_chunks(chunks):
+    rows = 0
+    for chunk in chunks:
+        rows += chunk.count("\n") + 1
+        yield STREAM_DATA + chunk
+    yield f"{STREAM_END}{rows}"
+
+
+def no_args(args):
+    return ()
+
+
+no_args.usage = "no arguments"
+
+
+def raw_args(args):
+    return (args,)
+
+
+raw_args.usage = "<text>"
+
+
+def fields(*names, optional=()):
+    # splits "a,b,c" into exactly the named fields, trailing optional ones may be left out
+    def parse(args):
+        values = [v.strip() for v in args.split(',')] if args.strip() else []
+        if not len(names) <= len(values) <= len(names) + len(optional):
+            raise ValueError(f"Expected {parse.usage}")
+        if not all(values):
+            raise ValueError(f"Expected {parse.usage}")
+        return values + [None] * (len(names) + len(optional) - len(values))
+
+    parse.usage = ",".join(list(names) + [f"[{o}]" for o in optional])
+    return parse
+
+
+def find_student(student_id):
+    student = students.get(student_id)
+    if student is None:
+        raise LookupError(f"Student with ID {student_id} not found.")
+    return student
+
+
+def find_professor(professor_id):
+    professor = professors.get(professor_id)
+    if professor is None:
+        raise LookupError(f"Professor with ID {professor_id} not found.")
+    return professor
+
+
+def find_course(course_id):
+    course = courses.get(course_id)
+    if course is None:
+        raise LookupError(f"Course with ID {course_id} not found.")
+    return course
+
+
+def find_department(department_id):
+    department = departments.get(department_id)
+    if department is None:
+        raise LookupError(f"Department with ID {department_id} not found.")
+    return department
+
+
+def find_classroom(classroom_id):
+    classroom = classrooms.get(classroom_id)
+    if classroom is None:
+        raise LookupError(f"Classroom with ID {classroom_id} not found.")
+    return classroom
+
+
+def check_schedule_slot(classroom, course, professor, time_slot, ignore=None):
+    # ValueError naming the first clash: the room, the professor or the course already busy at that time
+    classrooms.load_all()
+    classroom.check_free(time_slot, ignore)
+    schedule_index.check(course, professor, time_slot, ignore)
+
+
+def student_clash_warning(course, time_slot, ignore=None):
+    clashes = schedule_index.student_clashes(course, time_slot, ignore)
+    if not clashes:
+        return None
+    students_hit = len(set().union(*clashes.values()))
+    return (f"Warning: {students_hit} student(s) of {course.course_id} have another class at {time_slot} "
+            f"({', '.join(clashes)}).")
+
+
+def find_free_rooms(time_slot, min_capacity=0, max_capacity=None):
+    # classrooms with min_capacity <= capacity (<= max_capacity) and nothing booked during time_slot,
+    # smallest first
+    slot = parse_time_slot(time_slot)
+    with data_lock:
+        if room_availability.version != classrooms.version:
+            classrooms.load_all()
+            room_availability.clear()
+            for room in classrooms:
+                room_availability.set(room.classroom_id, room, room.capacity, room.busy_slots())
+            room_availability.version = classrooms.version
+        return room_availability.free(slot, min_capacity, max_capacity)
+
+
+def term_conflicts():
+    # every clash in the timetable: two schedules in one room, a professor or a course in two places at once,
+    # or students enrolled in two courses that meet at overlapping times; one sweep per day, not every pair
+    with data_lock:
+        classrooms.load_all()
+        conflicts = []
+        for day, a, b in overlapping_pairs(schedule_index.slots.items()):
+            entry = {"Day": DAYS[day], "Schedules": [a.get_schedule_id(), b.get_schedule_id()],
+                     "Time Slots": [a.get_time_slot(), b.get_time_slot()]}
+            room = schedule_rooms.get(a.get_schedule_id())
+            if room is not None and room is schedule_rooms.get(b.get_schedule_id()):
+                conflicts.append({"Type": "room", **entry, "Classroom": room.classroom_id})
+            if a.get_professor().professor_id == b.get_professor().professor_id:
+                conflicts.append({"Type": "professor", **entry, "Professor": a.get_professor().professor_id})
+            course_a, course_b = a.get_course(), b.get_course()
+            if course_a.course_id == course_b.course_id:
+                conflicts.append({"Type": "course", **entry, "Course": course_a.course_id})
+            else:
+                shared = course_a.enrolled_students.keys() & course_b.enrolled_students.keys()
+                if shared:
+                    conflicts.append({"Type": "students", **entry, "Students": sorted(shared)})
+        return conflicts
+
+
+def find_schedule(schedule_id):
+    schedule = schedules.get(schedule_id)
+    if schedule is None:
+        raise LookupError(f"Schedule with ID {schedule_id} not found.")
+    return schedule
+
+
+def find_exam(exam_id):
+    exam = exams.get(exam_id)
+    if exam is None:
+        raise LookupError(f"Exam with ID {exam_id} not found.")
+    return exam
+
+
+def find_library(library_id):
+    library = libraries.get(library_id)
+    if library is None:
+        raise LookupError(f"Library with ID {library_id} not found.")
+    return library
+
+
+def load_deferred():
+    with data_lock:
+        while deferred_loaders:
+            deferred_loaders.pop(0)()
+
+
+def get_attendance_report():
+    load_deferred()
+    return attendance_report
+
+
+def add_attendance_record(student, course, date, status):
+    report = get_attendance_report()
+    attendance = Attendance(student, course, date, status)
+    report.add_attendance(attendance)
+    return attendance
+
+
+@command("LIST_COMMANDS")
+def cmd_list_commands():
+    return json.dumps({name: parse.usage for name, (handler, parse) in sorted({**COMMANDS, **STREAMS}.items())})
+
+
+@command("GET_STUDENT_COUNT")
+def cmd_get_student_count():
+    return f"COUNT: {len(students)}"
+
+
+@command("ADD_STUDENT", fields("id", "name", "major", "email"))
+def cmd_add_student(s_id, name, major, email):
+    if s_id in students:
+        return f"ERROR: Student with ID {s_id} already exists."
+    students.add(Student(s_id, name, major, email))
+    return f"SUCCESS: Student {name} added."
+
+
+@command("ADD_STUDENTS", raw_args)
+def cmd_add_students(args):
+    return json.dumps(add_students_batch(args.replace(';', '\n').splitlines()))
+
+
+@command("IMPORT_FILE", fields("kind", "path", optional=("format",)), locked=False)
+def cmd_import_file(kind, path, fmt):
+    # path is read on the server, inside IMPORT_DIR; kind is students, professors or courses.
+    # runs without data_lock: the importer takes it for each chunk it adds
+    import bulk_import
+    path = bulk_import.resolve_path(IMPORT_DIR, path)
+    return json.dumps(bulk_import.import_file(path, kind.lower(), fmt and fmt.lower()))
+
+
+@stream_command("EXPORT", raw_args)
+def cmd_export(args):
+    # kinds are students, rosters, attendance and loans, comma separated; all of them when left out
+    import export
+    return stream_chunks(export.export_chunks(export.parse_kinds(args)))
+
+
+@command("GET_STUDENT_INFO", fields("student_id"))
+def cmd_get_student_info(s_id):
+    student = students.get(s_id)
+    if student is None:
+        return f"ERROR: Student with ID {s_id} not found."
+    # convert student info to JSON string to send
+    return json.dumps(student.get_info())
+
+
+@command("GET_STUDENTS_INFO", raw_args)
+def cmd_get_students_info(args):
+    ids = [i.strip() for i in args.replace('\n', ',').split(',') if i.strip()]
+    found = {i: students.get(i) for i in ids}
+    return json.dumps({i: s.get_info() if s else None for i, s in found.items()})
+
+
+@command("FIND_STUDENTS_BY_MAJOR", fields("major"))
+def cmd_find_students_by_major(major):
+    return json.dumps([s.get_info() for s in find_students_by_major(major)])
+
+
+@command("FIND_STUDENT_BY_EMAIL", fields("email"))
+def cmd_find_student_by_email(email):
+    student = find_student_by_email(email)
+    if student is None:
+        return f"ERROR: No student with email {email}."
+    return json.dumps(student.get_info())
+
+
+@command("UPDATE_STUDENT", fields("student_id", "field", "value"))
+def cmd_update_student(student_id, field, value):
+    if field.lower() not in ["major", "email"]:
+        return "ERROR: Only major and email can be updated."
+    update_student(student_id, **{field.lower(): value})
+    return f"SUCCESS: Student {student_id} updated."
+
+
+@command("REMOVE_STUDENT", fields("student_id"))
+def cmd_remove_student(student_id):
+    student = remove_student(student_id)
+    return f"SUCCESS: Student {student.name} removed."
+
+
+@command("ADD_PROFESSOR", fields("id", "name", "department", "contact_info", "email"))
+def cmd_add_professor(professor_id, name, department, contact_info, email):
+    if professor_id in professors:
+        return f"ERROR: Professor with ID {professor_id} already exists."
+    prof = Professor(professor_id, name, department, contact_info, email)
+    professors.add(prof)
+    dept = find_department_by_name(department)
+    if dept:
+        dept.list_professors(prof)
+    return f"SUCCESS: Professor {name} added."
+
+
+@command("GET_PROFESSOR_INFO", fields("professor_id"))
+def cmd_get_professor_info(professor_id):
+    return json.dumps(find_professor(professor_id).get_info())
+
+
+@command("UPDATE_PROFESSOR_DEPARTMENT", fields("professor_id", "department"))
+def cmd_update_professor_department(professor_id, department):
+    professor = update_professor_department(professor_id, department)
+    return f"SUCCESS: {professor.name} moved to {department}."
+
+
+@command("GET_DEPARTMENT_FACULTY", fields("department"))
+def cmd_get_department_faculty(department):
+    return json.dumps([p.get_info() for p in find_professors_by_department(department)])
+
+
+@command("ADD_COURSE", fields("id", "name", "department", "credits", "professor_id"))
+def cmd_add_course(course_id, name, department, credits, professor_id):
+    if course_id in courses:
+        return f"ERROR: Course with ID {course_id} already exists."
+    course = Course(course_id, name, department, credits, find_professor(professor_id))
+    courses.add(course)
+    dept = find_department_by_name(department)
+    if dept:
+        dept.list_courses(course)
+    return f"SUCCESS: Course {name} added."
+
+
+@command("GET_COURSE_INFO", fields("course_id"))
+def cmd_get_course_info(course_id):
+    return json.dumps(find_course(course_id).get_course_info())
+
+
+@command("ENROLL", fields("student_id", "course_id"))
+def cmd_enroll(student_id, course_id):
+    student = find_student(student_id)
+    course = find_course(course_id)
+    if course_id in student._courses_enrolled:
+        return f"ERROR: {student.name} is already enrolled in {course.name}."
+    student.enroll_course(course.course_id, course.name)
+    course.add_student(student)
+    return f"SUCCESS: {student.name} enrolled in {course.name}."
+
+
+@command("DROP", fields("student_id", "course_id"))
+def cmd_drop(student_id, course_id):
+    student = find_student(student_id)
+    course = find_course(course_id)
+    if student_id not in course.enrolled_students:
+        return f"ERROR: {student.name} is not enrolled in {course.name}."
+    course.remove_student(student)
+    return f"SUCCESS: {student.name} removed from {course.name}."
+
+
+@command("ASSIGN_GRADE", fields("professor_id", "student_id", "course_id", "grade"))
+def cmd_assign_grade(professor_id, student_id, course_id, grade):
+    professor = find_professor(professor_id)
+    student = find_student(student_id)
+    if course_id not in professor.courses_taught or course_id not in student._courses_enrolled:
+        return "ERROR: Cannot assign grade: Course not found or student not enrolled."
+    professor.assign_grade(student, course_id, grade)
+    return f"SUCCESS: Grade {grade} assigned to {student.name}."
+
+
+@command("ADD_DEPARTMENT", fields("id", "name", "head_of_department"))
+def cmd_add_department(department_id, name, head_of_department):
+    if department_id in departments:
+        return f"ERROR: Department with ID {department_id} already exists."
+    departments.add(Department(department_id, name, head_of_department))
+    return f"SUCCESS: Department {name} added."
+
+
+@command("GET_DEPARTMENT_INFO", fields("department_id"))
+def cmd_get_department_info(department_id):
+    dept = find_department(department_id)
+    return json.dumps({
+        "Department ID": dept.department_id,
+        "Name": dept.name,
+        "Head of Department": dept.head_of_department,
+        "Courses Offered": [c.course_id for c in dept.courses_offered],
+        "Faculty Members": [p.professor_id for p in dept.faculty_members]
+    })
+
+
+@command("ADD_CLASSROOM", fields("id", "location", "capacity"))
+def cmd_add_classroom(classroom_id, location, capacity):
+    if classroom_id in classrooms:
+        return f"ERROR: Classroom with ID {classroom_id} already exists."
+    classrooms.add(Classroom(classroom_id, location, capacity))
+    return f"SUCCESS: Classroom {classroom_id} added."
+
+
+@command("GET_CLASSROOM_INFO", fields("classroom_id"))
+def cmd_get_classroom_info(classroom_id):
+    return json.dumps(find_classroom(classroom_id).get_classroom_info())
+
+
+@command("ADD_SCHEDULE", fields("course_id", "professor_id", "classroom_id", "time_slot"))
+def cmd_add_schedule(course_id, professor_id, classroom_id, time_slot):
+    course = find_course(course_id)
+    professor = find_professor(professor_id)
+    classroom = find_classroom(classroom_id)
+    check_schedule_slot(classroom, course, professor, time_slot)
+    schedule = Schedule(schedules.new_id("sch_"), course, professor, time_slot, classroom.location)
+    schedules.add(schedule)
+    classroom.allocate_class(schedule)
+    warning = student_clash_warning(course, time_slot, ignore=schedule)
+    return f"SUCCESS: Schedule {schedule.get_schedule_id()} created." + (f" {warning}" if warning else "")
+
+
+@command("UPDATE_SCHEDULE", fields("schedule_id", "time_slot", optional=("location",)))
+def cmd_update_schedule(schedule_id, time_slot, location):
+    schedule = find_schedule(schedule_id)
+    classrooms.load_all()
+    room = schedule_rooms.get(schedule_id)
+    if room is not None:
+        check_schedule_slot(room, schedule.get_course(), schedule.get_professor(), time_slot, ignore=schedule)
+    schedule.update_schedule(time_slot, location)
+    return f"SUCCESS: Schedule {schedule_id} updated."
+
+
+@command("GET_CONFLICTS")
+def cmd_get_conflicts():
+    return json.dumps(term_conflicts())
+
+
+def timetable_args(args):
+    # "[seconds][,apply]" then one ";professor_id,time slot[,time slot...]" per professor with times they can't teach
+    first, *lines = args.split(';')
+    seconds, apply = fields(optional=("seconds", "apply"))(first)
+    return seconds, apply, [line.strip() for line in lines if line.strip()]
+
+
+timetable_args.usage = "[seconds][,apply][;professor_id,unavailable time slot[,time slot...]]..."
+
+
+@command("SOLVE_TIMETABLE", timetable_args, locked=False)
+def cmd_solve_timetable(seconds, apply, unavailable):
+    # places every course without a schedule; the search runs without data_lock, "apply" books the result
+    import timetable
+    try:
+        seconds = float(seconds) if seconds else timetable.DEFAULT_SECONDS
+    except ValueError:
+        raise ValueError(f"Invalid time budget '{seconds}'")
+    if not 0 < seconds <= 600:
+        raise ValueError("The time budget must be between 0 and 600 seconds")
+    if apply and apply.lower() != "apply":
+        raise ValueError(f"Expected 'apply', got '{apply}'")
+    problem = timetable.build_problem(unavailable=timetable.parse_unavailable(unavailable))
+    result = timetable.solve(problem, seconds)
+    if apply:
+        result.update(timetable.apply_timetable(result))
+    return json.dumps(result)
+
+
+@command("FIND_FREE_ROOMS", fields("time_slot", optional=("min_capacity", "max_capacity")))
+def cmd_find_free_rooms(time_slot, min_capacity, max_capacity):
+    bounds = []
+    for value in (min_capacity, max_capacity):
+        if value is not None and not value.isdigit():
+            raise ValueError(f"Invalid capacity '{value}', expected a whole number of seats")
+        bounds.append(None if value is None else int(value))
+    rooms = find_free_rooms(time_slot, bounds[0] or 0, bounds[1])
+    return json.dumps([{"Classroom ID": r.classroom_id, "Location": r.location, "Capacity": r.capacity}
+                       for r in rooms])
+
+
+@command("LIST_SCHEDULES")
+def cmd_list_schedules():
+    return json.dumps([s.view_schedule() for s in schedules])
+
+
+@command("ADD_EXAM", fields("course_id", "date", "duration", "passing_score"))
+def cmd_add_exam(course_id, date, duration, passing_score):
+    course = find_course(course_id)
+    exam = FinalExam(exams.new_id("exam_"), course.name, date, duration, passing_score)
+    exams.add(exam)
+    return f"SUCCESS: Exam {exam.get_exam_id()} added."
+
+
+@command("RECORD_EXAM_RESULT", fields("exam_id", "student_id", "score"))
+def cmd_record_exam_result(exam_id, student_id, score):
+    exam = find_exam(exam_id)
+    student = find_student(student_id)
+    score = float(score)
+    if score < 0 or score > 100:
+        return "ERROR: Score must be between 0 and 100!"
+    exam.record_results(student.name, score)
+    return f"SUCCESS: Result recorded for {student.name}: {score}"
+
+
+@command("GET_EXAM_RESULTS", fields("exam_id"))
+def cmd_get_exam_results(exam_id):
+    return json.dumps(find_exam(exam_id).get_results())
+
+
+@command("ADD_LIBRARY", fields("library_id"))
+def cmd_add_library(library_id):
+    if library_id in libraries:
+        return f"ERROR: Library with ID {library_id} already exists."
+    libraries.add(Library(library_id))
+    return f"SUCCESS: Library {library_id} added."
+
+
+@command("ADD_BOOK", fields("library_id", "title", "author", "category", optional=("copies",)))
+def cmd_add_book(library_id, title, author, category, copies):
+    copies = int(copies) if copies else 1
+    find_library(library_id).add_book(title, author, category, copies)
+    return f"SUCCESS: Added {copies} of '{title}'."
+
+
+@command("REGISTER_LIBRARY", fields("library_id", "student_id"))
+def cmd_register_library(library_id, student_id):
+    library = find_library(library_id)
+    student = find_student(student_id)
+    if student_id in library._students_registered:
+        return f"ERROR: Student '{student.name}' is already registered."
+    library.register_student(student_id, student.name)
+    return f"SUCCESS: Student '{student.name}' registered in library {library_id}."
+
+
+@command("BORROW_BOOK", fields("library_id", "student_id", "title"))
+def cmd_borrow_book(library_id, student_id, title):
+    library = find_library(library_id)
+    if student_id not in library._students_registered:
+        return f"ERROR: Student with ID '{student_id}' is not registered in the library!"
+    if title not in library._books or library._books[title]["copies"] <= 0:
+        return f"ERROR: Book '{title}' is not available."
+    library.borrow_book(student_id, title)
+    return f"SUCCESS: Book '{title}' borrowed."
+
+
+@command("RETURN_BOOK", fields("library_id", "student_id", "title"))
+def cmd_return_book(library_id, student_id, title):
+    library = find_library(library_id)
+    if student_id not in library._students_registered:
+        return f"ERROR: Student with ID '{student_id}' is not registered in the library!"
+    if title not in library._students_registered[student_id]["borrowed_books"]:
+        return f"ERROR: Student '{student_id}' did not borrow '{title}'."
+    library.return_book(student_id, title)
+    return f"SUCCESS: Book '{title}' returned."
+
+
+@command("SEARCH_BOOKS", fields("library_id", "keyword"))
+def cmd_search_books(library_id, keyword):
+    return json.dumps(find_library(library_id).find_books(keyword))
+
+
+@command("RECORD_ATTENDANCE", fields("student_id", "course_id", "date", "status"))
+def cmd_record_attendance(student_id, course_id, date, status):
+    add_attendance_record(find_student(student_id), find_course(course_id), date, status)
+    return "SUCCESS: Attendance recorded."
+
+
+@command("ROLL_CALL", fields("course_id", "date", optional=("present_ids",)))
+def cmd_roll_call(course_id, date, present_ids):
+    # present_ids separated by ';', every other enrolled student is recorded absent
+    present = [sid.strip() for sid in (present_ids or "").split(';') if sid.strip()]
+    return json.dumps(get_attendance_report().record_roll_call(find_course(course_id), date, present))
+
+
+@command("GET_STUDENT_ATTENDANCE", fields("student_id"))
+def cmd_get_student_attendance(student_id):
+    return json.dumps(get_attendance_report().get_student_attendance(find_student(student_id)))
+
+
+@command("GET_COURSE_ATTENDANCE", fields("course_id"))
+def cmd_get_course_attendance(course_id):
+    return json.dumps(get_attendance_report().get_course_attendance(find_course(course_id)))
+
+
+@command("GET_STUDENT_ATTENDANCE_RANGE", fields("student_id", "start_date", "end_date", optional=("course_id",)))
+def cmd_get_student_attendance_range(student_id, start_date, end_date, course_id):
+    course = find_course(course_id) if course_id else None
+    return json.dumps(get_attendance_report().get_attendance_between(start_date, end_date,
+                                                                     find_student(student_id), course))
+
+
+@command("GET_COURSE_ATTENDANCE_RANGE", fields("course_id", "start_date", "end_date"))
+def cmd_get_course_attendance_range(course_id, start_date, end_date):
+    return json.dumps(get_attendance_report().get_attendance_between(start_date, end_date,
+                                                                     course=find_course(course_id)))
+
+
+@command("GET_ABSENCE_STREAKS", fields("min_days", optional=("course_id",)))
+def cmd_get_absence_streaks(min_days, course_id):
+    if not min_days.isdigit() or int(min_days) < 1:
+        raise ValueError("min_days must be a positive whole number")
+    course = find_course(course_id) if course_id else None
+    return json.dumps(get_attendance_report().get_absence_streaks(int(min_days), course))
+
+
+@command("ATTENDANCE_ANALYTICS", fields("kind", optional=("arg",)), locked=False)
+def cmd_attendance_analytics(kind, arg):
+    # kind: courses, at_risk[,threshold], weekly[,student_id], heatmap[,course_id], streaks[,min_days] or nightly.
+    # Runs without data_lock: analytics copies what it needs under the store's own lock
+    import analytics
+    load_deferred()
+    store = attendance_store
+    kind = kind.lower()
+    if kind == "courses":
+        result = analytics.course_rates(store)
+    elif kind == "at_risk":
+        try:
+            threshold = float(arg) if arg else analytics.AT_RISK_BELOW
+        except ValueError:
+            raise ValueError(f"Invalid threshold '{arg}'")
+        result = analytics.at_risk(store, threshold)
+    elif kind == "weekly":
+        result = analytics.weekly_trends(store, arg)
+    elif kind == "heatmap":
+        result = analytics.weekday_heatmap(store, arg)
+    elif kind == "streaks":
+        if arg and (not arg.isdigit() or int(arg) < 1):
+            raise ValueError("min_days must be a positive whole number")
+        result = analytics.absence_streaks(store, int(arg) if arg else 3)
+    elif kind == "nightly":
+        result = analytics.nightly_report(store)
+    else:
+        raise ValueError(f"Unknown analytics '{kind}', expected courses, at_risk, weekly, heatmap, streaks or nightly")
+    return json.dumps(result)
+
+
+@command("GET_ATTENDANCE_PERCENTAGE", fields("student_id", optional=("course_id",)))
+def cmd_get_attendance_percentage(student_id, course_id):
+    course = find_course(course_id) if course_id else None
+    percentage = get_attendance_report().calculate_attendance_percentage(find_student(student_id), course)
+    return f"PERCENTAGE: {percentage:.2f}"
+
+
+@command("UPDATE_ATTENDANCE", fields("role", "student_id", "date", "status", optional=("course_id",)))
+def cmd_update_attendance(role, student_id, date, status, course_id):
+    load_deferred()
+    proxy = AttendanceProxy(role)
+    if not proxy.can_update():
+        return "ERROR: Unauthorized: Only admins and professors can update attendance"
+    if not proxy.update_status(student_id, date, status, course_id):
+        return "ERROR: Attendance status not updated."
+    return "SUCCESS: Attendance status updated."
+
+
+@command("UPDATE_ATTENDANCE_BATCH", raw_args)
+def cmd_update_attendance_batch(args):
+    # role first, then one student_id,date,status[,course_id] per line or ';'
+    lines = [line.strip() for line in args.replace(';', '\n').splitlines() if line.strip()]
+    if not lines:
+        raise ValueError("Expected role;student_id,date,status[,course_id];...")
+    load_deferred()
+    proxy = AttendanceProxy(lines[0])
+    if not proxy.can_update():
+        return "ERROR: Unauthorized: Only admins and professors can update attendance"
+    corrections = [[v.strip() for v in line.split(',')] for line in lines[1:]]
+    return json.dumps(proxy.update_statuses(corrections))
+
+
+def process_command(msg):
+    # returns (response, keep_connection_open); shared by the threaded and asyncio servers
+    parts = msg.split(' ', 1)
+    cmd = parts[0].upper()
+    args = parts[1] if len(parts) > 1 else ""
+
+    if cmd == "QUIT":
+        return "INFO: Disconnecting.", False
+
+    if cmd not in COMMANDS and cmd not in STREAMS:
+        return "ERROR: Unknown command", True
+
+    handler, parse = COMMANDS.get(cmd) or STREAMS[cmd]
+    try:
+        parsed = parse(args)
+    except ValueError:
+        return f"ERROR: Invalid {cmd} format. Use {parse.usage}", True
+
+    try:
+        if cmd in STREAMS or cmd in UNLOCKED:
+            return handler(*parsed), True
+        with data_lock:
+            return handler(*parsed), True
+    except (LookupError, ValueError) as e:
+        return f"ERROR: {e}", True
 
 
 def handle_client(conn, addr):
@@ -720,77 +2117,64 @@ def handle_client(conn, addr):
     with conn:  # automatically close the connection when done
         while True:  # keep listening to this client until they quit or disconnect
             try:
-                data = conn.recv(1024)
-                if not data: # the client disconnected
+                msg = recv_message(conn)  # one whole framed request, however many recv calls it takes
+                if msg is None: # the client disconnected
                     print(f"[-] Disconnected: {ip}")
                     break
 
-                msg = data.decode().strip()
-                print(f"[{ip}] -> {msg}")  # Show what the client sent
-
+                msg = msg.strip()
+                print(f"[{ip}] -> {msg[:100]}")  # Show what the client sent
 
-                parts = msg.split(' ', 1)
-                cmd = parts[0].upper()
-                args = parts[1] if len(parts) > 1 else ""
-                resp = "ERROR: Unknown command"
-
-                if cmd == "QUIT":
-                    resp = "INFO: Disconnecting."
-                    conn.sendall(resp.encode())
+                resp, keep_open = process_command(msg)
+                for resp in replies(resp):
+                    send_message(conn, resp)
+                if not keep_open:
                     break
-
-                elif cmd == "GET_STUDENT_COUNT":
-                    resp = f"COUNT: {len(students)}"
-
-                elif cmd == "ADD_STUDENT":
-                    try:
-
-                        s_id, name, major, email = args.split(',')
-
-                        if any(s.get_id() == s_id for s in students):
-                            resp = f"ERROR: Student with ID {s_id} already exists."
-                        else:
-                            students.append(Student(s_id, name, major, email))
-                            resp = f"SUCCESS: Student {name} added."
-                    except:
-                        resp = "ERROR: Invalid ADD_STUDENT format. Use id,name,major,email"
-
-                elif cmd == "GET_STUDENT_INFO":
-                    s_id = args.strip()
-                    student = next((s for s in students if s.get_id() == s_id), None)
-                    if student:
-                        # convert student info to JSON string to send
-                        resp = json.dumps(student.get_info())
-                    else:
-                        resp = f"ERROR: Student with ID {s_id} not found."
-
-                conn.sendall(resp.encode())
                 print(f"[{ip}] <- {resp[:100]}...")
 
             except ConnectionResetError:
                 print(f"[!] Connection reset: {ip}")
                 break
 
+            except socket.timeout:
+                print(f"[-] Idle timeout: {ip}")
+                break
+
             except Exception as e:
                 print(f"[!] Error with {ip}: {e}")
                 try:
-                    conn.sendall(f"ERROR: Server error - {e}".encode())
+                    send_message(conn, f"ERROR: Server error - {e}")
                 except:
                     pass
                 break
 
 
-def start_server():
+def serve_client(conn, addr, slots):
+    try:
+        conn.settimeout(CLIENT_TIMEOUT)
+        handle_client(conn, addr)
+    finally:
+        slots.release()
+
+
+def start_server(host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS, backlog=SERVER_BACKLOG):
+    slots = threading.BoundedSemaphore(workers)  # stop accepting while every worker is busy
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="client")
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:   #Automatically closes the socket when done
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         try:
-            s.bind((SERVER_HOST, SERVER_PORT))
-            s.listen()
-            print(f"Server listening at {SERVER_HOST}:{SERVER_PORT}")
+            s.bind((host, port))
+            s.listen(backlog)
+            print(f"Server listening at {host}:{port} ({workers} workers)")
 
             while True:
-                conn, addr = s.accept()
-                handle_client(conn, addr)
+                slots.acquire()
+                try:
+                    conn, addr = s.accept()
+                except:
+                    slots.release()
+                    raise
+                pool.submit(serve_client, conn, addr, slots)
 
         except OSError as e:
             # If port is already in use or other socket errors
@@ -800,8 +2184,81 @@ def start_server():
             print("\nServer interrupted.")
 
         finally:
+            pool.shutdown(wait=False, cancel_futures=True)
             print("Server stopped.")
 
+async def handle_async_client(reader, writer):
+    ip = writer.get_extra_info('peername')[0]
+    print(f"[+] Connected: {ip}")
+
+    try:
+        while True:
+            msg = await read_message(reader)
+            if msg is None:
+                print(f"[-] Disconnected: {ip}")
+                break
+
+            msg = msg.strip()
+            print(f"[{ip}] -> {msg[:100]}")
+
+            if runs_unlocked(msg):
+                # stream and unlocked commands can take seconds (EXPORT builds every record it sends), so the
+                # handler and each message of its reply run in the default executor instead of blocking the loop
+                loop = asyncio.get_running_loop()
+                resp, keep_open = await loop.run_in_executor(None, process_command, msg)
+                parts = iter(replies(resp))
+                while True:
+                    part = await loop.run_in_executor(None, next, parts, None)
+                    if part is None:
+                        break
+                    resp = part
+                    write_message(writer, resp)
+                    await writer.drain()
+            else:
+                resp, keep_open = process_command(msg)
+                for resp in replies(resp):
+                    write_message(writer, resp)
+                    await writer.drain()  # wait here if the client is slow to read
+            if not keep_open:
+                break
+            print(f"[{ip}] <- {resp[:100]}...")
+
+    except ConnectionResetError:
+        print(f"[!] Connection reset: {ip}")
+
+    except Exception as e:
+        print(f"[!] Error with {ip}: {e}")
+        try:
+            write_message(writer, f"ERROR: Server error - {e}")
+            await writer.drain()
+        except:
+            pass
+
+    finally:
+        writer.close()
+
+
+async def run_async_server(host=SERVER_HOST, port=SERVER_PORT, backlog=SERVER_BACKLOG):
+    server = await asyncio.start_server(handle_async_client, host, port, backlog=backlog)
+    print(f"Async server listening at {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def start_async_server(host=SERVER_HOST, port=SERVER_PORT, backlog=SERVER_BACKLOG):
+    # one event loop serves every connection, idle clients cost a socket and a coroutine
+    try:
+        asyncio.run(run_async_server(host, port, backlog))
+
+    except OSError as e:
+        print(f"Port error: {e}")
+
+    except KeyboardInterrupt:
+        print("\nServer interrupted.")
+
+    finally:
+        print("Server stopped.")
+
 def main_cli():
     while True:
         print("\nUniversity Management System")
@@ -839,7 +2296,14 @@ def main_cli():
         print("32. Logout")
         print("33. View Dashboard")
         print("34. Register User")
-        print("35. Exit")
+        print("35. Bulk Import (CSV/JSONL)")
+        print("36. Export Data (JSON Lines)")
+        print("37. Roll Call")
+        print("38. Attendance Analytics")
+        print("39. Term Conflict Report")
+        print("40. Generate Timetable")
+        print("41. Find Free Rooms")
+        print("42. Exit")
 
         choice = input("Enter your choice: ")
 
@@ -848,8 +2312,11 @@ def main_cli():
             student_id = input("Enter student ID: ")
             major = input("Enter student major: ")
             email = input("Enter student email: ")
-            students.append(Student(student_id, name, major, email))
-            print("Student added successfully!")
+            try:
+                students.add(Student(student_id, name, major, email))
+                print("Student added successfully!")
+            except ValueError as e:
+                print(f"Error: {e}")
 
         elif choice == "2":
             name = input("Enter professor name: ")
@@ -858,9 +2325,13 @@ def main_cli():
             contact_info = input("Enter contact info: ")
             email = input("Enter professor email: ")
             prof = Professor(professor_id, name, department, contact_info, email)
-            professors.append(prof)
+            try:
+                professors.add(prof)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
 
-            dept = next((d for d in departments if d.name == department), None)
+            dept = find_department_by_name(department)
             if dept:
                 dept.list_professors(prof)
 
@@ -873,15 +2344,18 @@ def main_cli():
                 continue
             name = input("Enter course name: ")
             course_id = input("Enter course ID: ")
+            if course_id in courses:
+                print(f"Error: Course with ID {course_id} already exists.")
+                continue
             department = input("Enter course department: ")
             credits = input("Enter course credits: ")
             try:
                 prof_index = int(input(f"Select a professor (0-{len(professors) - 1}): "))
                 if 0 <= prof_index < len(professors):
                     course = Course(course_id, name, department, credits, professors[prof_index])
-                    courses.append(course)
+                    courses.add(course)
 
-                    dept = next((d for d in departments if d.name == department), None)
+                    dept = find_department_by_name(department)
                     if dept:
                         dept.list_courses(course)
 
@@ -894,8 +2368,8 @@ def main_cli():
         elif choice == "4":
             student_id = input("Enter student ID: ")
             course_id = input("Enter course ID: ")
-            student = next((s for s in students if s._id == student_id), None)
-            course = next((c for c in courses if c.course_id == course_id), None)
+            student = students.get(student_id)
+            course = courses.get(course_id)
             if student and course:
                 student.enroll_course(course.course_id, course.name)
                 course.add_student(student)
@@ -905,8 +2379,8 @@ def main_cli():
         elif choice == "5":
             student_id = input("Enter student ID: ")
             course_id = input("Enter course ID: ")
-            student = next((s for s in students if s._id == student_id), None)
-            course = next((c for c in courses if c.course_id == course_id), None)
+            student = students.get(student_id)
+            course = courses.get(course_id)
             if student and course:
                 course.remove_student(student)
             else:
@@ -914,7 +2388,7 @@ def main_cli():
 
         elif choice == "6":
             student_id = input("Enter student ID: ")
-            student = next((s for s in students if s._id == student_id), None)
+            student = students.get(student_id)
             if student:
                 print(student.get_info())
             else:
@@ -922,7 +2396,7 @@ def main_cli():
 
         elif choice == "7":
             course_id = input("Enter course ID: ")
-            course = next((c for c in courses if c.course_id == course_id), None)
+            course = courses.get(course_id)
             if course:
                 print(course.get_course_info())
             else:
@@ -932,9 +2406,11 @@ def main_cli():
             name = input("Enter department name: ")
             department_id = input("Enter department ID: ")
             head_of_department = input("Enter head of department: ")
-            department = Department(department_id, name, head_of_department)
-            departments.append(department)
-            print("Department added successfully!")
+            try:
+                departments.add(Department(department_id, name, head_of_department))
+                print("Department added successfully!")
+            except ValueError as e:
+                print(f"Error: {e}")
 
         elif choice == "9":
             if not departments:
@@ -970,8 +2446,11 @@ def main_cli():
             classroom_id = input("Enter classroom ID: ")
             location = input("Enter classroom location: ")
             capacity = input("Enter classroom capacity: ")
-            classrooms.append(Classroom(classroom_id, location, capacity))
-            print("Classroom added successfully!")
+            try:
+                classrooms.add(Classroom(classroom_id, location, capacity))
+                print("Classroom added successfully!")
+            except ValueError as e:
+                print(f"Error: {e}")
 
         elif choice == "13":
             if not courses or not professors or not classrooms:
@@ -994,13 +2473,21 @@ def main_cli():
             room_idx = int(input("Select classroom: "))
 
             time_slot = input("Enter time slot (e.g., 'Mon 9-11'): ")
-            schedule_id = f"sch_{len(schedules) + 1}"
+            schedule_id = schedules.new_id("sch_")
+            try:
+                check_schedule_slot(classrooms[room_idx], courses[course_idx], professors[prof_idx], time_slot)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
 
             schedule = Schedule(schedule_id, courses[course_idx], professors[prof_idx], time_slot,
                                 classrooms[room_idx].location)
-            schedules.append(schedule)
+            schedules.add(schedule)
             classrooms[room_idx].allocate_class(schedule)
             print("Schedule created successfully!")
+            warning = student_clash_warning(courses[course_idx], time_slot, ignore=schedule)
+            if warning:
+                print(warning)
 
         elif choice == "14":
             if not schedules:
@@ -1017,7 +2504,6 @@ def main_cli():
             if time_slot or location:
                 schedules[sched_idx].update_schedule(time_slot if time_slot else None,
                                                      location if location else None)
-                print("Schedule updated successfully!")
             else:
                 print("No changes made.")
 
@@ -1039,13 +2525,13 @@ def main_cli():
                 print(f"{idx}. {course.name}")
 
             course_idx = int(input("Select course: "))
-            exam_id = f"exam_{len(exams) + 1}"
+            exam_id = exams.new_id("exam_")
             date = input("Enter exam date (YYYY-MM-DD): ")
             duration = input("Enter exam duration (hours): ")
             passing_score = input("Enter passing score: ")
 
             exam = FinalExam(exam_id, courses[course_idx].name, date, duration, passing_score)
-            exams.append(exam)
+            exams.add(exam)
             print("Exam added successfully!")
 
         elif choice == "17":
@@ -1090,8 +2576,11 @@ def main_cli():
 
         elif choice == "20":
             library_id = input("Enter library ID: ")
-            libraries.append(Library(library_id))
-            print("Library added successfully!")
+            try:
+                libraries.add(Library(library_id))
+                print("Library added successfully!")
+            except ValueError as e:
+                print(f"Error: {e}")
 
         elif choice == "21":
             if not libraries:
@@ -1175,19 +2664,13 @@ def main_cli():
             status = input("Enter status (Present/Absent): ")
 
             try:
-                attendance = Attendance(students[student_idx], courses[course_idx], date, status)
-                attendance_records.append(attendance)
-
-                if not attendance_reports:
-                    attendance_reports.append(AttendanceReport())
-                attendance_reports[0].add_attendance(attendance)
-
+                add_attendance_record(students[student_idx], courses[course_idx], date, status)
                 print("Attendance recorded successfully!")
             except ValueError as e:
                 print(f"Error: {e}")
 
         elif choice == "27":
-            if not students or not attendance_reports:
+            if not students or not get_attendance_report().attendance_records:
                 print("No students or attendance records available.")
                 continue
 
@@ -1196,10 +2679,10 @@ def main_cli():
                 print(f"{idx}. {student.name}")
             student_idx = int(input("Select student: "))
 
-            attendance_reports[0].get_student_attendance(students[student_idx])
+            get_attendance_report().get_student_attendance(students[student_idx])
 
         elif choice == "28":
-            if not courses or not attendance_reports:
+            if not courses or not get_attendance_report().attendance_records:
                 print("No courses or attendance records available.")
                 continue
 
@@ -1208,10 +2691,10 @@ def main_cli():
                 print(f"{idx}. {course.name}")
             course_idx = int(input("Select course: "))
 
-            attendance_reports[0].get_course_attendance(courses[course_idx])
+            get_attendance_report().get_course_attendance(courses[course_idx])
 
         elif choice == "29":
-            if not students or not attendance_reports:
+            if not students or not get_attendance_report().attendance_records:
                 print("No students or attendance records available.")
                 continue
 
@@ -1227,20 +2710,19 @@ def main_cli():
 
             if course_choice:
                 course_idx = int(course_choice)
-                attendance_reports[0].calculate_attendance_percentage(
+                get_attendance_report().calculate_attendance_percentage(
                     students[student_idx], courses[course_idx])
             else:
-                attendance_reports[0].calculate_attendance_percentage(students[student_idx])
+                get_attendance_report().calculate_attendance_percentage(students[student_idx])
 
 
         elif choice == "30":
-            if not attendance_records:
+            if not get_attendance_report().attendance_records:
                 print("No attendance records available.")
                 continue
 
             role = input("Enter your role (admin/professor): ")
             proxy = AttendanceProxy(role)
-            proxy.attendance_records = attendance_records
 
             print("Available students:")
             for idx, student in enumerate(students):
@@ -1250,7 +2732,7 @@ def main_cli():
             date = input("Enter date (YYYY-MM-DD) to update: ")
             new_status = input("Enter new status (Present/Absent): ")
             success = proxy.update_status(students[student_idx]._id, date, new_status)
-            if success and attendance_reports:
+            if success:
                 print("Attendance status updated in records and reports.")
 
         elif choice == "31":
@@ -1305,6 +2787,128 @@ def main_cli():
 
 
         elif choice == "35":
+            import bulk_import
+            kind = input("Import students, professors or courses? ").strip().lower()
+            path = input("Enter file path (.csv or .jsonl): ").strip()
+            try:
+                report = bulk_import.import_file(path, kind)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
+            print(f"Imported {report['imported']} of {report['rows']} rows in {report['seconds']}s "
+                  f"({report['rows_per_second']} rows/s).")
+            if report["rejected"]:
+                print(f"Rejected {report['rejected']} rows:")
+                for entry in report["rejects"][:20]:
+                    print(f"  line {entry['line']}: {entry['error']}")
+
+        elif choice == "36":
+            import export
+            path = input("Enter output file path: ").strip()
+            kinds = input("Export what (students, rosters, attendance, loans; blank for all)? ")
+            try:
+                count = export.export_file(path, export.parse_kinds(kinds))
+            except (ValueError, OSError) as e:
+                print(f"Error: {e}")
+                continue
+            print(f"Exported {count} rows to {path}.")
+
+        elif choice == "37":
+            course = courses.get(input("Enter course ID: ").strip())
+            if course is None:
+                print("Course not found.")
+                continue
+            if not course.enrolled_students:
+                print(f"No students are enrolled in {course.name}.")
+                continue
+            date = input("Enter date (YYYY-MM-DD): ").strip()
+            present = input("Enter the IDs of present students (comma separated): ")
+            try:
+                result = get_attendance_report().record_roll_call(
+                    course, date, [sid.strip() for sid in present.split(',') if sid.strip()])
+                print(f"Roll call saved: {result['present']} present, {result['absent']} absent.")
+            except ValueError as e:
+                print(f"Error: {e}")
+
+        elif choice == "38":
+            import analytics
+            load_deferred()
+            if not len(attendance_store):
+                print("No attendance records available.")
+                continue
+            print("Attendance by course:")
+            for course_id, row in analytics.course_rates(attendance_store).items():
+                print(f"- {course_id}: {row['present']}/{row['total']} ({row['rate']:.2f}%)")
+            print(f"Students below {analytics.AT_RISK_BELOW:.0f}% in a course:")
+            for row in analytics.at_risk(attendance_store):
+                print(f"- {row['Student']} (ID: {row['Student ID']}) in {row['Course ID']}: {row['Rate']:.2f}%")
+            path = input("Save the full nightly report as JSON (file path, or Enter to skip): ").strip()
+            if path:
+                try:
+                    with open(path, "w", encoding="utf-8") as f:
+                        json.dump(analytics.nightly_report(attendance_store), f, indent=2)
+                    print(f"Report saved to {path}.")
+                except OSError as e:
+                    print(f"Error: {e}")
+
+        elif choice == "39":
+            conflicts = term_conflicts()
+            if not conflicts:
+                print("No conflicts found in the timetable.")
+                continue
+            print(f"{len(conflicts)} conflict(s):")
+            for c in conflicts:
+                detail = c.get("Classroom") or c.get("Professor") or c.get("Course") or \
+                    f"{len(c['Students'])} student(s): {', '.join(c['Students'][:10])}"
+                print(f"- {c['Type']}: {c['Schedules'][0]} ({c['Time Slots'][0]}) and "
+                      f"{c['Schedules'][1]} ({c['Time Slots'][1]}) - {detail}")
+
+        elif choice == "40":
+            import timetable
+            seconds = input(f"Time budget in seconds (Enter for {timetable.DEFAULT_SECONDS:g}): ").strip()
+            unavailable = input("Times professors can't teach, e.g. 'p1,Mon 8-10,Fri 14-16;p2,Tue 8-12' "
+                                "(Enter for none): ").strip()
+            try:
+                problem = timetable.build_problem(
+                    unavailable=timetable.parse_unavailable(line for line in unavailable.split(';') if line.strip()))
+                if not problem["courses"]:
+                    print("Every course already has a schedule.")
+                    continue
+                if not problem["rooms"]:
+                    print("Add classrooms first.")
+                    continue
+                result = timetable.solve(problem, float(seconds) if seconds else timetable.DEFAULT_SECONDS)
+            except (LookupError, ValueError) as e:
+                print(f"Error: {e}")
+                continue
+            for row in result["assignments"]:
+                print(f"- {row['Course ID']}: {row['Time Slot']} in {row['Classroom ID']} "
+                      f"({row['Students']}/{row['Capacity']} seats, professor {row['Professor ID']})")
+            if result["unassigned"]:
+                print(f"Could not place: {', '.join(result['unassigned'])}")
+            print(f"Searched for {result['seconds']}s with {result['workers']} process(es).")
+            if result["assignments"] and input("Create these schedules? (y/n): ").strip().lower() == "y":
+                applied = timetable.apply_timetable(result)
+                print(f"Created {len(applied['created'])} schedule(s).")
+                for row in applied["failed"]:
+                    print(f"  {row['Course ID']}: {row['error']}")
+
+        elif choice == "41":
+            time_slot = input("Enter time slot (e.g., 'Tue 14-16'): ").strip()
+            min_capacity = input("Minimum capacity (Enter for any): ").strip()
+            try:
+                rooms = find_free_rooms(time_slot, int(min_capacity) if min_capacity else 0)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
+            if not rooms:
+                print("No free rooms match.")
+                continue
+            print(f"Free rooms for {time_slot}:")
+            for room in rooms:
+                print(f"- {room.classroom_id}: {room.location} (Capacity: {room.capacity})")
+
+        elif choice == "42":
             print("Exiting University Management System. Goodbye!")
             break
 
@@ -1312,14 +2916,47 @@ def main_cli():
             print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    print("Run as:")
-    print("1. Command-Line Interface (CLI)")
-    print("2. Network Server")
-    mode = input("Enter choice (1 or 2): ")
-
-    if mode == '1':
-        main_cli()
-    elif mode == '2':
-        start_server()
-    else:
-        print("Invalid choice. Exiting.")
+    # let modules that import this one by name (persistence, ...) share this copy of the registries
+    sys.modules.setdefault("university_management_last_version1", sys.modules[__name__])
+
+    parser = argparse.ArgumentParser(description="University Management System")
+    parser.add_argument("--mode", choices=["cli", "server", "async"],
+                        help="run without the start-up prompt")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--import-dir", default=IMPORT_DIR, help="directory IMPORT_FILE may read from")
+    storage = parser.add_mutually_exclusive_group()
+    storage.add_argument("--data-dir", help="keep data in this directory (write-ahead log + snapshots)")
+    storage.add_argument("--db", help="keep data in this SQLite database file")
+    cli_args = parser.parse_args()
+    IMPORT_DIR = cli_args.import_dir
+
+    store = None
+    if cli_args.data_dir:
+        import persistence
+        store = persistence.open_store(cli_args.data_dir)
+    elif cli_args.db:
+        import sqlite_store
+        store = sqlite_store.open_database(cli_args.db)
+
+    mode = {"cli": "1", "server": "2", "async": "3"}.get(cli_args.mode)
+    if mode is None:
+        print("Run as:")
+        print("1. Command-Line Interface (CLI)")
+        print("2. Network Server")
+        print("3. Network Server (asyncio)")
+        mode = input("Enter choice (1, 2 or 3): ")
+
+    try:
+        if mode == '1':
+            main_cli()
+        elif mode == '2':
+            start_server(cli_args.host, cli_args.port, cli_args.workers)
+        elif mode == '3':
+            start_async_server(cli_args.host, cli_args.port)
+        else:
+            print("Invalid choice. Exiting.")
+    finally:
+        if store:
+            store.close()